@@ -0,0 +1,64 @@
+"""
+Benchmark das páginas de documentação (/docs-mcp, /docs-mcp/json, /tools)
+
+Compara o custo de renderizar a página a cada requisição (comportamento
+antigo) com servir a resposta pré-renderizada.
+
+Uso:
+    python -m benchmarks.bench_docs [--repeticoes 200]
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from fastapi.testclient import TestClient
+
+from src.api.docs_endpoints import renderizar_docs_html, resposta_docs_html
+from src.main import app
+
+
+def _medir(funcao: Callable[[], object], repeticoes: int) -> List[float]:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def _relatorio(nome: str, tempos: List[float]) -> None:
+    tempos = sorted(tempos)
+    p95 = tempos[int(len(tempos) * 0.95) - 1]
+    print(f"{nome:<42} mediana {statistics.median(tempos) * 1000:8.3f} ms   p95 {p95 * 1000:8.3f} ms")
+
+
+def main(repeticoes: int) -> None:
+    client = TestClient(app)
+    resposta_docs_html()  # aquece o cache (primeira requisição)
+
+    print(f"{repeticoes} repetições\n")
+    _relatorio("renderizar HTML (por requisição, antigo)", _medir(renderizar_docs_html, repeticoes))
+    _relatorio("HTML pré-renderizado (função)", _medir(lambda: resposta_docs_html().corpo, repeticoes))
+
+    print()
+    for caminho, headers in [
+        ("/docs-mcp/", {}),
+        ("/docs-mcp/", {"Accept-Encoding": "gzip, br"}),
+        ("/docs-mcp/json", {"Accept-Encoding": "gzip"}),
+        ("/tools", {"Accept-Encoding": "gzip"}),
+    ]:
+        resposta = client.get(caminho, headers=headers)
+        codificacao = resposta.headers.get("content-encoding", "identity")
+        rotulo = f"GET {caminho} ({codificacao}, {len(resposta.content) // 1024} KB)"
+        _relatorio(rotulo, _medir(lambda: client.get(caminho, headers=headers), repeticoes))
+
+        etag = {"If-None-Match": resposta.headers["etag"]}
+        _relatorio(f"GET {caminho} (If-None-Match -> 304)", _medir(lambda: client.get(caminho, headers=etag), repeticoes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das páginas de documentação")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    main(parser.parse_args().repeticoes)
@@ -0,0 +1,71 @@
+"""
+Benchmark da serialização de resultados de tools/call
+
+Compara o caminho antigo (json.dumps indent=2 do resultado + JSONResponse
+serializando o envelope de novo) com o codec atual (orjson se instalado,
+compacto, envelope escrito uma vez).
+
+Uso:
+    python -m benchmarks.bench_json [--registros 2000] [--repeticoes 50]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+
+from src.api.mcp_server import _serializar_jsonrpc
+from src.services import json_codec
+
+
+def _pagina_pesquisa(registros: int) -> dict:
+    """Simula um pesquisar_* grande (ex: pedidos.pesquisa com todas_paginas)"""
+    return {"retorno": {"status": "OK", "pagina": 1, "numero_paginas": 1, "pedidos": [
+        {"pedido": {
+            "id": str(100000 + i), "numero": str(i), "data_pedido": "15/03/2024",
+            "nome": f"Cliente Exemplo Ação {i}", "valor": f"{i * 3.7:.2f}",
+            "situacao": "Aprovado", "codigo_rastreamento": "", "id_vendedor": "0",
+        }} for i in range(registros)
+    ]}}
+
+
+def _envelope(texto: str) -> dict:
+    return {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": texto}]}}
+
+
+def antigo(resultado: dict) -> bytes:
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    return JSONResponse(content=_envelope(texto)).body
+
+
+def atual(resultado: dict) -> bytes:
+    return _serializar_jsonrpc(_envelope(json_codec.dumps_str(resultado)))
+
+
+def _medir(funcao: Callable[[], bytes], repeticoes: int) -> List[float]:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos
+
+
+def main(registros: int, repeticoes: int) -> None:
+    resultado = _pagina_pesquisa(registros)
+    print(f"backend: {json_codec.BACKEND} | {registros} registros | {repeticoes} repetições\n")
+    for nome, funcao in [("antigo (indent=2 + JSONResponse)", antigo), ("atual (codec compacto)", atual)]:
+        tamanho = len(funcao(resultado))
+        tempos = _medir(lambda: funcao(resultado), repeticoes)
+        print(f"{nome:<34} {tamanho // 1024:6d} KB   mediana {statistics.median(tempos) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da serialização de tools/call")
+    parser.add_argument("--registros", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    opcoes = parser.parse_args()
+    main(opcoes.registros, opcoes.repeticoes)
@@ -0,0 +1,299 @@
+"""
+Teste de carga ponta a ponta do POST /mcp
+
+Simula agentes: cada um abre sessão (initialize + notifications/initialized)
+e dispara tools/call com um mix de leituras parecido com o tráfego real
+(pesquisa de produto, estoque, contatos, pedidos). Ao final imprime RPS e
+latências p50/p95/p99 por tool e no total.
+
+Os JWTs são gerados aqui (HS256 com JWT_SECRET, ou uma assinatura qualquer
+quando o servidor não verifica), um tenant/tiny_token por grupo de agentes.
+
+Uso (servidor e mock já rodando):
+    python -m benchmarks.mock_tiny --port 8900
+    TINY_API_BASE_URL=http://127.0.0.1:8900/api2 uvicorn src.main:app --port 8000
+    python -m benchmarks.carga_mcp --url http://127.0.0.1:8000 --agentes 50 --duracao 30
+
+Ou tudo no mesmo processo (sobe mock e servidor em portas locais):
+    python -m benchmarks.carga_mcp --local --agentes 50 --duracao 30 --latencia-ms 120
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# (tool, peso): mix de leituras de um agente de atendimento/vendas
+MIX_PADRAO: List[Tuple[str, int]] = [
+    ("tiny_produtos_pesquisar", 25),
+    ("tiny_produto_obter_estoque", 20),
+    ("tiny_produto_obter", 15),
+    ("tiny_pedidos_pesquisar", 10),
+    ("tiny_pedido_obter", 10),
+    ("tiny_contatos_pesquisar", 10),
+    ("tiny_contato_obter", 5),
+    ("tools/list", 5),
+]
+
+_TERMOS_PRODUTO = ["Camiseta", "Tênis", "Mochila", "Caneca", "Fone", "Cabo USB", "Cadeira Preto", "Boné"]
+_TERMOS_CONTATO = ["Silva", "Souza", "Ana", "João", "Oliveira", "Lima"]
+
+
+def _b64(dados: bytes) -> str:
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+
+def gerar_jwt(tenant_id: str, tiny_token: str, segredo: Optional[str], validade: int = 3600) -> str:
+    """JWT HS256 com os claims que get_auth_data espera"""
+    cabecalho = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64(json.dumps({
+        "tenant_id": tenant_id,
+        "tiny_token": tiny_token,
+        "tenant_nome": f"Carga {tenant_id}",
+        "exp": int(time.time()) + validade
+    }).encode())
+    assinatura = hmac.new((segredo or "carga").encode(), f"{cabecalho}.{payload}".encode(), hashlib.sha256)
+    return f"{cabecalho}.{payload}.{_b64(assinatura.digest())}"
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por posição (nearest-rank) de uma lista já ordenada"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+class Resultados:
+    """Latências (s) por operação e contagem de falhas"""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.falhas: Dict[str, int] = defaultdict(int)
+
+    def registrar(self, operacao: str, duracao: float, ok: bool) -> None:
+        self.latencias[operacao].append(duracao)
+        if not ok:
+            self.falhas[operacao] += 1
+
+    def relatorio(self, duracao_total: float) -> str:
+        linhas = [f"{'operação':<30} {'n':>7} {'falhas':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        todas: List[float] = []
+        for operacao in sorted(self.latencias, key=lambda o: -len(self.latencias[o])):
+            valores = sorted(self.latencias[operacao])
+            todas.extend(valores)
+            linhas.append(self._linha(operacao, valores, self.falhas[operacao]))
+        todas.sort()
+        linhas.append("-" * 75)
+        linhas.append(self._linha("total", todas, sum(self.falhas.values())))
+        rps = len(todas) / duracao_total if duracao_total > 0 else 0.0
+        linhas.append(f"\n{len(todas)} requisições em {duracao_total:.1f} s = {rps:.1f} req/s")
+        if todas:
+            linhas.append(f"média {statistics.mean(todas) * 1000:.1f} ms | máx {todas[-1] * 1000:.1f} ms")
+        return "\n".join(linhas)
+
+    @staticmethod
+    def _linha(operacao: str, valores: List[float], falhas: int) -> str:
+        return (f"{operacao:<30} {len(valores):>7} {falhas:>7} "
+                f"{percentil(valores, 50) * 1000:>9.1f} {percentil(valores, 95) * 1000:>9.1f} "
+                f"{percentil(valores, 99) * 1000:>9.1f}")
+
+
+class Agente:
+    """Um cliente MCP com sessão própria disparando tools/call em sequência"""
+
+    def __init__(
+        self,
+        cliente: httpx.AsyncClient,
+        jwt: str,
+        aleatorio: random.Random,
+        opcoes: argparse.Namespace,
+        resultados: Resultados
+    ):
+        self.cliente = cliente
+        self.headers = {"Authorization": f"Bearer {jwt}", "Content-Type": "application/json"}
+        self.aleatorio = aleatorio
+        self.opcoes = opcoes
+        self.resultados = resultados
+        self._proximo_id = 0
+        self._ferramentas = [tool for tool, _ in opcoes.mix]
+        self._pesos = [peso for _, peso in opcoes.mix]
+
+    async def _enviar(self, mensagem: Dict[str, Any]) -> httpx.Response:
+        return await self.cliente.post("/mcp", content=json.dumps(mensagem), headers=self.headers)
+
+    async def iniciar(self) -> None:
+        resposta = await self._enviar({
+            "jsonrpc": "2.0", "id": 0, "method": "initialize",
+            "params": {"protocolVersion": "2025-06-18", "capabilities": {},
+                       "clientInfo": {"name": "carga_mcp", "version": "1.0"}}
+        })
+        resposta.raise_for_status()
+        session_id = resposta.headers.get("Mcp-Session-Id")
+        if session_id:
+            self.headers["Mcp-Session-Id"] = session_id
+        await self._enviar({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _argumentos(self, tool: str) -> Dict[str, Any]:
+        sorteio, o = self.aleatorio, self.opcoes
+        if tool == "tiny_produtos_pesquisar":
+            argumentos = {"pesquisa": sorteio.choice(_TERMOS_PRODUTO)}
+            if o.source != "tiny":
+                argumentos["source"] = o.source
+            return argumentos
+        if tool in ("tiny_produto_obter", "tiny_produto_obter_estoque"):
+            return {"id": str(100000 + sorteio.randint(1, o.produtos))}
+        if tool == "tiny_contatos_pesquisar":
+            argumentos = {"pesquisa": sorteio.choice(_TERMOS_CONTATO)}
+            if o.source != "tiny":
+                argumentos["source"] = o.source
+            return argumentos
+        if tool == "tiny_contato_obter":
+            return {"id": str(200000 + sorteio.randint(1, o.contatos))}
+        if tool == "tiny_pedidos_pesquisar":
+            return {"pesquisa": sorteio.choice(_TERMOS_CONTATO)}
+        if tool == "tiny_pedido_obter":
+            return {"id": str(300000 + sorteio.randint(1, o.pedidos))}
+        return {}
+
+    async def chamar(self, tool: str) -> None:
+        self._proximo_id += 1
+        if tool == "tools/list":
+            mensagem = {"jsonrpc": "2.0", "id": self._proximo_id, "method": "tools/list", "params": {}}
+        else:
+            mensagem = {"jsonrpc": "2.0", "id": self._proximo_id, "method": "tools/call",
+                        "params": {"name": tool, "arguments": self._argumentos(tool)}}
+        inicio = time.perf_counter()
+        try:
+            resposta = await self._enviar(mensagem)
+            ok = resposta.status_code == 200 and "error" not in resposta.json()
+        except httpx.HTTPError:
+            ok = False
+        self.resultados.registrar(tool, time.perf_counter() - inicio, ok)
+
+    async def rodar(self, fim: float) -> None:
+        await self.iniciar()
+        while time.monotonic() < fim:
+            await self.chamar(self.aleatorio.choices(self._ferramentas, self._pesos)[0])
+            if self.opcoes.pausa_ms:
+                await asyncio.sleep(self.aleatorio.uniform(0, 2 * self.opcoes.pausa_ms) / 1000)
+
+
+async def executar(opcoes: argparse.Namespace) -> Resultados:
+    """Roda a carga contra opcoes.url e devolve os resultados"""
+    resultados = Resultados()
+    segredo = opcoes.jwt_secret or os.getenv("JWT_SECRET")
+    jwts = [gerar_jwt(f"tenant-carga-{i}", f"token-carga-{i}", segredo) for i in range(opcoes.tenants)]
+    limites = httpx.Limits(max_connections=opcoes.agentes, max_keepalive_connections=opcoes.agentes)
+
+    async with httpx.AsyncClient(base_url=opcoes.url, limits=limites, timeout=opcoes.timeout) as cliente:
+        agentes = [
+            Agente(cliente, jwts[i % len(jwts)], random.Random(opcoes.semente + i), opcoes, resultados)
+            for i in range(opcoes.agentes)
+        ]
+        if opcoes.aquecimento:
+            aquecimento = Resultados()
+            for agente in agentes:
+                agente.resultados = aquecimento
+            fim = time.monotonic() + opcoes.aquecimento
+            await asyncio.gather(*(agente.rodar(fim) for agente in agentes))
+            for agente in agentes:
+                agente.resultados = resultados
+
+        inicio = time.monotonic()
+        await asyncio.gather(*(agente.rodar(inicio + opcoes.duracao) for agente in agentes))
+        duracao = time.monotonic() - inicio
+
+        print(resultados.relatorio(duracao))
+        for rota in ("/mcp/stats",) + ((opcoes.mock_url,) if opcoes.mock_url else ()):
+            try:
+                resposta = await cliente.get(rota)
+                print(f"\n{rota}: {json.dumps(resposta.json(), ensure_ascii=False)}")
+            except (httpx.HTTPError, ValueError):
+                pass
+    return resultados
+
+
+async def _executar_local(opcoes: argparse.Namespace) -> None:
+    """Sobe mock e servidor MCP (uvicorn) neste processo e roda a carga contra eles"""
+    import uvicorn
+
+    from benchmarks.mock_tiny import ConfigMock, criar_app
+
+    # O cliente Tiny lê TINY_API_BASE_URL no import: definir antes de importar o app
+    os.environ["TINY_API_BASE_URL"] = f"http://127.0.0.1:{opcoes.porta_mock}/api2"
+    from src.main import app
+
+    config_mock = ConfigMock(
+        latencia_ms=opcoes.latencia_ms, jitter_ms=opcoes.jitter_ms,
+        taxa_erro_http=opcoes.taxa_erro_http, taxa_erro_tiny=opcoes.taxa_erro_tiny,
+        limite_por_minuto=opcoes.limite_por_minuto,
+        produtos=opcoes.produtos, contatos=opcoes.contatos, pedidos=opcoes.pedidos
+    )
+    servidores = [
+        uvicorn.Server(uvicorn.Config(criar_app(config_mock), port=opcoes.porta_mock, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(app, port=opcoes.porta, log_level="warning")),
+    ]
+    tarefas = [asyncio.create_task(servidor.serve()) for servidor in servidores]
+    while not all(servidor.started for servidor in servidores):
+        await asyncio.sleep(0.05)
+
+    opcoes.url = f"http://127.0.0.1:{opcoes.porta}"
+    opcoes.mock_url = f"http://127.0.0.1:{opcoes.porta_mock}/mock/estatisticas"
+    try:
+        await executar(opcoes)
+    finally:
+        for servidor in servidores:
+            servidor.should_exit = True
+        await asyncio.gather(*tarefas)
+
+
+def _mix(texto: str) -> List[Tuple[str, int]]:
+    """'tiny_produto_obter=3,tools/list=1' -> [(tool, peso), ...]"""
+    mix = []
+    for item in texto.split(","):
+        tool, _, peso = item.strip().partition("=")
+        mix.append((tool, int(peso or 1)))
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do POST /mcp")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mock-url", help="GET de estatísticas do mock (ex: http://127.0.0.1:8900/mock/estatisticas)")
+    parser.add_argument("--agentes", type=int, default=20, help="agentes (sessões) simultâneos")
+    parser.add_argument("--tenants", type=int, default=5, help="tenants distintos (um tiny_token cada)")
+    parser.add_argument("--duracao", type=float, default=30, help="segundos medidos")
+    parser.add_argument("--aquecimento", type=float, default=3, help="segundos descartados antes da medição")
+    parser.add_argument("--pausa-ms", type=float, default=0, help="pausa média entre chamadas de um agente")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--mix", type=_mix, default=MIX_PADRAO, help="tool=peso,... (padrão: leituras de agente)")
+    # Massa de dados do mock (ids sorteados dentro dela)
+    parser.add_argument("--produtos", type=int, default=2000)
+    parser.add_argument("--contatos", type=int, default=1000)
+    parser.add_argument("--pedidos", type=int, default=3000)
+    parser.add_argument("--source", default="tiny", help="source das pesquisas de produto e contato (tiny, local ou indice)")
+    parser.add_argument("--jwt-secret", help="assina os JWTs (padrão: JWT_SECRET do ambiente)")
+    # --local: mock e servidor no mesmo processo
+    parser.add_argument("--local", action="store_true")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--porta-mock", type=int, default=8900)
+    parser.add_argument("--latencia-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--taxa-erro-http", type=float)
+    parser.add_argument("--taxa-erro-tiny", type=float)
+    parser.add_argument("--limite-por-minuto", type=int)
+    opcoes = parser.parse_args()
+    asyncio.run(_executar_local(opcoes) if opcoes.local else executar(opcoes))
@@ -0,0 +1,385 @@
+"""
+Servidor local que imita a API Tiny ERP v2 (api2/*.php) para testes de carga
+
+Responde aos endpoints usados pelo TinyAPIClient com dados sintéticos
+determinísticos (produtos, contatos e pedidos), com paginação, latência,
+erros e rate limit por token configuráveis. Nada sai da máquina.
+
+Uso:
+    python -m benchmarks.mock_tiny --port 8900 --latencia-ms 120 --jitter-ms 80
+    TINY_API_BASE_URL=http://127.0.0.1:8900/api2 uvicorn src.main:app
+
+Configuração também via ambiente (MOCK_TINY_LATENCIA_MS, MOCK_TINY_TAXA_ERRO_HTTP, ...).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from src.services import json_codec
+
+# Datas das movimentações no horário de Brasília, como na Tiny
+_FUSO_TINY = timezone(timedelta(hours=-3))
+_FORMATO_DATA = "%d/%m/%Y %H:%M:%S"
+
+
+class ConfigMock:
+    """Parâmetros do mock (padrões via MOCK_TINY_*)"""
+
+    def __init__(self, **valores: Any):
+        self.latencia_ms = float(os.getenv("MOCK_TINY_LATENCIA_MS", "100"))
+        self.jitter_ms = float(os.getenv("MOCK_TINY_JITTER_MS", "50"))
+        # Cauda lenta: uma fração das respostas demora cauda_ms a mais (afeta p99)
+        self.taxa_cauda = float(os.getenv("MOCK_TINY_TAXA_CAUDA", "0.01"))
+        self.cauda_ms = float(os.getenv("MOCK_TINY_CAUDA_MS", "1500"))
+        # Erros: HTTP 503 e retorno status=Erro da Tiny
+        self.taxa_erro_http = float(os.getenv("MOCK_TINY_TAXA_ERRO_HTTP", "0"))
+        self.taxa_erro_tiny = float(os.getenv("MOCK_TINY_TAXA_ERRO_TINY", "0"))
+        # Limite da Tiny por token (0 = sem limite); acima dele, codigo_erro 6
+        self.limite_por_minuto = int(os.getenv("MOCK_TINY_LIMITE_POR_MINUTO", "0"))
+        # Massa de dados e tamanho de página das pesquisas
+        self.produtos = int(os.getenv("MOCK_TINY_PRODUTOS", "2000"))
+        self.contatos = int(os.getenv("MOCK_TINY_CONTATOS", "1000"))
+        self.pedidos = int(os.getenv("MOCK_TINY_PEDIDOS", "3000"))
+        self.por_pagina = int(os.getenv("MOCK_TINY_POR_PAGINA", "100"))
+        self.semente = int(os.getenv("MOCK_TINY_SEMENTE", "42"))
+        for nome, valor in valores.items():
+            if valor is not None:
+                setattr(self, nome, valor)
+
+
+# =============================================================================
+# DADOS SINTÉTICOS
+# =============================================================================
+
+_NOMES = ["Ana", "Bruno", "Carla", "Diego", "Élida", "Fábio", "Gisele", "Hugo", "Íris", "João",
+          "Lúcia", "Márcio", "Natália", "Otávio", "Paula", "Rafael", "Sônia", "Tiago", "Vânia", "Wagner"]
+_SOBRENOMES = ["Silva", "Souza", "Oliveira", "Pereira", "Lima", "Gonçalves", "Araújo", "Conceição",
+               "Ribeiro", "Carvalho"]
+_PRODUTOS = ["Camiseta", "Calça", "Tênis", "Boné", "Mochila", "Caneca", "Garrafa Térmica", "Fone",
+             "Carregador", "Cabo USB", "Luminária", "Cadeira", "Mesa", "Caderno", "Caneta"]
+_VARIANTES = ["Azul", "Preto", "Branco", "Vermelho", "Verde", "P", "M", "G", "GG", "Básico", "Premium"]
+_CIDADES = [("São Paulo", "SP"), ("Rio de Janeiro", "RJ"), ("Belo Horizonte", "MG"), ("Curitiba", "PR"),
+            ("Porto Alegre", "RS"), ("Salvador", "BA"), ("Recife", "PE"), ("Goiânia", "GO")]
+_SITUACOES_PEDIDO = ["Em aberto", "Aprovado", "Preparando envio", "Faturado", "Enviado", "Entregue", "Cancelado"]
+
+
+class DadosMock:
+    """Massa de dados gerada uma vez, na mesma ordem para a mesma semente"""
+
+    def __init__(self, config: ConfigMock):
+        aleatorio = random.Random(config.semente)
+        self.produtos: Dict[str, Dict[str, Any]] = {}
+        self.estoques: Dict[str, float] = {}
+        for i in range(1, config.produtos + 1):
+            id_produto = str(100000 + i)
+            self.produtos[id_produto] = {
+                "id": id_produto,
+                "codigo": f"SKU-{i:05d}",
+                "nome": f"{aleatorio.choice(_PRODUTOS)} {aleatorio.choice(_VARIANTES)} {i}",
+                "preco": f"{aleatorio.uniform(5, 500):.2f}",
+                "preco_promocional": "0.00",
+                "unidade": "UN",
+                "gtin": f"789{i:010d}",
+                "tipoVariacao": "N",
+                "localizacao": "",
+                "situacao": "A",
+                "data_criacao": "01/01/2024 08:00:00"
+            }
+            self.estoques[id_produto] = float(aleatorio.randint(0, 200))
+
+        self.contatos: Dict[str, Dict[str, Any]] = {}
+        for i in range(1, config.contatos + 1):
+            id_contato = str(200000 + i)
+            cidade, uf = aleatorio.choice(_CIDADES)
+            self.contatos[id_contato] = {
+                "id": id_contato,
+                "codigo": f"C{i:05d}",
+                "nome": f"{aleatorio.choice(_NOMES)} {aleatorio.choice(_SOBRENOMES)} {aleatorio.choice(_SOBRENOMES)}",
+                "fantasia": "",
+                "tipo_pessoa": "F",
+                "cpf_cnpj": f"{aleatorio.randint(10 ** 10, 10 ** 11 - 1)}",
+                "endereco": "Rua Exemplo",
+                "numero": str(aleatorio.randint(1, 2000)),
+                "bairro": "Centro",
+                "cep": f"{aleatorio.randint(10000, 99999)}-000",
+                "cidade": cidade,
+                "uf": uf,
+                "email": f"cliente{i}@exemplo.com.br",
+                "fone": "",
+                "situacao": "A"
+            }
+
+        ids_contatos = list(self.contatos)
+        self.pedidos: Dict[str, Dict[str, Any]] = {}
+        for i in range(1, config.pedidos + 1):
+            id_pedido = str(300000 + i)
+            contato = self.contatos[aleatorio.choice(ids_contatos)] if ids_contatos else {"nome": "Consumidor"}
+            self.pedidos[id_pedido] = {
+                "id": id_pedido,
+                "numero": str(i),
+                "numero_ecommerce": "",
+                "data_pedido": f"{aleatorio.randint(1, 28):02d}/{aleatorio.randint(1, 12):02d}/2024",
+                "data_prevista": "",
+                "nome": contato["nome"],
+                "valor": f"{aleatorio.uniform(20, 3000):.2f}",
+                "id_vendedor": "0",
+                "nome_vendedor": "",
+                "situacao": aleatorio.choice(_SITUACOES_PEDIDO),
+                "codigo_rastreamento": ""
+            }
+        self.movimentacoes: List[Dict[str, Any]] = []
+        self._proximo_id = 900000
+
+    def novo_id(self) -> str:
+        self._proximo_id += 1
+        return str(self._proximo_id)
+
+    def movimentar(self, id_produto: str, tipo: str, quantidade: float) -> Dict[str, Any]:
+        """Aplica e registra uma movimentação no depósito único (Geral)"""
+        atual = self.estoques[id_produto]
+        self.estoques[id_produto] = atual + quantidade if tipo == "E" else atual - quantidade if tipo == "S" else quantidade
+        movimentacao = {
+            "id": self.novo_id(), "idProduto": id_produto, "tipo": tipo, "quantidade": quantidade,
+            "deposito": "Geral", "data": datetime.now(_FUSO_TINY).strftime(_FORMATO_DATA)
+        }
+        self.movimentacoes.append(movimentacao)
+        return movimentacao
+
+
+# =============================================================================
+# RESPOSTAS NO FORMATO TINY
+# =============================================================================
+
+def _ok(**campos: Any) -> Dict[str, Any]:
+    return {"retorno": {"status_processamento": "3", "status": "OK", **campos}}
+
+
+def _erro(codigo: str, mensagem: str) -> Dict[str, Any]:
+    return {"retorno": {
+        "status_processamento": "2",
+        "status": "Erro",
+        "codigo_erro": codigo,
+        "erros": [{"erro": mensagem}]
+    }}
+
+
+def _pagina(
+    registros: List[Dict[str, Any]],
+    chave_lista: str,
+    chave_item: str,
+    parametros: Dict[str, str],
+    por_pagina: int
+) -> Dict[str, Any]:
+    termo = (parametros.get("pesquisa") or "").lower()
+    if termo:
+        registros = [r for r in registros if termo in r.get("nome", "").lower()]
+    if not registros:
+        return _erro("20", "A consulta não retornou registros")
+
+    numero_paginas = (len(registros) + por_pagina - 1) // por_pagina
+    try:
+        pagina = max(1, int(parametros.get("pagina") or 1))
+    except ValueError:
+        pagina = 1
+    if pagina > numero_paginas:
+        return _erro("20", "A consulta não retornou registros")
+
+    inicio = (pagina - 1) * por_pagina
+    itens = [{chave_item: r} for r in registros[inicio:inicio + por_pagina]]
+    return _ok(pagina=pagina, numero_paginas=numero_paginas, **{chave_lista: itens})
+
+
+def _obter(tabela: Dict[str, Dict[str, Any]], chave: str, parametros: Dict[str, str]) -> Dict[str, Any]:
+    registro = tabela.get(parametros.get("id", ""))
+    if registro is None:
+        return _erro("20", "Registro não encontrado")
+    return _ok(**{chave: registro})
+
+
+def _inclusao(dados: DadosMock, **extras: Any) -> Dict[str, Any]:
+    return _ok(registros=[{"registro": {"sequencia": "1", "status": "OK", "id": dados.novo_id(), **extras}}])
+
+
+class MockTiny:
+    """Estado do mock: dados, janelas de rate limit e contadores"""
+
+    def __init__(self, config: ConfigMock):
+        self.config = config
+        self.dados = DadosMock(config)
+        self._aleatorio = random.Random(config.semente + 1)
+        self._janelas: Dict[str, "deque[float]"] = {}
+        self.chamadas: Counter = Counter()
+        self.bloqueadas = 0
+        self.erros_injetados = 0
+
+    def _excedeu_limite(self, token: str) -> bool:
+        if self.config.limite_por_minuto <= 0:
+            return False
+        agora = time.monotonic()
+        janela = self._janelas.setdefault(token, deque())
+        while janela and janela[0] <= agora - 60:
+            janela.popleft()
+        if len(janela) >= self.config.limite_por_minuto:
+            return True
+        janela.append(agora)
+        return False
+
+    def _latencia(self) -> float:
+        espera = self.config.latencia_ms + self._aleatorio.uniform(0, self.config.jitter_ms)
+        if self._aleatorio.random() < self.config.taxa_cauda:
+            espera += self.config.cauda_ms
+        return espera / 1000
+
+    def _responder(self, endpoint: str, parametros: Dict[str, str]) -> Dict[str, Any]:
+        dados, por_pagina = self.dados, self.config.por_pagina
+
+        if endpoint == "produtos.pesquisa":
+            return _pagina(list(dados.produtos.values()), "produtos", "produto", parametros, por_pagina)
+        if endpoint == "produto.obter":
+            return _obter(dados.produtos, "produto", parametros)
+        if endpoint == "produto.obter.estoque":
+            produto = dados.produtos.get(parametros.get("id", ""))
+            if produto is None:
+                return _erro("20", "Registro não encontrado")
+            saldo = dados.estoques[produto["id"]]
+            return _ok(produto={
+                "id": produto["id"], "nome": produto["nome"], "codigo": produto["codigo"], "unidade": "UN",
+                "saldo": saldo, "saldoReservado": 0,
+                "depositos": [{"deposito": {"nome": "Geral", "desconsiderar": "N", "saldo": saldo}}]
+            })
+        if endpoint == "produto.atualizar.estoque":
+            if parametros.get("id") not in dados.produtos:
+                return _erro("20", "Registro não encontrado")
+            try:
+                dados.movimentar(parametros["id"], "B", float(parametros.get("estoque") or 0))
+            except ValueError:
+                return _erro("31", "Estoque inválido")
+            return _ok(registros=[{"registro": {"sequencia": "1", "status": "OK", "id": parametros["id"]}}])
+        if endpoint == "movimentacao.estoque.incluir":
+            try:
+                movimentacao = json_codec.loads(parametros.get("movimentacao") or "{}")
+                id_produto = str(movimentacao.get("idProduto") or "")
+                quantidade = float(movimentacao.get("quantidade") or 0)
+            except (ValueError, AttributeError):
+                return _erro("31", "Movimentação inválida")
+            if id_produto not in dados.produtos:
+                return _erro("20", "Registro não encontrado")
+            registro = dados.movimentar(id_produto, str(movimentacao.get("tipo") or "E").upper(), quantidade)
+            return _ok(registros=[{"registro": {"sequencia": "1", "status": "OK", "id": registro["id"]}}])
+        if endpoint == "movimentacoes.estoque.pesquisa":
+            inicio = parametros.get("dataInicio")
+            movimentacoes = dados.movimentacoes
+            if inicio:
+                try:
+                    desde = datetime.strptime(inicio, _FORMATO_DATA)
+                except ValueError:
+                    desde = datetime.strptime(inicio[:10], "%d/%m/%Y")
+                movimentacoes = [m for m in movimentacoes if datetime.strptime(m["data"], _FORMATO_DATA) >= desde]
+            if parametros.get("idProduto"):
+                movimentacoes = [m for m in movimentacoes if m["idProduto"] == parametros["idProduto"]]
+            return _pagina(movimentacoes, "movimentacoes", "movimentacao", parametros, por_pagina)
+        if endpoint == "depositos.lista":
+            return _ok(depositos=[{"deposito": {"id": "1", "nome": "Geral", "desconsiderar": "N", "padrao": "S"}}])
+        if endpoint == "deposito.obter.estoque":
+            if parametros.get("id") != "1":
+                return _erro("20", "Registro não encontrado")
+            return _ok(deposito={"id": "1", "nome": "Geral", "produtos": [
+                {"produto": {"id": p["id"], "codigo": p["codigo"], "nome": p["nome"], "unidade": "UN",
+                             "saldo": dados.estoques[p["id"]]}}
+                for p in dados.produtos.values()
+            ]})
+        if endpoint == "contatos.pesquisa":
+            return _pagina(list(dados.contatos.values()), "contatos", "contato", parametros, por_pagina)
+        if endpoint == "contato.obter":
+            return _obter(dados.contatos, "contato", parametros)
+        if endpoint == "pedidos.pesquisa":
+            return _pagina(list(dados.pedidos.values()), "pedidos", "pedido", parametros, por_pagina)
+        if endpoint == "pedido.obter":
+            return _obter(dados.pedidos, "pedido", parametros)
+        if endpoint == "pedido.incluir":
+            return _inclusao(dados, numero=str(len(dados.pedidos) + self.chamadas[endpoint]))
+        if endpoint.endswith(".incluir"):
+            return _inclusao(dados)
+        if endpoint == "info":
+            return _ok(conta={"razao_social": "Empresa Mock", "fantasia": "Mock Tiny"})
+        # Demais endpoints: sucesso sem dados (suficiente para medir o servidor MCP)
+        return _ok()
+
+    async def atender(self, endpoint: str, corpo: bytes) -> Tuple[int, Dict[str, Any]]:
+        parametros = {chave: valores[0] for chave, valores in parse_qs(corpo.decode("utf-8")).items()}
+        self.chamadas[endpoint] += 1
+
+        await asyncio.sleep(self._latencia())
+
+        token = parametros.get("token", "")
+        if not token:
+            return 200, _erro("2", "Token inválido ou não informado")
+        if self._excedeu_limite(token):
+            self.bloqueadas += 1
+            return 200, _erro("6", "API Bloqueada - Excedido o número de acessos a API")
+        if self._aleatorio.random() < self.config.taxa_erro_http:
+            self.erros_injetados += 1
+            return 503, {"erro": "Serviço indisponível (mock)"}
+        if self._aleatorio.random() < self.config.taxa_erro_tiny:
+            self.erros_injetados += 1
+            return 200, _erro("35", "Erro simulado pelo mock")
+        return 200, self._responder(endpoint, parametros)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "chamadas": sum(self.chamadas.values()),
+            "por_endpoint": dict(self.chamadas.most_common()),
+            "bloqueadas_rate_limit": self.bloqueadas,
+            "erros_injetados": self.erros_injetados
+        }
+
+
+def criar_app(config: Optional[ConfigMock] = None) -> FastAPI:
+    """App FastAPI do mock (POST /api2/{endpoint}.php e GET /mock/estatisticas)"""
+    mock = MockTiny(config or ConfigMock())
+    app = FastAPI(title="Mock Tiny API v2", docs_url=None, redoc_url=None, openapi_url=None)
+    app.state.mock = mock
+
+    @app.post("/api2/{arquivo}")
+    async def api2(arquivo: str, request: Request):
+        endpoint = arquivo[:-4] if arquivo.endswith(".php") else arquivo
+        status, corpo = await mock.atender(endpoint, await request.body())
+        return Response(content=json_codec.dumps(corpo), status_code=status, media_type="application/json")
+
+    @app.get("/mock/estatisticas")
+    async def estatisticas():
+        return JSONResponse(content=mock.estatisticas())
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock local da API Tiny v2 para testes de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latencia-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--taxa-cauda", type=float)
+    parser.add_argument("--cauda-ms", type=float)
+    parser.add_argument("--taxa-erro-http", type=float)
+    parser.add_argument("--taxa-erro-tiny", type=float)
+    parser.add_argument("--limite-por-minuto", type=int)
+    parser.add_argument("--produtos", type=int)
+    parser.add_argument("--contatos", type=int)
+    parser.add_argument("--pedidos", type=int)
+    parser.add_argument("--por-pagina", type=int)
+    opcoes = vars(parser.parse_args())
+    host, porta = opcoes.pop("host"), opcoes.pop("port")
+    print(f"Mock Tiny em http://{host}:{porta}/api2")
+    uvicorn.run(criar_app(ConfigMock(**opcoes)), host=host, port=porta, log_level="warning")
@@ -0,0 +1,157 @@
+"""
+Respostas pré-serializadas do catálogo de tools
+O TOOLS_CATALOG é estático: cada representação é serializada uma única vez,
+com ETag e variantes gzip/brotli, no startup do app (preparar_catalogo).
+"""
+
+import gzip
+import hashlib
+import os
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from src.api.mcp_tools import Tool, get_all_tools
+from src.services import json_codec
+
+try:
+    import brotli
+except ImportError:  # está no requirements.txt; sem ele (instalação parcial), só gzip
+    brotli = None
+
+CATALOGO_CACHE_MAX_AGE = int(os.getenv("CATALOGO_CACHE_MAX_AGE", "300"))
+
+# Corpos menores que isso não compensam compressão
+_MIN_COMPRESSAO = 1024
+
+
+class FragmentoJSON(bytes):
+    """JSON já serializado, inserido como está na mensagem JSON-RPC"""
+
+
+# =============================================================================
+# RESPOSTA ESTÁTICA (ETag + variantes comprimidas)
+# =============================================================================
+
+def _aceita(accept_encoding: str, codificacao: str) -> bool:
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().partition(";")
+        if nome.strip().lower() in (codificacao, "*"):
+            return parametros.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+class RespostaEstatica:
+    """Corpo fixo com ETag forte, If-None-Match (304) e variantes br/gzip"""
+
+    def __init__(self, corpo: bytes, media_type: str, max_age: int = CATALOGO_CACHE_MAX_AGE):
+        self.corpo = corpo
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(corpo).hexdigest()[:32] + '"'
+        self.cache_control = f"public, max-age={max_age}"
+        self.variantes: Dict[str, bytes] = {}
+        if len(corpo) >= _MIN_COMPRESSAO:
+            self.variantes["gzip"] = gzip.compress(corpo, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variantes["br"] = brotli.compress(corpo, quality=11)
+
+    def _nao_modificado(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        return "*" in etags or self.etag in etags
+
+    def responder(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if self._nao_modificado(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        accept_encoding = request.headers.get("accept-encoding", "")
+        for codificacao in ("br", "gzip"):
+            variante = self.variantes.get(codificacao)
+            if variante is not None and _aceita(accept_encoding, codificacao):
+                headers["Content-Encoding"] = codificacao
+                return Response(content=variante, media_type=self.media_type, headers=headers)
+        return Response(content=self.corpo, media_type=self.media_type, headers=headers)
+
+
+# =============================================================================
+# CATEGORIAS (docs)
+# =============================================================================
+
+# (chave no JSON, título na página HTML)
+CATEGORIAS: List[Tuple[str, str]] = [
+    ("pedidos", "Pedidos"),
+    ("produtos", "Produtos"),
+    ("contatos", "Contatos"),
+    ("notas_fiscais", "Notas Fiscais"),
+    ("financeiro", "Financeiro"),
+    ("crm", "CRM"),
+    ("outros", "Outros"),
+]
+
+
+def categoria_da_tool(nome: str) -> str:
+    if "pedido" in nome:
+        return "pedidos"
+    if "produto" in nome:
+        return "produtos"
+    if "contato" in nome:
+        return "contatos"
+    if "nota" in nome or "nf" in nome:
+        return "notas_fiscais"
+    if "conta" in nome or "boleto" in nome:
+        return "financeiro"
+    if "crm" in nome or "oportunidade" in nome:
+        return "crm"
+    return "outros"
+
+
+def tools_por_categoria() -> Dict[str, List[Tool]]:
+    categorias: Dict[str, List[Tool]] = {chave: [] for chave, _ in CATEGORIAS}
+    for tool in get_all_tools():
+        categorias[categoria_da_tool(tool.name)].append(tool)
+    return categorias
+
+
+# =============================================================================
+# REPRESENTAÇÕES DO CATÁLOGO (calculadas uma vez)
+# =============================================================================
+
+@lru_cache(maxsize=None)
+def tools_dump() -> Tuple[Dict[str, Any], ...]:
+    """model_dump() de cada tool (somente leitura: compartilhado entre requisições)"""
+    return tuple(tool.model_dump() for tool in get_all_tools())
+
+
+@lru_cache(maxsize=None)
+def resultado_tools_list() -> FragmentoJSON:
+    """result do JSON-RPC tools/list já serializado"""
+    return FragmentoJSON(json_codec.dumps({"tools": list(tools_dump())}))
+
+
+@lru_cache(maxsize=None)
+def resposta_tools() -> RespostaEstatica:
+    """Corpo de /tools e /mcp/tools"""
+    tools = tools_dump()
+    return RespostaEstatica(json_codec.dumps({"total": len(tools), "tools": list(tools)}), "application/json")
+
+
+@lru_cache(maxsize=None)
+def resposta_docs_json() -> RespostaEstatica:
+    """Corpo de /docs-mcp/json"""
+    categorias = {
+        chave: [tool.model_dump() for tool in tools]
+        for chave, tools in tools_por_categoria().items()
+    }
+    conteudo = {"total_tools": len(get_all_tools()), "categorias": categorias}
+    return RespostaEstatica(json_codec.dumps(conteudo), "application/json")
+
+
+def preparar_catalogo() -> None:
+    """Serializa e comprime as representações agora (lifespan), não na primeira requisição"""
+    resultado_tools_list()
+    resposta_tools()
+    resposta_docs_json()
@@ -1,45 +1,26 @@
 """
 Endpoints de documentação visual
 """
-from fastapi import APIRouter
-from fastapi.responses import HTMLResponse, JSONResponse
+import json
+from functools import lru_cache
+
+from fastapi import APIRouter, Request
+from fastapi.responses import HTMLResponse
 from src.api.mcp_tools import TOOLS_CATALOG as TOOLS
+from src.api.catalogo import CATEGORIAS, RespostaEstatica, resposta_docs_json, tools_por_categoria
 
 router = APIRouter(prefix="/docs-mcp", tags=["📚 Documentação MCP"])
 
 
-@router.get("/", response_class=HTMLResponse, summary="Documentação visual das tools MCP")
-async def docs_html():
+def renderizar_docs_html() -> str:
     """
-    Página HTML com documentação visual de todas as 77 tools MCP organizadas por categoria
+    Monta a página HTML com documentação visual de todas as 77 tools MCP organizadas por categoria.
+    Depende só do TOOLS_CATALOG (estático): é renderizada uma vez por processo.
     """
 
-    # Organizar tools por categoria
-    categorias = {
-        "Pedidos": [],
-        "Produtos": [],
-        "Contatos": [],
-        "Notas Fiscais": [],
-        "Financeiro": [],
-        "CRM": [],
-        "Outros": []
-    }
-
-    for tool in TOOLS:
-        if "pedido" in tool.name:
-            categorias["Pedidos"].append(tool)
-        elif "produto" in tool.name:
-            categorias["Produtos"].append(tool)
-        elif "contato" in tool.name:
-            categorias["Contatos"].append(tool)
-        elif "nota" in tool.name or "nf" in tool.name:
-            categorias["Notas Fiscais"].append(tool)
-        elif "conta" in tool.name or "boleto" in tool.name:
-            categorias["Financeiro"].append(tool)
-        elif "crm" in tool.name or "oportunidade" in tool.name:
-            categorias["CRM"].append(tool)
-        else:
-            categorias["Outros"].append(tool)
+    # Organizar tools por categoria (título exibido -> tools)
+    titulos = dict(CATEGORIAS)
+    categorias = {titulos[chave]: tools for chave, tools in tools_por_categoria().items()}
 
     # Gerar HTML
     html = """
@@ -212,7 +193,6 @@ async def docs_html():
 """
 
         for tool in tools:
-            import json
             schema_json = json.dumps(tool.inputSchema, indent=2, ensure_ascii=False)
 
             html += f"""
@@ -253,47 +233,28 @@ async def docs_html():
 </html>
 """
 
-    return HTMLResponse(content=html)
+    return html
 
 
-@router.get("/json", summary="Lista todas as tools em formato JSON")
-async def docs_json():
+@lru_cache(maxsize=None)
+def resposta_docs_html() -> RespostaEstatica:
+    """Página renderizada + variantes gzip/brotli (preparada no startup do app)"""
+    return RespostaEstatica(renderizar_docs_html().encode("utf-8"), "text/html; charset=utf-8")
+
+
+@router.get("/", response_class=HTMLResponse, summary="Documentação visual das tools MCP")
+async def docs_html(request: Request):
     """
-    Retorna todas as tools organizadas por categoria em formato JSON
+    Página HTML com documentação visual de todas as 77 tools MCP organizadas por categoria
+    (pré-renderizada, com ETag e gzip/brotli)
     """
-    categorias = {
-        "pedidos": [],
-        "produtos": [],
-        "contatos": [],
-        "notas_fiscais": [],
-        "financeiro": [],
-        "crm": [],
-        "outros": []
-    }
-
-    for tool in TOOLS:
-        tool_data = {
-            "name": tool.name,
-            "description": tool.description,
-            "inputSchema": tool.inputSchema
-        }
+    return resposta_docs_html().responder(request)
 
-        if "pedido" in tool.name:
-            categorias["pedidos"].append(tool_data)
-        elif "produto" in tool.name:
-            categorias["produtos"].append(tool_data)
-        elif "contato" in tool.name:
-            categorias["contatos"].append(tool_data)
-        elif "nota" in tool.name or "nf" in tool.name:
-            categorias["notas_fiscais"].append(tool_data)
-        elif "conta" in tool.name or "boleto" in tool.name:
-            categorias["financeiro"].append(tool_data)
-        elif "crm" in tool.name or "oportunidade" in tool.name:
-            categorias["crm"].append(tool_data)
-        else:
-            categorias["outros"].append(tool_data)
 
-    return JSONResponse(content={
-        "total_tools": len(TOOLS),
-        "categorias": categorias
-    })
+@router.get("/json", summary="Lista todas as tools em formato JSON")
+async def docs_json(request: Request):
+    """
+    Retorna todas as tools organizadas por categoria em formato JSON
+    (pré-serializado, com ETag e gzip/brotli)
+    """
+    return resposta_docs_json().responder(request)
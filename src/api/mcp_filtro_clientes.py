@@ -2,21 +2,43 @@
 Ferramenta MCP para buscar clientes no CSV exportado do Tiny
 Busca inteligente por CPF, Email ou Telefone
 """
+import asyncio
 import csv
+import os
 import re
+import threading
 from typing import Dict, Any, Optional, List
 
+from src.services.log import get_logger
+
+log = get_logger(__name__)
+
+CLIENTES_CSV_PATH = os.getenv("CLIENTES_CSV_PATH", "/mnt/user-data/uploads/contatos_teste.csv")
+
+_NAO_DIGITO = re.compile(r'[^\d]')
+
+
 class ClienteFiltroCSV:
-    """Filtro inteligente de clientes usando CSV exportado"""
+    """
+    Filtro inteligente de clientes usando CSV exportado.
+
+    Cada linha é normalizada uma única vez no carregamento e indexada:
+    CPF/CNPJ e email em hash, telefones pelos últimos 8 dígitos.
+    """
     
-    def __init__(self, csv_path: str = "/mnt/user-data/uploads/contatos_teste.csv"):
+    def __init__(self, csv_path: str = CLIENTES_CSV_PATH):
         self.csv_path = csv_path
         self.clientes = []
+        self.mtime: Optional[float] = None
+        self._por_documento: Dict[str, Dict[str, Any]] = {}
+        self._por_email: Dict[str, Dict[str, Any]] = {}
+        self._por_telefone: Dict[str, List[Dict[str, Any]]] = {}
         self._carregar_csv()
     
     def _carregar_csv(self):
-        """Carrega CSV e prepara dados"""
+        """Carrega CSV, normaliza e monta os índices"""
         try:
+            self.mtime = os.stat(self.csv_path).st_mtime
             with open(self.csv_path, 'r', encoding='latin-1') as f:
                 reader = csv.DictReader(f, delimiter=';')
                 for row in reader:
@@ -31,23 +53,42 @@ class ClienteFiltroCSV:
                         'estado': row.get('Estado', '')
                     }
                     self.clientes.append(cliente)
-            print(f"✅ CSV carregado: {len(self.clientes)} clientes")
+                    self._indexar(cliente)
+            log.info("CSV carregado: %d clientes", len(self.clientes), extra={"csv": self.csv_path})
         except Exception as e:
-            print(f"❌ Erro ao carregar CSV: {e}")
+            log.error("Erro ao carregar CSV %s: %s", self.csv_path, e)
+
+    def _indexar(self, cliente: Dict[str, Any]):
+        """Adiciona o cliente aos índices (primeira ocorrência no arquivo vence)"""
+        documento = self._limpar_cpf_cnpj(cliente['cpf_cnpj'])
+        if documento:
+            self._por_documento.setdefault(documento, cliente)
+
+        email = self._limpar_email(cliente['email'])
+        if email:
+            self._por_email.setdefault(email, cliente)
+
+        sufixos = set()
+        for campo in ('celular', 'fone'):
+            telefone = self._limpar_telefone(cliente[campo])
+            if len(telefone) >= 8:
+                sufixos.add(telefone[-8:])
+        for sufixo in sufixos:
+            self._por_telefone.setdefault(sufixo, []).append(cliente)
     
     def _limpar_cpf_cnpj(self, valor: str) -> str:
         """Remove formatação de CPF/CNPJ"""
         if not valor:
             return ""
         # Remove tudo que não é número
-        return re.sub(r'[^\d]', '', valor)
+        return _NAO_DIGITO.sub('', valor)
     
     def _limpar_telefone(self, valor: str) -> str:
         """Remove formatação de telefone"""
         if not valor:
             return ""
         # Remove tudo que não é número
-        return re.sub(r'[^\d]', '', valor)
+        return _NAO_DIGITO.sub('', valor)
     
     def _limpar_email(self, valor: str) -> str:
         """Normaliza email"""
@@ -58,57 +99,33 @@ class ClienteFiltroCSV:
     def buscar_por_cpf(self, cpf: str) -> Optional[Dict[str, Any]]:
         """Busca cliente por CPF (com ou sem formatação)"""
         cpf_limpo = self._limpar_cpf_cnpj(cpf)
-        
-        for cliente in self.clientes:
-            cpf_cliente = self._limpar_cpf_cnpj(cliente['cpf_cnpj'])
-            if cpf_cliente == cpf_limpo and len(cpf_limpo) == 11:  # CPF tem 11 dígitos
-                return cliente
-        
-        return None
+        if len(cpf_limpo) != 11:  # CPF tem 11 dígitos
+            return None
+        return self._por_documento.get(cpf_limpo)
     
     def buscar_por_cnpj(self, cnpj: str) -> Optional[Dict[str, Any]]:
         """Busca cliente por CNPJ (com ou sem formatação)"""
         cnpj_limpo = self._limpar_cpf_cnpj(cnpj)
-        
-        for cliente in self.clientes:
-            cnpj_cliente = self._limpar_cpf_cnpj(cliente['cpf_cnpj'])
-            if cnpj_cliente == cnpj_limpo and len(cnpj_limpo) == 14:  # CNPJ tem 14 dígitos
-                return cliente
-        
-        return None
+        if len(cnpj_limpo) != 14:  # CNPJ tem 14 dígitos
+            return None
+        return self._por_documento.get(cnpj_limpo)
     
     def buscar_por_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Busca cliente por email"""
         email_limpo = self._limpar_email(email)
-        
-        for cliente in self.clientes:
-            email_cliente = self._limpar_email(cliente['email'])
-            if email_cliente == email_limpo and email_limpo:
-                return cliente
-        
-        return None
+        if not email_limpo:
+            return None
+        return self._por_email.get(email_limpo)
     
     def buscar_por_telefone(self, telefone: str) -> List[Dict[str, Any]]:
-        """Busca cliente por telefone (celular ou fone)"""
+        """Busca cliente por telefone (celular ou fone) pelos últimos 8 dígitos"""
         telefone_limpo = self._limpar_telefone(telefone)
-        resultados = []
         
         # Precisa ter pelo menos 8 dígitos
         if len(telefone_limpo) < 8:
-            return resultados
-        
-        for cliente in self.clientes:
-            celular_limpo = self._limpar_telefone(cliente['celular'])
-            fone_limpo = self._limpar_telefone(cliente['fone'])
-            
-            # Busca pelos últimos dígitos (mais flexível)
-            if (telefone_limpo in celular_limpo or 
-                telefone_limpo in fone_limpo or
-                celular_limpo.endswith(telefone_limpo[-8:]) or  # Últimos 8 dígitos
-                fone_limpo.endswith(telefone_limpo[-8:])):
-                resultados.append(cliente)
+            return []
         
-        return resultados
+        return list(self._por_telefone.get(telefone_limpo[-8:], []))
     
     def buscar_inteligente(self, dado: str) -> Dict[str, Any]:
         """
@@ -205,6 +222,38 @@ class ClienteFiltroCSV:
         }
 
 
+# =============================================================================
+# INSTÂNCIA COMPARTILHADA (recarrega quando o arquivo muda)
+# =============================================================================
+
+_filtros: Dict[str, ClienteFiltroCSV] = {}
+# Serializa as recargas (obter_filtro roda em threads via asyncio.to_thread)
+_recarga = threading.Lock()
+
+
+def _mtime(csv_path: str) -> Optional[float]:
+    try:
+        return os.stat(csv_path).st_mtime
+    except OSError:
+        return None
+
+
+def precisa_recarregar(csv_path: str = CLIENTES_CSV_PATH) -> bool:
+    """True se o filtro ainda não foi carregado ou o CSV mudou no disco"""
+    filtro = _filtros.get(csv_path)
+    return filtro is None or filtro.mtime != _mtime(csv_path)
+
+
+def obter_filtro(csv_path: str = CLIENTES_CSV_PATH) -> ClienteFiltroCSV:
+    """Retorna o filtro do processo, recarregando se o mtime do CSV mudou"""
+    if precisa_recarregar(csv_path):
+        with _recarga:
+            # Outra thread pode ter recarregado enquanto esta esperava o lock
+            if precisa_recarregar(csv_path):
+                _filtros[csv_path] = ClienteFiltroCSV(csv_path)
+    return _filtros[csv_path]
+
+
 # =============================================================================
 # TOOL MCP
 # =============================================================================
@@ -232,7 +281,11 @@ async def mcp_filtro_clientes_excel(
         }
     """
     try:
-        filtro = ClienteFiltroCSV()
+        if precisa_recarregar():
+            # Carga do CSV é pesada: fora do event loop
+            filtro = await asyncio.to_thread(obter_filtro)
+        else:
+            filtro = obter_filtro()
         resultado = filtro.buscar_inteligente(dado)
         return resultado
     except Exception as e:
@@ -248,8 +301,6 @@ async def mcp_filtro_clientes_excel(
 # =============================================================================
 
 if __name__ == "__main__":
-    import asyncio
-    
     async def testar():
         # Teste CPF sem formatação
         print("\n=== TESTE 1: CPF sem formatação ===")
@@ -5,17 +5,39 @@ Servidor completo com 68+ ferramentas para integração Tiny ERP
 
 from fastapi import APIRouter, Request, Response, HTTPException, Header
 from fastapi.responses import StreamingResponse, JSONResponse
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable, NamedTuple, Tuple, Union
+from contextvars import ContextVar
 from pydantic import BaseModel
 from datetime import datetime
 import json
 import asyncio
 import uuid
 import base64
+import logging
+import os
+import time
 
 # Imports do projeto
 from src.services.tiny_client import TinyAPIClient
-from src.api.mcp_tools import get_all_tools, get_tool_by_name, get_tools_count
+from src.services.rate_limiter import scheduler
+from src.services.cache import response_cache
+from src.services.session_store import SessionStore
+from src.services.single_flight import single_flight
+from src.services.resiliencia import disjuntores
+from src.services.idempotencia import idempotency_store
+from src.services.webhooks import fila_webhooks
+from src.services.espelho import espelho_produtos, espelho_contatos, ESPELHOS, SOURCES_LOCAIS
+from src.services.snapshot_estoque import snapshot_estoque
+from src.api.mcp_tools import get_all_tools, get_tool_by_name, get_tools_count, eh_tool_leitura
+from src.api.catalogo import FragmentoJSON, resultado_tools_list, resposta_tools
+from src.services import json_codec
+from src.services.json_codec import MCP_JSON_COMPACTO
+from src.services.jwt_cache import jwt_cache, JWT_SECRET, JWT_ALGORITHMS
+from src.services.log import get_logger
+from src.services.projecao import projetar, validar_visao
+from src.services.metrics import MCP_TOOL_SECONDS, MCP_TOOL_CALLS_TOTAL, MCP_TOOL_IN_FLIGHT, classe_erro_tiny
+
+log = get_logger(__name__)
 
 router = APIRouter(tags=["MCP Protocol"])
 
@@ -26,34 +48,81 @@ router = APIRouter(tags=["MCP Protocol"])
 MCP_PROTOCOL_VERSION = "2025-06-18"
 SUPPORTED_VERSIONS = ["2025-06-18", "2025-03-26", "2024-11-05"]
 
+# Batch JSON-RPC: tamanho máximo e quantas chamadas rodam ao mesmo tempo
+MCP_BATCH_MAX = int(os.getenv("MCP_BATCH_MAX", "50"))
+MCP_BATCH_CONCORRENCIA = int(os.getenv("MCP_BATCH_CONCORRENCIA", "8"))
+
+# Intervalo mínimo (s) entre notifications/progress de uma mesma chamada
+MCP_PROGRESSO_INTERVALO = float(os.getenv("MCP_PROGRESSO_INTERVALO", "0.5"))
+
+# Progresso da tools/call em andamento (concluídos, total); só existe quando a
+# chamada trouxe _meta.progressToken e a resposta é um stream SSE
+Progresso = Callable[[int, int], None]
+_progresso: ContextVar[Optional[Progresso]] = ContextVar("mcp_progresso", default=None)
+
 # =============================================================================
 # AUTHENTICATION
 # =============================================================================
 
+def _decodificar_jwt(token: str) -> Dict[str, Any]:
+    """
+    Payload do JWT. Com JWT_SECRET, verifica assinatura e exp via python-jose;
+    sem ele, só decodifica (comportamento original) e confere o exp.
+    """
+    if JWT_SECRET:
+        try:
+            from jose import jwt, JWTError, ExpiredSignatureError
+        except ImportError:
+            # Com JWT_SECRET nunca cai para a decodificação sem verificação
+            log.error("JWT_SECRET configurado, mas python-jose não está instalado")
+            raise HTTPException(status_code=500, detail="Verificação de JWT indisponível no servidor")
+
+        try:
+            return jwt.decode(token, JWT_SECRET, algorithms=JWT_ALGORITHMS)
+        except ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expirado")
+        except JWTError as e:
+            raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
+
+    # Decodifica JWT manualmente (sem validação de assinatura)
+    parts = token.split(".")
+    if len(parts) != 3:
+        raise HTTPException(status_code=401, detail="Invalid token format")
+
+    # Decodifica payload (segunda parte do JWT)
+    payload_encoded = parts[1]
+    padding = 4 - (len(payload_encoded) % 4)
+    if padding != 4:
+        payload_encoded += "=" * padding
+
+    payload_json = base64.urlsafe_b64decode(payload_encoded)
+    payload = json.loads(payload_json)
+
+    exp = payload.get("exp")
+    if exp is not None and float(exp) <= time.time():
+        raise HTTPException(status_code=401, detail="Token expirado")
+    return payload
+
+
 async def get_auth_data(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
     """
     Extrai dados de autenticação do JWT token.
     Pega tiny_token direto do JWT.
+
+    O resultado fica no jwt_cache (LRU por hash do token, até o exp):
+    requisições seguintes com o mesmo token não decodificam nem verificam de novo.
     """
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization required")
 
     token = authorization.replace("Bearer ", "").strip()
 
-    # Decodifica JWT manualmente (sem validação de assinatura)
-    try:
-        parts = token.split(".")
-        if len(parts) != 3:
-            raise HTTPException(status_code=401, detail="Invalid token format")
+    auth_data = jwt_cache.obter(token)
+    if auth_data is not None:
+        return auth_data
 
-        # Decodifica payload (segunda parte do JWT)
-        payload_encoded = parts[1]
-        padding = 4 - (len(payload_encoded) % 4)
-        if padding != 4:
-            payload_encoded += "=" * padding
-
-        payload_json = base64.urlsafe_b64decode(payload_encoded)
-        payload = json.loads(payload_json)
+    try:
+        payload = _decodificar_jwt(token)
 
         # Extrai dados do JWT
         tenant_id = payload.get("tenant_id") or payload.get("sub")
@@ -68,7 +137,7 @@ async def get_auth_data(authorization: Optional[str] = Header(None)) -> Dict[str
                 detail="Token inválido: falta tiny_token. Faça login novamente."
             )
 
-        return {
+        auth_data = {
             "tenant_id": tenant_id,
             "tiny_token": tiny_token,
             "tenant_nome": payload.get("tenant_nome", ""),
@@ -80,6 +149,9 @@ async def get_auth_data(authorization: Optional[str] = Header(None)) -> Dict[str
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Erro ao processar token: {str(e)}")
 
+    jwt_cache.guardar(token, auth_data, payload.get("exp"))
+    return auth_data
+
 
 # =============================================================================
 # MODELS
@@ -110,8 +182,29 @@ class MCPSession:
         self.tiny_token = None
         self.created_at = datetime.utcnow()
 
+    def para_dict(self) -> Dict[str, Any]:
+        """Estado persistido no backend compartilhado (sem o tiny_token, que vem do JWT)"""
+        return {
+            "session_id": self.session_id,
+            "initialized": self.initialized,
+            "tenant_id": self.tenant_id,
+            "created_at": self.created_at.isoformat()
+        }
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> "MCPSession":
+        session = cls(dados["session_id"])
+        session.initialized = dados.get("initialized", False)
+        session.tenant_id = dados.get("tenant_id")
+        session.created_at = datetime.fromisoformat(dados["created_at"])
+        return session
+
+
+# Sessões vivas (TTL por inatividade + LRU); varredura iniciada no lifespan do app
+# Com STORAGE_URL compartilhado o backend é ligado no lifespan (src/main.py)
+sessions = SessionStore(serializar=MCPSession.para_dict, desserializar=MCPSession.de_dict)
 
-sessions: Dict[str, MCPSession] = {}
+MCP_SESSION_HEADER = "Mcp-Session-Id"
 
 
 # =============================================================================
@@ -137,15 +230,44 @@ def get_server_info() -> ServerInfo:
 # JSON-RPC HANDLER
 # =============================================================================
 
+def _notificador_progresso(emitir: Callable[[Dict[str, Any]], None], progress_token: Any) -> Progresso:
+    """notifications/progress para o progressToken, no máximo uma a cada MCP_PROGRESSO_INTERVALO (e sempre a final)"""
+    ultima = 0.0
+
+    def notificar(concluidos: int, total: int) -> None:
+        nonlocal ultima
+        agora = time.monotonic()
+        if concluidos < total and agora - ultima < MCP_PROGRESSO_INTERVALO:
+            return
+        ultima = agora
+        emitir({
+            "jsonrpc": "2.0",
+            "method": "notifications/progress",
+            "params": {
+                "progressToken": progress_token,
+                "progress": concluidos,
+                "total": total,
+                "message": f"{concluidos}/{total} concluídos"
+            }
+        })
+
+    return notificar
+
+
 async def handle_jsonrpc_request(
     data: Dict[str, Any],
-    session: MCPSession
+    session: MCPSession,
+    emitir: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> Optional[Dict[str, Any]]:
-    """Processa requisição JSON-RPC 2.0"""
+    """
+    Processa requisição JSON-RPC 2.0.
+    emitir: envia mensagens ao cliente antes da resposta (stream SSE), usado
+    para notifications/progress.
+    """
 
     try:
         method = data.get("method")
-        params = data.get("params", {})
+        params = data.get("params")
         request_id = data.get("id")
 
         # Notification (sem resposta)
@@ -154,6 +276,11 @@ async def handle_jsonrpc_request(
                 session.initialized = True
             return None
 
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            return _erro_jsonrpc(request_id, -32602, "Invalid params: esperado um objeto")
+
         # Roteamento de métodos
         if method == "initialize":
             result = {
@@ -168,8 +295,8 @@ async def handle_jsonrpc_request(
             if not session.initialized:
                 session.initialized = True
 
-            tools = get_all_tools()
-            result = {"tools": [t.model_dump() for t in tools]}
+            # Catálogo estático: serializado uma vez e inserido como está na resposta
+            result = resultado_tools_list()
 
         elif method == "tools/call":
             # Auto-initialize se não foi inicializado (compatibilidade com Sellflux)
@@ -178,14 +305,25 @@ async def handle_jsonrpc_request(
 
             tool_name = params.get("name")
             arguments = params.get("arguments", {})
+            if not isinstance(arguments, dict):
+                return _erro_jsonrpc(request_id, -32602, "Invalid params: arguments deve ser um objeto")
+
+            progress_token = _meta(params).get("progressToken")
+            contexto = None
+            if emitir is not None and progress_token is not None:
+                contexto = _progresso.set(_notificador_progresso(emitir, progress_token))
 
-            tiny_client = TinyAPIClient(token=session.tiny_token)
-            tool_result = await execute_tiny_tool(tiny_client, tool_name, arguments)
+            tiny_client = TinyAPIClient(token=session.tiny_token, session_id=session.session_id)
+            try:
+                tool_result = await execute_tiny_tool(tiny_client, tool_name, arguments)
+            finally:
+                if contexto is not None:
+                    _progresso.reset(contexto)
 
             result = {
                 "content": [{
                     "type": "text",
-                    "text": json.dumps(tool_result, ensure_ascii=False, indent=2)
+                    "text": json_codec.dumps_str(tool_result, indentar=not MCP_JSON_COMPACTO)
                 }]
             }
 
@@ -202,6 +340,11 @@ async def handle_jsonrpc_request(
         return {"jsonrpc": "2.0", "id": request_id, "result": result}
 
     except Exception as e:
+        log.warning(
+            "Erro em %s: %s", data.get("method"), e,
+            exc_info=log.isEnabledFor(logging.DEBUG),
+            extra={"metodo": data.get("method"), "tenant_id": session.tenant_id}
+        )
         return {
             "jsonrpc": "2.0",
             "id": data.get("id"),
@@ -209,223 +352,298 @@ async def handle_jsonrpc_request(
         }
 
 
+def _serializar_mensagem(mensagem: Dict[str, Any]) -> bytes:
+    resultado = mensagem.get("result")
+    if not isinstance(resultado, FragmentoJSON):
+        return json_codec.dumps(mensagem)
+    envelope = {chave: valor for chave, valor in mensagem.items() if chave != "result"}
+    return json_codec.dumps(envelope)[:-1] + b',"result":' + resultado + b"}"
+
+
+def _serializar_jsonrpc(response_data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> bytes:
+    """Serializa a resposta (única ou batch), inserindo resultados pré-serializados sem reprocessá-los"""
+    if isinstance(response_data, list):
+        return b"[" + b",".join(_serializar_mensagem(mensagem) for mensagem in response_data) + b"]"
+    return _serializar_mensagem(response_data)
+
+
+def _erro_jsonrpc(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+async def handle_jsonrpc_batch(
+    mensagens: List[Any],
+    session: MCPSession
+) -> List[Dict[str, Any]]:
+    """
+    Processa um batch JSON-RPC 2.0.
+    As entradas rodam concorrentemente (até MCP_BATCH_CONCORRENCIA por batch)
+    e as respostas voltam na ordem das requisições; notifications não geram resposta.
+    """
+    semaforo = asyncio.Semaphore(MCP_BATCH_CONCORRENCIA)
+
+    async def processar(mensagem: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(mensagem, dict):
+            return _erro_jsonrpc(None, -32600, "Invalid Request")
+        async with semaforo:
+            return await handle_jsonrpc_request(mensagem, session)
+
+    respostas = await asyncio.gather(*(processar(mensagem) for mensagem in mensagens))
+    return [resposta for resposta in respostas if resposta is not None]
+
+
 # =============================================================================
-# TOOL EXECUTION
+# TOOL REGISTRY
 # =============================================================================
 
-async def execute_tiny_tool(
-    client: TinyAPIClient,
-    tool_name: str,
-    arguments: Dict[str, Any]
-) -> Dict[str, Any]:
-    """Executa uma ferramenta do Tiny ERP - MAPEAMENTO COMPLETO"""
+# Resposta servida sem a Tiny (client, arguments, source); None = repassar para a Tiny
+RespostaLocal = Callable[[TinyAPIClient, Dict[str, Any], str], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class ToolHandler(NamedTuple):
+    """Método do TinyAPIClient + adaptador que converte os arguments MCP em (args, kwargs)"""
+    metodo: str
+    adaptar: Callable[[Dict[str, Any]], Tuple[tuple, Dict[str, Any]]]
+    # Aceita todas_paginas/max_registros (paginação automática)
+    paginavel: bool = False
+    # Aceita source=local/indice (responde por esta função quando possível)
+    local: Optional[RespostaLocal] = None
+
 
+def _repassar(metodo: str) -> ToolHandler:
+    """Arguments repassados como kwargs (ex: pesquisas com filtros opcionais)"""
+    return ToolHandler(metodo, lambda arguments: ((), dict(arguments)))
+
+
+def _pesquisa_paginavel(metodo: str, local: Optional[RespostaLocal] = None) -> ToolHandler:
+    """Pesquisa com filtros em kwargs e suporte a todas_paginas/max_registros (e source=local/indice, se houver)"""
+    return ToolHandler(metodo, lambda arguments: ((), dict(arguments)), paginavel=True, local=local)
+
+
+def _posicionais(metodo: str, *campos: Union[str, Tuple[str, Any]]) -> ToolHandler:
+    """Arguments extraídos por nome, na ordem; (nome, padrão) para campos com default"""
+    def adaptar(arguments: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+        args = tuple(
+            arguments.get(campo) if isinstance(campo, str) else arguments.get(campo[0], campo[1])
+            for campo in campos
+        )
+        return args, {}
+    return ToolHandler(metodo, adaptar)
+
+
+def _com_idempotencia(metodo: str, campo: str) -> ToolHandler:
+    """Inclusões que aceitam chave_idempotencia (repassada como kwarg)"""
+    def adaptar(arguments: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+        return (arguments.get(campo),), {"chave_idempotencia": arguments.get("chave_idempotencia")}
+    return ToolHandler(metodo, adaptar)
+
+
+def _adaptar_estoque_lote(arguments: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+    return (arguments.get("itens"),), {"ao_progresso": _progresso.get()}
+
+
+def _adaptar_pedido_incluir(arguments: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+    pedido_data = arguments.get("pedido")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "Pedido recebido (%s, campos: %s): %.200s",
+            type(pedido_data).__name__,
+            list(pedido_data) if isinstance(pedido_data, dict) else "N/A",
+            pedido_data
+        )
+    return (pedido_data,), {"chave_idempotencia": arguments.get("chave_idempotencia")}
+
+
+# Mapeamento tool MCP -> método do TinyAPIClient (montado uma vez no import)
+TOOL_HANDLERS: Dict[str, ToolHandler] = {
     # PEDIDOS
-    if tool_name == "tiny_pedidos_pesquisar":
-        return await client.pesquisar_pedidos(**arguments)
-    elif tool_name == "tiny_pedido_obter":
-        return await client.obter_pedido(arguments.get("id"))
-    elif tool_name == "tiny_pedido_incluir":
-        pedido_data = arguments.get("pedido")
-        print(f"[DEBUG MCP] Recebido pedido: {str(pedido_data)[:200]}...")
-        print(f"[DEBUG MCP] Tipo: {type(pedido_data)}")
-        if pedido_data:
-            print(f"[DEBUG MCP] Keys: {pedido_data.keys() if isinstance(pedido_data, dict) else 'N/A'}")
-        return await client.incluir_pedido(pedido_data)
-    elif tool_name == "tiny_pedido_alterar":
-        return await client.alterar_pedido(arguments.get("id"), arguments.get("pedido"))
-    elif tool_name == "tiny_pedido_alterar_situacao":
-        return await client.alterar_situacao_pedido(arguments.get("id"), arguments.get("situacao"))
-    elif tool_name == "tiny_pedido_obter_rastreamento":
-        return await client.obter_rastreamento_pedido(arguments.get("id"))
+    "tiny_pedidos_pesquisar": _pesquisa_paginavel("pesquisar_pedidos"),
+    "tiny_pedido_obter": _posicionais("obter_pedido", "id"),
+    "tiny_pedido_incluir": ToolHandler("incluir_pedido", _adaptar_pedido_incluir),
+    "tiny_pedido_alterar": _posicionais("alterar_pedido", "id", "pedido"),
+    "tiny_pedido_alterar_situacao": _posicionais("alterar_situacao_pedido", "id", "situacao"),
+    "tiny_pedido_obter_rastreamento": _posicionais("obter_rastreamento_pedido", "id"),
 
     # PRODUTOS
-    elif tool_name == "tiny_produtos_pesquisar":
-        return await client.pesquisar_produtos(**arguments)
-    elif tool_name == "tiny_produto_obter":
-        return await client.obter_produto(arguments.get("id"))
-    elif tool_name == "tiny_produto_incluir":
-        return await client.incluir_produto(arguments.get("produto"))
-    elif tool_name == "tiny_produto_alterar":
-        return await client.alterar_produto(arguments.get("id"), arguments.get("produto"))
-    elif tool_name == "tiny_produto_obter_estoque":
-        return await client.obter_estoque_produto(arguments.get("id"))
-    elif tool_name == "tiny_produto_atualizar_estoque":
-        return await client.atualizar_estoque_produto(arguments.get("id"), arguments.get("estoque"))
-    elif tool_name == "tiny_produto_obter_preco":
-        return await client.obter_preco_produto(arguments.get("id"))
+    "tiny_produtos_pesquisar": _pesquisa_paginavel("pesquisar_produtos", local=espelho_produtos.pesquisar),
+    "tiny_produto_obter": _posicionais("obter_produto", "id"),
+    "tiny_produto_incluir": _posicionais("incluir_produto", "produto"),
+    "tiny_produto_alterar": _posicionais("alterar_produto", "id", "produto"),
+    "tiny_produto_obter_estoque": _posicionais("obter_estoque_produto", "id")._replace(local=snapshot_estoque.obter),
+    "tiny_produto_atualizar_estoque": _posicionais("atualizar_estoque_produto", "id", "estoque"),
+    "tiny_produto_atualizar_estoque_lote": ToolHandler("atualizar_estoque_lote", _adaptar_estoque_lote),
+    "tiny_produto_obter_preco": _posicionais("obter_preco_produto", "id"),
 
     # CONTATOS
-    elif tool_name == "tiny_contatos_pesquisar":
-        return await client.pesquisar_contatos(**arguments)
-    elif tool_name == "tiny_contato_obter":
-        return await client.obter_contato(arguments.get("id"))
-    elif tool_name == "tiny_contato_incluir":
-        return await client.incluir_contato(arguments.get("contato"))
-    elif tool_name == "tiny_contato_alterar":
-        return await client.alterar_contato(arguments.get("id"), arguments.get("contato"))
+    "tiny_contatos_pesquisar": _pesquisa_paginavel("pesquisar_contatos", local=espelho_contatos.pesquisar),
+    "tiny_contato_obter": _posicionais("obter_contato", "id"),
+    "tiny_contato_incluir": _com_idempotencia("incluir_contato", "contato"),
+    "tiny_contato_alterar": _posicionais("alterar_contato", "id", "contato"),
 
     # NOTAS FISCAIS
-    elif tool_name == "tiny_notas_fiscais_pesquisar":
-        return await client.pesquisar_notas_fiscais(**arguments)
-    elif tool_name == "tiny_nota_fiscal_obter":
-        return await client.obter_nota_fiscal(arguments.get("id"))
-    elif tool_name == "tiny_nota_fiscal_incluir":
-        return await client.incluir_nota_fiscal(arguments.get("nota"))
-    elif tool_name == "tiny_nota_fiscal_gerar_pedido":
-        return await client.gerar_nota_fiscal_pedido(arguments.get("pedido_id"))
-    elif tool_name == "tiny_nota_fiscal_enviar_email":
-        return await client.enviar_email_nota_fiscal(arguments.get("id"), arguments.get("email"))
-    elif tool_name == "tiny_nota_fiscal_obter_xml":
-        return await client.obter_xml_nota_fiscal(arguments.get("id"))
-    elif tool_name == "tiny_nota_fiscal_cancelar":
-        return await client.cancelar_nota_fiscal(arguments.get("id"), arguments.get("motivo"))
+    "tiny_notas_fiscais_pesquisar": _pesquisa_paginavel("pesquisar_notas_fiscais"),
+    "tiny_nota_fiscal_obter": _posicionais("obter_nota_fiscal", "id"),
+    "tiny_nota_fiscal_incluir": _posicionais("incluir_nota_fiscal", "nota"),
+    "tiny_nota_fiscal_gerar_pedido": _posicionais("gerar_nota_fiscal_pedido", "pedido_id"),
+    "tiny_nota_fiscal_enviar_email": _posicionais("enviar_email_nota_fiscal", "id", "email"),
+    "tiny_nota_fiscal_obter_xml": _posicionais("obter_xml_nota_fiscal", "id"),
+    "tiny_nota_fiscal_cancelar": _posicionais("cancelar_nota_fiscal", "id", "motivo"),
 
     # CONTAS A RECEBER
-    elif tool_name == "tiny_contas_receber_pesquisar":
-        return await client.pesquisar_contas_receber(**arguments)
-    elif tool_name == "tiny_conta_receber_obter":
-        return await client.obter_conta_receber(arguments.get("id"))
-    elif tool_name == "tiny_conta_receber_incluir":
-        return await client.incluir_conta_receber(arguments.get("conta"))
-    elif tool_name == "tiny_conta_receber_baixar":
-        return await client.baixar_conta_receber(
-            arguments.get("id"),
-            arguments.get("data_pagamento"),
-            arguments.get("valor")
-        )
+    "tiny_contas_receber_pesquisar": _pesquisa_paginavel("pesquisar_contas_receber"),
+    "tiny_conta_receber_obter": _posicionais("obter_conta_receber", "id"),
+    "tiny_conta_receber_incluir": _com_idempotencia("incluir_conta_receber", "conta"),
+    "tiny_conta_receber_baixar": _posicionais("baixar_conta_receber", "id", "data_pagamento", "valor"),
 
     # CONTAS A PAGAR
-    elif tool_name == "tiny_contas_pagar_pesquisar":
-        return await client.pesquisar_contas_pagar(**arguments)
-    elif tool_name == "tiny_conta_pagar_obter":
-        return await client.obter_conta_pagar(arguments.get("id"))
-    elif tool_name == "tiny_conta_pagar_incluir":
-        return await client.incluir_conta_pagar(arguments.get("conta"))
-    elif tool_name == "tiny_conta_pagar_baixar":
-        return await client.baixar_conta_pagar(
-            arguments.get("id"),
-            arguments.get("data_pagamento"),
-            arguments.get("valor")
-        )
+    "tiny_contas_pagar_pesquisar": _pesquisa_paginavel("pesquisar_contas_pagar"),
+    "tiny_conta_pagar_obter": _posicionais("obter_conta_pagar", "id"),
+    "tiny_conta_pagar_incluir": _posicionais("incluir_conta_pagar", "conta"),
+    "tiny_conta_pagar_baixar": _posicionais("baixar_conta_pagar", "id", "data_pagamento", "valor"),
 
     # CRM
-    elif tool_name == "tiny_crm_oportunidades_pesquisar":
-        return await client.pesquisar_oportunidades_crm(arguments.get("pagina", 1))
-    elif tool_name == "tiny_crm_oportunidade_obter":
-        return await client.obter_oportunidade_crm(arguments.get("id"))
-    elif tool_name == "tiny_crm_oportunidade_incluir":
-        return await client.incluir_oportunidade_crm(arguments.get("oportunidade"))
-    elif tool_name == "tiny_crm_oportunidade_alterar":
-        return await client.alterar_oportunidade_crm(arguments.get("id"), arguments.get("oportunidade"))
+    "tiny_crm_oportunidades_pesquisar": _posicionais("pesquisar_oportunidades_crm", ("pagina", 1)),
+    "tiny_crm_oportunidade_obter": _posicionais("obter_oportunidade_crm", "id"),
+    "tiny_crm_oportunidade_incluir": _posicionais("incluir_oportunidade_crm", "oportunidade"),
+    "tiny_crm_oportunidade_alterar": _posicionais("alterar_oportunidade_crm", "id", "oportunidade"),
 
     # COMPLEMENTARES
-    elif tool_name == "tiny_formas_pagamento_listar":
-        return await client.listar_formas_pagamento()
-    elif tool_name == "tiny_transportadoras_pesquisar":
-        return await client.pesquisar_transportadoras(arguments.get("pagina", 1))
-    elif tool_name == "tiny_transportadora_obter":
-        return await client.obter_transportadora(arguments.get("id"))
-    elif tool_name == "tiny_vendedores_pesquisar":
-        return await client.pesquisar_vendedores(arguments.get("pagina", 1))
-    elif tool_name == "tiny_vendedor_obter":
-        return await client.obter_vendedor(arguments.get("id"))
-    elif tool_name == "tiny_categorias_listar":
-        return await client.listar_categorias()
-    elif tool_name == "tiny_etiquetas_listar":
-        return await client.listar_etiquetas()
-    elif tool_name == "tiny_depositos_listar":
-        return await client.listar_depositos()
-    elif tool_name == "tiny_deposito_obter_estoque":
-        return await client.obter_estoque_deposito(arguments.get("id"))
-    elif tool_name == "tiny_orcamentos_pesquisar":
-        return await client.pesquisar_orcamentos(**arguments)
-    elif tool_name == "tiny_orcamento_obter":
-        return await client.obter_orcamento(arguments.get("id"))
-    elif tool_name == "tiny_orcamento_incluir":
-        return await client.incluir_orcamento(arguments.get("orcamento"))
-    elif tool_name == "tiny_pedidos_compra_pesquisar":
-        return await client.pesquisar_pedidos_compra(arguments.get("pagina", 1))
-    elif tool_name == "tiny_pedido_compra_obter":
-        return await client.obter_pedido_compra(arguments.get("id"))
-    elif tool_name == "tiny_pedido_compra_incluir":
-        return await client.incluir_pedido_compra(arguments.get("pedido"))
-    elif tool_name == "tiny_manifestos_pesquisar":
-        return await client.pesquisar_manifestos(arguments.get("pagina", 1))
-    elif tool_name == "tiny_manifesto_obter":
-        return await client.obter_manifesto(arguments.get("id"))
-    elif tool_name == "tiny_ordens_servico_pesquisar":
-        return await client.pesquisar_ordens_servico(arguments.get("pagina", 1))
-    elif tool_name == "tiny_ordem_servico_obter":
-        return await client.obter_ordem_servico(arguments.get("id"))
-    elif tool_name == "tiny_kits_pesquisar":
-        return await client.pesquisar_kits(arguments.get("pagina", 1))
-    elif tool_name == "tiny_kit_obter":
-        return await client.obter_kit(arguments.get("id"))
-    elif tool_name == "tiny_expedicoes_pesquisar":
-        return await client.pesquisar_expedicoes(arguments.get("pagina", 1))
-    elif tool_name == "tiny_expedicao_obter":
-        return await client.obter_expedicao(arguments.get("id"))
-    elif tool_name == "tiny_pdv_vendas_pesquisar":
-        return await client.pesquisar_vendas_pdv(arguments.get("pagina", 1))
-    elif tool_name == "tiny_pdv_venda_obter":
-        return await client.obter_venda_pdv(arguments.get("id"))
-    elif tool_name == "tiny_boleto_gerar":
-        return await client.gerar_boleto(arguments.get("conta_receber_id"))
-    elif tool_name == "tiny_boleto_obter":
-        return await client.obter_boleto(arguments.get("id"))
-    elif tool_name == "tiny_conta_obter_info":
-        return await client.obter_info_conta()
+    "tiny_formas_pagamento_listar": _posicionais("listar_formas_pagamento"),
+    "tiny_transportadoras_pesquisar": _posicionais("pesquisar_transportadoras", ("pagina", 1)),
+    "tiny_transportadora_obter": _posicionais("obter_transportadora", "id"),
+    "tiny_vendedores_pesquisar": _posicionais("pesquisar_vendedores", ("pagina", 1)),
+    "tiny_vendedor_obter": _posicionais("obter_vendedor", "id"),
+    "tiny_categorias_listar": _posicionais("listar_categorias"),
+    "tiny_etiquetas_listar": _posicionais("listar_etiquetas"),
+    "tiny_depositos_listar": _posicionais("listar_depositos"),
+    "tiny_deposito_obter_estoque": _posicionais("obter_estoque_deposito", "id"),
+    "tiny_orcamentos_pesquisar": _pesquisa_paginavel("pesquisar_orcamentos"),
+    "tiny_orcamento_obter": _posicionais("obter_orcamento", "id"),
+    "tiny_orcamento_incluir": _posicionais("incluir_orcamento", "orcamento"),
+    "tiny_pedidos_compra_pesquisar": _posicionais("pesquisar_pedidos_compra", ("pagina", 1)),
+    "tiny_pedido_compra_obter": _posicionais("obter_pedido_compra", "id"),
+    "tiny_pedido_compra_incluir": _posicionais("incluir_pedido_compra", "pedido"),
+    "tiny_manifestos_pesquisar": _posicionais("pesquisar_manifestos", ("pagina", 1)),
+    "tiny_manifesto_obter": _posicionais("obter_manifesto", "id"),
+    "tiny_ordens_servico_pesquisar": _posicionais("pesquisar_ordens_servico", ("pagina", 1)),
+    "tiny_ordem_servico_obter": _posicionais("obter_ordem_servico", "id"),
+    "tiny_kits_pesquisar": _posicionais("pesquisar_kits", ("pagina", 1)),
+    "tiny_kit_obter": _posicionais("obter_kit", "id"),
+    "tiny_expedicoes_pesquisar": _posicionais("pesquisar_expedicoes", ("pagina", 1)),
+    "tiny_expedicao_obter": _posicionais("obter_expedicao", "id"),
+    "tiny_pdv_vendas_pesquisar": _posicionais("pesquisar_vendas_pdv", ("pagina", 1)),
+    "tiny_pdv_venda_obter": _posicionais("obter_venda_pdv", "id"),
+    "tiny_boleto_gerar": _posicionais("gerar_boleto", "conta_receber_id"),
+    "tiny_boleto_obter": _posicionais("obter_boleto", "id"),
+    "tiny_conta_obter_info": _posicionais("obter_info_conta"),
 
     # RELATÓRIOS
-    elif tool_name == "tiny_relatorio_vendas":
-        return await client.relatorio_vendas(
-            arguments.get("data_inicio"),
-            arguments.get("data_fim"),
-            arguments.get("tipo", "geral")
-        )
-    elif tool_name == "tiny_relatorio_produtos_mais_vendidos":
-        return await client.relatorio_produtos_mais_vendidos(
-            arguments.get("data_inicio"),
-            arguments.get("data_fim"),
-            arguments.get("limite", 10)
-        )
-    elif tool_name == "tiny_relatorio_estoque_baixo":
-        return await client.relatorio_estoque_baixo(arguments.get("minimo", 5))
+    "tiny_relatorio_vendas": _posicionais("relatorio_vendas", "data_inicio", "data_fim", ("tipo", "geral")),
+    "tiny_relatorio_produtos_mais_vendidos": _posicionais("relatorio_produtos_mais_vendidos", "data_inicio", "data_fim", ("limite", 10)),
+    "tiny_relatorio_estoque_baixo": _posicionais("relatorio_estoque_baixo", ("minimo", 5))._replace(
+        local=snapshot_estoque.relatorio_baixo
+    ),
 
     # MOVIMENTAÇÕES
-    elif tool_name == "tiny_movimentacoes_estoque_pesquisar":
-        return await client.pesquisar_movimentacoes_estoque(**arguments)
-    elif tool_name == "tiny_movimentacao_estoque_incluir":
-        return await client.incluir_movimentacao_estoque(arguments.get("movimentacao"))
+    "tiny_movimentacoes_estoque_pesquisar": _pesquisa_paginavel("pesquisar_movimentacoes_estoque"),
+    "tiny_movimentacao_estoque_incluir": _posicionais("incluir_movimentacao_estoque", "movimentacao"),
 
     # CAMPOS PERSONALIZADOS
-    elif tool_name == "tiny_campos_personalizados_listar":
-        return await client.listar_campos_personalizados(arguments.get("modulo"))
+    "tiny_campos_personalizados_listar": _posicionais("listar_campos_personalizados", "modulo"),
 
     # WEBHOOKS
-    elif tool_name == "tiny_webhooks_listar":
-        return await client.listar_webhooks()
-    elif tool_name == "tiny_webhook_cadastrar":
-        return await client.cadastrar_webhook(arguments.get("url"), arguments.get("eventos"))
-    elif tool_name == "tiny_webhook_remover":
-        return await client.remover_webhook(arguments.get("id"))
+    "tiny_webhooks_listar": _posicionais("listar_webhooks"),
+    "tiny_webhook_cadastrar": _posicionais("cadastrar_webhook", "url", "eventos"),
+    "tiny_webhook_remover": _posicionais("remover_webhook", "id"),
 
     # INTEGRAÇÕES & LOGS
-    elif tool_name == "tiny_integracoes_listar":
-        return await client.listar_integracoes()
-    elif tool_name == "tiny_logs_api_obter":
-        return await client.obter_logs_api(**arguments)
+    "tiny_integracoes_listar": _posicionais("listar_integracoes"),
+    "tiny_logs_api_obter": _repassar("obter_logs_api"),
 
     # MARKETPLACE
-    elif tool_name == "tiny_marketplaces_listar":
-        return await client.listar_marketplaces()
-    elif tool_name == "tiny_marketplace_sincronizar":
-        return await client.sincronizar_marketplace(arguments.get("marketplace"))
+    "tiny_marketplaces_listar": _posicionais("listar_marketplaces"),
+    "tiny_marketplace_sincronizar": _posicionais("sincronizar_marketplace", "marketplace"),
+}
+
+
+def validar_registro() -> None:
+    """Garante que todo tool do TOOLS_CATALOG tem handler e que todo handler aponta para um método existente"""
+    catalogo = {tool.name for tool in get_all_tools()}
+    sem_handler = sorted(catalogo - TOOL_HANDLERS.keys())
+    sem_catalogo = sorted(TOOL_HANDLERS.keys() - catalogo)
+    sem_metodo = sorted(
+        nome for nome, handler in TOOL_HANDLERS.items()
+        if not callable(getattr(TinyAPIClient, handler.metodo, None))
+    )
+    if sem_handler or sem_catalogo or sem_metodo:
+        raise RuntimeError(
+            f"Registro de tools inconsistente: sem handler={sem_handler}, "
+            f"fora do catálogo={sem_catalogo}, método inexistente={sem_metodo}"
+        )
 
-    else:
+
+validar_registro()
+
+
+# =============================================================================
+# TOOL EXECUTION
+# =============================================================================
+
+async def execute_tiny_tool(
+    client: TinyAPIClient,
+    tool_name: str,
+    arguments: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Executa uma ferramenta do Tiny ERP via TOOL_HANDLERS (dispatch O(1))"""
+    handler = TOOL_HANDLERS.get(tool_name)
+    if handler is None:
+        # Nome fora do catálogo não vira label (cardinalidade controlada)
+        MCP_TOOL_CALLS_TOTAL.inc("desconhecida", "erro")
         raise ValueError(f"Unknown tool: {tool_name}")
 
+    MCP_TOOL_IN_FLIGHT.inc(tool_name)
+    inicio = time.perf_counter()
+    resultado = "erro"
+    try:
+        if eh_tool_leitura(tool_name) and ("campos" in arguments or "visao" in arguments):
+            arguments = dict(arguments)
+            campos = arguments.pop("campos", None)
+            visao = validar_visao(arguments.pop("visao", None))
+            # Projeção no servidor, antes da serialização
+            retorno = projetar(await _executar_handler(client, handler, arguments), campos, visao)
+        else:
+            retorno = await _executar_handler(client, handler, arguments)
+        resultado = "tiny_erro" if classe_erro_tiny(retorno) else "ok"
+        return retorno
+    finally:
+        MCP_TOOL_SECONDS.observe(time.perf_counter() - inicio, tool_name)
+        MCP_TOOL_CALLS_TOTAL.inc(tool_name, resultado)
+        MCP_TOOL_IN_FLIGHT.dec(tool_name)
+
+
+async def _executar_handler(
+    client: TinyAPIClient,
+    handler: ToolHandler,
+    arguments: Dict[str, Any]
+) -> Dict[str, Any]:
+    if handler.local is not None and "source" in arguments:
+        arguments = dict(arguments)
+        source = arguments.pop("source")
+        if source in SOURCES_LOCAIS:
+            resposta = await handler.local(client, arguments, source)
+            if resposta is not None:
+                return resposta
+
+    if handler.paginavel:
+        arguments = dict(arguments)
+        todas_paginas = arguments.pop("todas_paginas", False)
+        max_registros = arguments.pop("max_registros", None)
+        if todas_paginas or max_registros:
+            return await client.pesquisar_todas_paginas(handler.metodo, max_registros, **arguments)
+
+    args, kwargs = handler.adaptar(arguments)
+    return await getattr(client, handler.metodo)(*args, **kwargs)
+
 
 # =============================================================================
 # SECURITY
@@ -441,6 +659,115 @@ def is_origin_allowed(origin: str) -> bool:
 # ENDPOINTS
 # =============================================================================
 
+def _meta(mensagem: Any) -> Dict[str, Any]:
+    """_meta de params/mensagem, ou {} quando um dos dois não é objeto"""
+    meta = mensagem.get("_meta") if isinstance(mensagem, dict) else None
+    return meta if isinstance(meta, dict) else {}
+
+
+def _quer_progresso(request: Request, body: Any) -> bool:
+    """tools/call única com _meta.progressToken de um cliente que aceita SSE"""
+    if not isinstance(body, dict) or body.get("method") != "tools/call" or body.get("id") is None:
+        return False
+    meta = _meta(body.get("params"))
+    return meta.get("progressToken") is not None and "text/event-stream" in request.headers.get("accept", "")
+
+
+def _evento_sse(dados: bytes) -> bytes:
+    return b"event: message\ndata: " + dados + b"\n\n"
+
+
+async def _stream_com_progresso(
+    body: Dict[str, Any],
+    session: MCPSession,
+    persistida: bool
+) -> AsyncIterator[bytes]:
+    """
+    Resposta em SSE: notifications/progress enquanto a ferramenta roda e a
+    resposta JSON-RPC por último. Se o cliente desconectar, a chamada é
+    cancelada (escritas com chave de idempotência seguem até o fim sob shield).
+    """
+    fila: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    tarefa = asyncio.create_task(handle_jsonrpc_request(body, session, emitir=fila.put_nowait))
+    tarefa.add_done_callback(lambda _: fila.put_nowait(None))
+
+    try:
+        while True:
+            mensagem = await fila.get()
+            if mensagem is None:
+                break
+            yield _evento_sse(json_codec.dumps(mensagem))
+    finally:
+        if not tarefa.done():
+            # Não aguarda aqui: o escopo já cancelado recancelaria o await
+            tarefa.cancel()
+            tarefa.add_done_callback(_recuperar_resultado)
+
+    response_data = tarefa.result()
+    if persistida:
+        await sessions.salvar(session.session_id, session)
+    if response_data is not None:
+        yield _evento_sse(_serializar_jsonrpc(response_data))
+
+
+def _recuperar_resultado(tarefa: "asyncio.Task[Any]") -> None:
+    """Consome o resultado de uma chamada abandonada (evita 'exception was never retrieved')"""
+    if not tarefa.cancelled() and tarefa.exception() is not None:
+        log.warning("Chamada abandonada pelo cliente falhou: %s", tarefa.exception())
+
+
+def _contem_initialize(body: Any) -> bool:
+    mensagens = body if isinstance(body, list) else [body]
+    return any(isinstance(m, dict) and m.get("method") == "initialize" for m in mensagens)
+
+
+async def _resolver_sessao(
+    request: Request,
+    body: Any,
+    tenant_id: str,
+    tiny_token: str
+) -> Tuple[MCPSession, bool]:
+    """
+    Localiza/cria a sessão da requisição. Retorna (sessão, persistida).
+
+    A chave é o header Mcp-Session-Id (ou _meta.sessionId, por compatibilidade).
+    Sessões só são criadas no initialize, com id gerado aqui: um id que o
+    store não conhece (expirado, inventado ou de outro tenant) responde 404 e
+    o cliente deve reinicializar. Requisições sem id usam uma sessão efêmera,
+    para não acumular uma sessão por POST.
+    """
+    session_id = request.headers.get(MCP_SESSION_HEADER) or _extrair_session_id(body)
+    initialize = _contem_initialize(body)
+
+    session = await sessions.obter(session_id) if session_id else None
+    if session is not None and session.tenant_id != tenant_id:
+        # Id de outro tenant: não reaproveita nem sobrescreve
+        session = None
+    if session_id and session is None and not initialize:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    persistida = session is not None
+    if session is None:
+        session = MCPSession(str(uuid.uuid4()))
+        session.tenant_id = tenant_id
+        persistida = initialize
+
+    # Sempre usa o tiny_token do JWT atual (pode ter sido renovado)
+    session.tiny_token = tiny_token
+    return session, persistida
+
+
+def _extrair_session_id(body: Any) -> Optional[str]:
+    """sessionId do _meta da mensagem (ou da primeira mensagem do batch que tiver)"""
+    mensagens = body if isinstance(body, list) else [body]
+    for mensagem in mensagens:
+        if isinstance(mensagem, dict):
+            session_id = _meta(mensagem).get("sessionId")
+            if session_id:
+                return session_id
+    return None
+
+
 @router.get("/mcp/info")
 async def mcp_info():
     """Endpoint de descoberta do servidor MCP"""
@@ -454,26 +781,32 @@ async def mcp_info():
     })
 
 
+@router.get("/mcp/stats")
+async def mcp_stats():
+    """Estatísticas operacionais (sessões, rate limiter por tenant e cache de respostas)"""
+    return JSONResponse(content={
+        "sessoes": sessions.estatisticas(),
+        "scheduler": scheduler.estatisticas(),
+        "cache": response_cache.estatisticas(),
+        "auth": jwt_cache.estatisticas(),
+        "single_flight": single_flight.estatisticas(),
+        "circuitos": disjuntores.estatisticas(),
+        "idempotencia": idempotency_store.estatisticas(),
+        "webhooks": fila_webhooks.estatisticas(),
+        "espelhos": {espelho.nome: espelho.estatisticas() for espelho in ESPELHOS},
+        "snapshot_estoque": snapshot_estoque.estatisticas()
+    })
+
+
 @router.get("/mcp/tools")
-async def mcp_tools_documentation():
+async def mcp_tools_documentation(request: Request):
     """
     Lista todas as ferramentas MCP disponíveis com documentação completa
 
     Este endpoint retorna a lista de todas as 77+ ferramentas do Tiny ERP
     que podem ser chamadas via MCP JSON-RPC no endpoint POST /mcp
     """
-    tools = get_all_tools()
-    return JSONResponse(content={
-        "total": len(tools),
-        "tools": [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "inputSchema": tool.inputSchema
-            }
-            for tool in tools
-        ]
-    })
+    return resposta_tools().responder(request)
 
 
 @router.post("/mcp")
@@ -513,30 +846,64 @@ async def mcp_endpoint(
 
     # POST: Processa JSON-RPC
     try:
-        body = await request.json()
+        body = json_codec.loads(await request.body())
     except:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
+    if not isinstance(body, (dict, list)):
+        raise HTTPException(status_code=400, detail="Invalid JSON-RPC message")
+
     # Gerencia sessão
-    session_id = body.get("_meta", {}).get("sessionId") or str(uuid.uuid4())
+    session, persistida = await _resolver_sessao(request, body, tenant_id, tiny_token)
+    headers = {"MCP-Protocol-Version": mcp_protocol_version or MCP_PROTOCOL_VERSION}
+    if persistida:
+        headers[MCP_SESSION_HEADER] = session.session_id
 
-    if session_id not in sessions:
-        session = MCPSession(session_id)
-        session.tenant_id = tenant_id
-        session.tiny_token = tiny_token
-        sessions[session_id] = session
+    # tools/call com progressToken: progresso e resposta no mesmo stream SSE
+    if _quer_progresso(request, body):
+        return StreamingResponse(
+            _stream_com_progresso(body, session, persistida),
+            media_type="text/event-stream",
+            headers={**headers, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    # Processa requisição (única ou batch)
+    if isinstance(body, list):
+        if not body:
+            response_data = _erro_jsonrpc(None, -32600, "Invalid Request: empty batch")
+        elif len(body) > MCP_BATCH_MAX:
+            response_data = _erro_jsonrpc(None, -32600, f"Invalid Request: batch maior que {MCP_BATCH_MAX}")
+        else:
+            response_data = await handle_jsonrpc_batch(body, session) or None
     else:
-        session = sessions[session_id]
+        response_data = await handle_jsonrpc_request(body, session)
 
-    # Processa requisição
-    response_data = await handle_jsonrpc_request(body, session)
+    # Persiste estado (initialized) e renova o TTL da sessão
+    if persistida:
+        await sessions.salvar(session.session_id, session)
 
     # Notification (sem resposta)
     if response_data is None:
-        return Response(status_code=202)
+        return Response(status_code=202, headers=headers)
 
     # Retorna resposta JSON-RPC
-    return JSONResponse(
-        content=response_data,
-        headers={"MCP-Protocol-Version": mcp_protocol_version or MCP_PROTOCOL_VERSION}
-    )
+    return Response(content=_serializar_jsonrpc(response_data), media_type="application/json", headers=headers)
+
+
+@router.delete("/mcp")
+async def mcp_encerrar_sessao(
+    request: Request,
+    authorization: Optional[str] = Header(None)
+):
+    """Encerra a sessão indicada no header Mcp-Session-Id"""
+    auth_data = await get_auth_data(authorization)
+    session_id = request.headers.get(MCP_SESSION_HEADER)
+    if not session_id:
+        raise HTTPException(status_code=400, detail=f"Header {MCP_SESSION_HEADER} obrigatório")
+
+    session = await sessions.obter(session_id)
+    if session is None or session.tenant_id != auth_data["tenant_id"]:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    await sessions.encerrar(session_id)
+    return Response(status_code=204)
@@ -13,6 +13,85 @@ class Tool(BaseModel):
     inputSchema: Dict[str, Any]
 
 
+# Parâmetros opcionais de paginação automática (ferramentas *_pesquisar)
+PAGINACAO_PROPERTIES: Dict[str, Any] = {
+    "todas_paginas": {
+        "type": "boolean",
+        "default": False,
+        "description": "Busca todas as páginas (em paralelo) e devolve os registros combinados"
+    },
+    "max_registros": {
+        "type": "integer",
+        "minimum": 1,
+        "description": "Busca páginas até juntar este número de registros (implica todas_paginas)"
+    }
+}
+
+# Pesquisa no espelho local do tenant (tiny_produtos_pesquisar, tiny_contatos_pesquisar; ver services/espelho.py)
+SOURCE_PROPERTIES: Dict[str, Any] = {
+    "source": {
+        "type": "string",
+        "enum": ["tiny", "local", "indice"],
+        "default": "tiny",
+        "description": (
+            "Onde pesquisar. tiny: API da Tiny (busca exata). "
+            "local: cópia em memória, atualizada a cada poucos minutos, com as palavras em qualquer parte do cadastro, sem consumir cota da Tiny. "
+            "indice: como local, mas aproximada (ignora acentos, aceita início de palavra e erros de digitação) e ordenada por relevância; "
+            "uma chamada com o nome como o cliente escreveu substitui várias tentativas de nome exato. "
+            "Enquanto a cópia do tenant não estiver pronta, consulta a Tiny"
+        )
+    }
+}
+
+# Saldo do snapshot de estoque do tenant (tiny_produto_obter_estoque, tiny_relatorio_estoque_baixo; ver services/snapshot_estoque.py)
+ESTOQUE_LOCAL_PROPERTIES: Dict[str, Any] = {
+    "source": {
+        "type": "string",
+        "enum": ["tiny", "local"],
+        "default": "tiny",
+        "description": (
+            "tiny: sempre consulta a Tiny. "
+            "local: saldos em memória, mantidos em dia pelas movimentações de estoque (resposta com origem=snapshot "
+            "e snapshot_idade_segundos); consulta a Tiny quando o saldo não está em memória ou é mais velho que o limite"
+        )
+    }
+}
+
+# Parâmetros opcionais de projeção (ferramentas de leitura: *_obter, *_pesquisar, *_listar)
+PROJECAO_PROPERTIES: Dict[str, Any] = {
+    "campos": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Devolve só estes campos de cada registro (caminhos com ponto, ex: [\"numero\", \"cliente.nome\"])"
+    },
+    "visao": {
+        "type": "string",
+        "enum": ["completo", "sem_vazios", "resumo"],
+        "default": "completo",
+        "description": "resumo: campos principais da entidade; sem_vazios: remove campos vazios"
+    }
+}
+
+
+# Inclusões protegidas contra duplicidade (ver services/idempotencia.py)
+TOOLS_IDEMPOTENTES = {"tiny_pedido_incluir", "tiny_contato_incluir", "tiny_conta_receber_incluir"}
+
+IDEMPOTENCIA_PROPERTIES: Dict[str, Any] = {
+    "chave_idempotencia": {
+        "type": "string",
+        "description": (
+            "Identificador único desta criação (ex: UUID). Repetir a chamada com a mesma chave "
+            "devolve o resultado original em vez de criar um registro duplicado"
+        )
+    }
+}
+
+
+def eh_tool_leitura(nome: str) -> bool:
+    """Ferramentas de leitura aceitam campos/visao"""
+    return any(verbo in nome for verbo in ("_obter", "_pesquisar", "_listar"))
+
+
 # =============================================================================
 # CATÁLOGO COMPLETO DE FERRAMENTAS (~120 ferramentas)
 # =============================================================================
@@ -32,7 +111,8 @@ TOOLS_CATALOG: List[Tool] = [
                 "pesquisa": {"type": "string", "description": "Termo de pesquisa"},
                 "pagina": {"type": "integer", "default": 1, "minimum": 1},
                 "data_inicio": {"type": "string", "description": "Data início (DD/MM/YYYY)"},
-                "data_fim": {"type": "string", "description": "Data fim (DD/MM/YYYY)"}
+                "data_fim": {"type": "string", "description": "Data fim (DD/MM/YYYY)"},
+                **PAGINACAO_PROPERTIES
             },
             "required": ["pesquisa"]
         }
@@ -153,7 +233,7 @@ TOOLS_CATALOG: List[Tool] = [
     ),
     
     # =========================================================================
-    # PRODUTOS (7 ferramentas)
+    # PRODUTOS (8 ferramentas)
     # =========================================================================
     
     Tool(
@@ -165,7 +245,9 @@ TOOLS_CATALOG: List[Tool] = [
                 "pesquisa": {"type": "string", "description": "Nome COMPLETO e EXATO do produto como cadastrado no Tiny (ex: 'Processador Intel Core i5-9500' ao invés de 'i5 9ª geração')"},
                 "pagina": {"type": "integer", "default": 1},
                 "situacao": {"type": "string", "enum": ["A", "I", "E"], "default": "A", "description": "A=Ativo, I=Inativo, E=Excluído"},
-                "gtin": {"type": "string", "description": "Código de barras (EAN)"}
+                "gtin": {"type": "string", "description": "Código de barras (EAN)"},
+                **SOURCE_PROPERTIES,
+                **PAGINACAO_PROPERTIES
             },
             "required": ["pesquisa"]
         }
@@ -210,11 +292,17 @@ TOOLS_CATALOG: List[Tool] = [
     
     Tool(
         name="tiny_produto_obter_estoque",
-        description="Obtém estoque atual de um produto",
+        description="Obtém estoque atual de um produto (saldo total e por depósito)",
         inputSchema={
             "type": "object",
             "properties": {
-                "id": {"type": "string", "description": "ID do produto"}
+                "id": {"type": "string", "description": "ID do produto"},
+                "idade_maxima": {
+                    "type": "number",
+                    "minimum": 0,
+                    "description": "Com source=local: idade máxima (segundos) aceita para o saldo em memória; 0 = sempre consultar a Tiny. Sem informar, usa o limite do servidor"
+                },
+                **ESTOQUE_LOCAL_PROPERTIES
             },
             "required": ["id"]
         }
@@ -233,6 +321,30 @@ TOOLS_CATALOG: List[Tool] = [
         }
     ),
     
+    Tool(
+        name="tiny_produto_atualizar_estoque_lote",
+        description="Atualiza o estoque de vários produtos numa chamada (ex: recebimento de mercadoria). As atualizações rodam em paralelo dentro do limite de requisições da conta; a resposta traz o status de cada item (itens com erro não interrompem os demais). Com _meta.progressToken e Accept: text/event-stream, envia notifications/progress durante a execução",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "itens": {
+                    "type": "array",
+                    "minItems": 1,
+                    "description": "Produtos e o novo saldo de cada um",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string", "description": "ID do produto"},
+                            "estoque": {"type": "number", "description": "Quantidade"}
+                        },
+                        "required": ["id", "estoque"]
+                    }
+                }
+            },
+            "required": ["itens"]
+        }
+    ),
+    
     Tool(
         name="tiny_produto_obter_preco",
         description="Obtém preço de um produto",
@@ -257,7 +369,9 @@ TOOLS_CATALOG: List[Tool] = [
             "properties": {
                 "pesquisa": {"type": "string", "description": "Nome, CPF, CNPJ"},
                 "pagina": {"type": "integer", "default": 1},
-                "tipo_pessoa": {"type": "string", "enum": ["F", "J"]}
+                "tipo_pessoa": {"type": "string", "enum": ["F", "J"]},
+                **SOURCE_PROPERTIES,
+                **PAGINACAO_PROPERTIES
             },
             "required": ["pesquisa"]
         }
@@ -350,7 +464,8 @@ TOOLS_CATALOG: List[Tool] = [
                 "pesquisa": {"type": "string"},
                 "pagina": {"type": "integer", "default": 1},
                 "data_inicio": {"type": "string"},
-                "data_fim": {"type": "string"}
+                "data_fim": {"type": "string"},
+                **PAGINACAO_PROPERTIES
             },
             "required": ["pesquisa"]
         }
@@ -443,7 +558,8 @@ TOOLS_CATALOG: List[Tool] = [
                 "pagina": {"type": "integer", "default": 1},
                 "data_inicio": {"type": "string"},
                 "data_fim": {"type": "string"},
-                "situacao": {"type": "string"}
+                "situacao": {"type": "string"},
+                **PAGINACAO_PROPERTIES
             }
         }
     ),
@@ -499,7 +615,8 @@ TOOLS_CATALOG: List[Tool] = [
                 "pagina": {"type": "integer", "default": 1},
                 "data_inicio": {"type": "string"},
                 "data_fim": {"type": "string"},
-                "situacao": {"type": "string"}
+                "situacao": {"type": "string"},
+                **PAGINACAO_PROPERTIES
             }
         }
     ),
@@ -687,7 +804,8 @@ TOOLS_CATALOG: List[Tool] = [
             "type": "object",
             "properties": {
                 "pesquisa": {"type": "string"},
-                "pagina": {"type": "integer", "default": 1}
+                "pagina": {"type": "integer", "default": 1},
+                **PAGINACAO_PROPERTIES
             },
             "required": ["pesquisa"]
         }
@@ -931,11 +1049,12 @@ TOOLS_CATALOG: List[Tool] = [
     
     Tool(
         name="tiny_relatorio_estoque_baixo",
-        description="Relatório de produtos com estoque baixo",
+        description="Relatório de produtos com estoque baixo. Com source=local, lista da memória os produtos com saldo abaixo de minimo, do menor para o maior, sem consumir cota da Tiny",
         inputSchema={
             "type": "object",
             "properties": {
-                "minimo": {"type": "integer", "default": 5}
+                "minimo": {"type": "integer", "default": 5},
+                **ESTOQUE_LOCAL_PROPERTIES
             }
         }
     ),
@@ -953,7 +1072,8 @@ TOOLS_CATALOG: List[Tool] = [
                 "produto_id": {"type": "string"},
                 "data_inicio": {"type": "string"},
                 "data_fim": {"type": "string"},
-                "pagina": {"type": "integer", "default": 1}
+                "pagina": {"type": "integer", "default": 1},
+                **PAGINACAO_PROPERTIES
             }
         }
     ),
@@ -998,14 +1118,14 @@ TOOLS_CATALOG: List[Tool] = [
     
     Tool(
         name="tiny_webhook_cadastrar",
-        description="Cadastra novo webhook",
+        description="Cadastra novo webhook. Sem url, cadastra o receptor deste servidor (/webhooks/tiny), que mantém produto, estoque e pedido em cache até a Tiny avisar de uma alteração",
         inputSchema={
             "type": "object",
             "properties": {
-                "url": {"type": "string", "description": "URL do webhook"},
+                "url": {"type": "string", "description": "URL do webhook (omitir para usar o receptor deste servidor)"},
                 "eventos": {"type": "array", "items": {"type": "string"}}
             },
-            "required": ["url", "eventos"]
+            "required": ["eventos"]
         }
     ),
     
@@ -1072,6 +1192,16 @@ TOOLS_CATALOG: List[Tool] = [
 # UTILITÁRIO: MAPEAMENTO DE FERRAMENTAS
 # =============================================================================
 
+# Projeção disponível em todas as ferramentas de leitura
+for _tool in TOOLS_CATALOG:
+    if eh_tool_leitura(_tool.name):
+        _tool.inputSchema["properties"] = {**_tool.inputSchema.get("properties", {}), **PROJECAO_PROPERTIES}
+    elif _tool.name in TOOLS_IDEMPOTENTES:
+        _tool.inputSchema["properties"] = {**_tool.inputSchema.get("properties", {}), **IDEMPOTENCIA_PROPERTIES}
+
+# Índice por nome (o catálogo é estático)
+TOOLS_BY_NAME: Dict[str, Tool] = {tool.name: tool for tool in TOOLS_CATALOG}
+
 def get_all_tools() -> List[Tool]:
     """Retorna todas as ferramentas disponíveis"""
     return TOOLS_CATALOG
@@ -1079,10 +1209,10 @@ def get_all_tools() -> List[Tool]:
 
 def get_tool_by_name(name: str) -> Tool:
     """Busca ferramenta pelo nome"""
-    for tool in TOOLS_CATALOG:
-        if tool.name == name:
-            return tool
-    raise ValueError(f"Tool not found: {name}")
+    tool = TOOLS_BY_NAME.get(name)
+    if tool is None:
+        raise ValueError(f"Tool not found: {name}")
+    return tool
 
 
 def get_tools_count() -> int:
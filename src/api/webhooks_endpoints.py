@@ -0,0 +1,43 @@
+"""
+Receptor de webhooks da Tiny
+Verifica a assinatura da URL, enfileira o evento e responde na hora
+"""
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from src.services import json_codec
+from src.services.webhooks import (
+    WEBHOOK_SECRET,
+    WebhookInvalido,
+    fila_webhooks,
+    interpretar,
+    verificar,
+)
+
+router = APIRouter(prefix="/webhooks", tags=["🔔 Webhooks"])
+
+
+@router.post("/tiny/{tenant}", summary="Recebe eventos de webhook da Tiny (estoque, produto, pedido)")
+async def receber_webhook_tiny(tenant: str, request: Request, assinatura: str = Query("")):
+    """
+    Callback cadastrado pela tool tiny_webhook_cadastrar (sem url).
+
+    O evento invalida no cache as leituras da entidade alterada
+    (produto.obter, produto.obter.estoque, pedido.obter) e mantém o tenant em
+    modo push para essa entidade. Com a fila cheia responde 503, para a Tiny reenviar.
+    """
+    if not WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhooks desabilitados (WEBHOOK_SECRET não configurado)")
+    if not verificar(tenant, assinatura):
+        raise HTTPException(status_code=401, detail="Assinatura inválida")
+
+    try:
+        evento = interpretar(tenant, json_codec.loads(await request.body()))
+    except WebhookInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    if not fila_webhooks.enfileirar(evento):
+        raise HTTPException(status_code=503, detail="Fila de webhooks cheia", headers={"Retry-After": "5"})
+    return JSONResponse(content={"status": "OK"})
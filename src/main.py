@@ -3,14 +3,64 @@ Main FastAPI Application
 Entry point do MCP Tiny ERP Server
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 
-from src.api.mcp_server import router as mcp_router
+from src.api.mcp_server import router as mcp_router, sessions
 from src.api.test_endpoints import router as test_router
-from src.api.docs_endpoints import router as docs_router
+from src.api.docs_endpoints import router as docs_router, resposta_docs_html
+from src.api.webhooks_endpoints import router as webhooks_router
+from src.api.catalogo import preparar_catalogo, resposta_tools
+from src.services.tiny_client import startup_http_client, shutdown_http_client
+from src.services.cache import response_cache
+from src.services.storage import get_storage, shutdown_storage
+from src.services.log import configurar_logging
+from src.services.metrics import registro as metricas
+from src.services.rate_limiter import scheduler
+from src.services.idempotencia import idempotency_store
+from src.services.espelho import ESPELHOS
+from src.services.webhooks import fila_webhooks
+from src.services.snapshot_estoque import snapshot_estoque
+
+# LOG_LEVEL / LOG_FORMAT / LOG_DEBUG_AMOSTRAGEM
+configurar_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown: pool HTTP, backend compartilhado (STORAGE_URL) e varredura de sessões"""
+    await startup_http_client()
+
+    # Catálogo e docs serializados/comprimidos (gzip, brotli q11) antes da primeira requisição
+    preparar_catalogo()
+    resposta_docs_html()
+
+    storage = get_storage()
+    if storage.compartilhado:
+        sessions.backend = storage
+        response_cache.backend = storage
+        idempotency_store.backend = storage
+
+    await sessions.iniciar_varredura()
+    await fila_webhooks.iniciar()
+    for espelho in ESPELHOS:
+        await espelho.iniciar()
+    await snapshot_estoque.iniciar()
+    try:
+        yield
+    finally:
+        await snapshot_estoque.parar()
+        for espelho in ESPELHOS:
+            await espelho.parar()
+        await fila_webhooks.parar()
+        await sessions.parar_varredura()
+        await shutdown_storage()
+        await shutdown_http_client()
+
 
 # Inicializa FastAPI
 app = FastAPI(
@@ -18,7 +68,8 @@ app = FastAPI(
     description="Model Context Protocol server for Tiny ERP integration",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS
@@ -34,6 +85,7 @@ app.add_middleware(
 app.include_router(mcp_router)
 app.include_router(test_router)
 app.include_router(docs_router)
+app.include_router(webhooks_router)
 
 # Health check
 @app.get("/health")
@@ -53,14 +105,42 @@ async def root():
         "status": "online",
         "mcp_endpoint": "/mcp",
         "docs": "/docs",
-        "tools": "/tools"
+        "tools": "/tools",
+        "metrics": "/metrics"
     })
 
 
+# Gauges lidos na coleta (estado atual do processo; com vários workers, somar por instância)
+metricas.gauge("mcp_sessions_live", "Sessões MCP vivas neste worker", funcao=lambda: len(sessions))
+metricas.gauge("tiny_rate_limit_queue_depth", "Chamadas aguardando o rate limiter", funcao=scheduler.profundidade_fila)
+metricas.gauge("tiny_cache_entries", "Entradas no cache local de respostas", funcao=lambda: response_cache.estatisticas()["entradas"])
+metricas.gauge("tiny_cache_bytes", "Bytes no cache local de respostas", funcao=lambda: response_cache.bytes)
+metricas.gauge("tiny_webhooks_fila", "Eventos de webhook aguardando processamento", funcao=lambda: len(fila_webhooks))
+metricas.gauge(
+    "tiny_snapshot_estoque_saldos", "Saldos no snapshot de estoque (todos os tenants)",
+    funcao=lambda: snapshot_estoque.estatisticas()["saldos"]
+)
+for _espelho in ESPELHOS:
+    metricas.gauge(
+        f"tiny_espelho_{_espelho.nome}", f"Registros no espelho local de {_espelho.nome} (todos os tenants)",
+        funcao=lambda espelho=_espelho: espelho.estatisticas()["registros"]
+    )
+
+# Counters lidos na coleta (totais mantidos pelo próprio serviço; use rate())
+metricas.counter("tiny_cache_hits_total", "Hits do cache de respostas desde o início", funcao=lambda: response_cache.hits)
+metricas.counter("tiny_cache_misses_total", "Misses do cache de respostas desde o início", funcao=lambda: response_cache.misses)
+
+
+# Métricas Prometheus
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Latência por tool MCP e por endpoint Tiny, erros por classe, in-flight e sessões"""
+    return Response(content=metricas.renderizar(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 # Endpoint para listar todas as tools MCP
 @app.get("/tools", summary="Lista todas as tools MCP disponíveis", tags=["📋 Documentação"])
-async def list_tools():
+async def list_tools(request: Request):
     """
     Retorna a lista completa de todas as 77 tools MCP disponíveis no servidor.
 
@@ -68,21 +148,10 @@ async def list_tools():
     - **name**: Nome da tool
     - **description**: Descrição do que a tool faz  
     - **inputSchema**: Schema JSON dos parâmetros aceitos
-    """
-    from src.api.mcp_tools import TOOLS
 
-    tools_list = []
-    for tool in TOOLS:
-        tools_list.append({
-            "name": tool.name,
-            "description": tool.description,
-            "inputSchema": tool.inputSchema
-        })
-
-    return JSONResponse(content={
-        "total": len(tools_list),
-        "tools": tools_list
-    })
+    Resposta pré-serializada com ETag (If-None-Match → 304) e gzip/brotli.
+    """
+    return resposta_tools().responder(request)
 
 
 if __name__ == "__main__":
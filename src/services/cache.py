@@ -0,0 +1,439 @@
+"""
+Cache de respostas da API Tiny (read-through)
+TTL por endpoint, LRU por tenant, teto de memória e invalidação por escrita
+
+Com um backend compartilhado (STORAGE_URL=redis://...) vira um cache em dois
+níveis: memória local com TTL curto + backend compartilhado entre workers,
+invalidado por contador de geração por tenant/endpoint.
+
+Tenants que recebem webhooks da Tiny (ver services/webhooks.py) ficam em modo
+push para cada entidade que chega por webhook (produto, estoque, pedido): as
+leituras dela ficam no cache até um evento marcar a entidade como alterada
+(CACHE_TTLS_PUSH é só um teto de segurança).
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple, List
+
+from src.services import json_codec
+from src.services.log import get_logger
+from src.services.storage import StorageBackend, StorageError, chave_storage
+from src.services.tiny_endpoints import chave_token, chave_parametros
+
+log = get_logger(__name__)
+
+
+def _ler_ttls(padrao: Dict[str, float]) -> Dict[str, float]:
+    """Permite sobrescrever TTLs via TINY_CACHE_TTLS="produto.obter=60,categorias.lista=3600" """
+    ttls = dict(padrao)
+    for item in os.getenv("TINY_CACHE_TTLS", "").split(","):
+        if "=" in item:
+            endpoint, segundos = item.split("=", 1)
+            ttls[endpoint.strip()] = float(segundos)
+    return {endpoint: ttl for endpoint, ttl in ttls.items() if ttl > 0}
+
+
+# TTL (segundos) por endpoint de leitura cacheável
+CACHE_TTLS: Dict[str, float] = _ler_ttls({
+    "produto.obter": 300,
+    "contato.obter": 300,
+    "formas.pagamento.lista": 86400,
+    "categorias.lista": 86400,
+    "depositos.lista": 3600,
+    "vendedores.pesquisa": 3600,
+})
+
+# TTL (segundos) em modo push: a validade real vem da invalidação por webhook
+TINY_CACHE_TTL_PUSH = float(os.getenv("TINY_CACHE_TTL_PUSH", "21600"))
+CACHE_TTLS_PUSH: Dict[str, float] = {
+    "produto.obter": TINY_CACHE_TTL_PUSH,
+    "produto.obter.estoque": TINY_CACHE_TTL_PUSH,
+    "pedido.obter": TINY_CACHE_TTL_PUSH,
+}
+# Endpoint com TTL de push -> entidade (dos webhooks) cujos eventos o mantêm em dia
+ENTIDADES_PUSH: Dict[str, str] = {
+    "produto.obter": "produto",
+    "produto.obter.estoque": "estoque",
+    "pedido.obter": "pedido",
+}
+# Por quanto tempo após o último webhook da entidade o tenant segue em modo push para ela
+TINY_CACHE_PUSH_VALIDADE = float(os.getenv("TINY_CACHE_PUSH_VALIDADE", "86400"))
+# Por quanto tempo a marca de uma invalidação é guardada individualmente (e intervalo
+# da varredura que descarta as mais antigas e os tenants que saíram do modo push)
+TINY_CACHE_RETENCAO_INVALIDACAO = float(os.getenv("TINY_CACHE_RETENCAO_INVALIDACAO", "300"))
+
+# Endpoints de escrita -> endpoints cacheados que ficam obsoletos.
+# Quando a escrita tem "id", invalida só as chaves daquele id.
+INVALIDACOES: Dict[str, List[str]] = {
+    "produto.incluir": ["produto.obter"],
+    "produto.alterar": ["produto.obter", "produto.obter.estoque"],
+    "produto.atualizar.estoque": ["produto.obter", "produto.obter.estoque"],
+    "movimentacao.estoque.incluir": ["produto.obter", "produto.obter.estoque"],
+    "contato.incluir": ["contato.obter"],
+    "contato.alterar": ["contato.obter"],
+    "pedido.alterar": ["pedido.obter"],
+    "pedido.alterar.situacao": ["pedido.obter"],
+}
+
+# Escritas cujo id vai dentro do registro JSON (ex: {"contatos": [{"contato": {"id": ...}}]})
+# em vez de data["id"]: endpoint -> campo do registro
+ID_NO_REGISTRO: Dict[str, str] = {
+    "contato.alterar": "contato",
+}
+
+TINY_CACHE_MAX_ENTRADAS_TENANT = int(os.getenv("TINY_CACHE_MAX_ENTRADAS_TENANT", "1000"))
+TINY_CACHE_MAX_BYTES = int(os.getenv("TINY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# TTL máximo da cópia local quando há backend compartilhado (outros workers podem invalidar)
+TINY_CACHE_L1_TTL_COMPARTILHADO = float(os.getenv("TINY_CACHE_L1_TTL_COMPARTILHADO", "5"))
+
+Chave = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# (tenant, endpoint, id ou None = todos) a cada invalidação
+OuvinteInvalidacao = Callable[[str, str, Optional[str]], None]
+
+
+class _Entrada:
+    __slots__ = ("valor", "expira_em", "tamanho")
+
+    def __init__(self, valor: Dict[str, Any], expira_em: float, tamanho: int):
+        self.valor = valor
+        self.expira_em = expira_em
+        self.tamanho = tamanho
+
+
+class ResponseCache:
+    """
+    Cache em memória por tenant (tiny_token).
+
+    Os valores devolvidos são compartilhados entre chamadas: quem consome
+    não deve alterá-los in-place.
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float] = CACHE_TTLS,
+        ttls_push: Dict[str, float] = CACHE_TTLS_PUSH,
+        max_entradas_tenant: int = TINY_CACHE_MAX_ENTRADAS_TENANT,
+        max_bytes: int = TINY_CACHE_MAX_BYTES,
+        backend: Optional[StorageBackend] = None,
+        retencao_invalidacao: float = TINY_CACHE_RETENCAO_INVALIDACAO
+    ):
+        self.ttls = ttls
+        self.ttls_push = ttls_push
+        self.max_entradas_tenant = max_entradas_tenant
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.hits_compartilhado = 0
+        self.erros_backend = 0
+        self.tenants: Dict[str, "OrderedDict[Chave, _Entrada]"] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidacoes = 0
+        self.por_endpoint: Dict[str, Dict[str, int]] = {}
+        # (tenant, entidade) -> até quando está em modo push (monotonic)
+        self._push_ate: Dict[Tuple[str, str], float] = {}
+        # (tenant, endpoint) -> última invalidação; impede guardar uma leitura anterior a ela
+        self._invalidado_em: Dict[Tuple[str, str], float] = {}
+        # Marca mais recente já descartada de _invalidado_em: leituras iniciadas antes dela não são guardadas
+        self._invalidado_ate = 0.0
+        self.retencao_invalidacao = retencao_invalidacao
+        self._varrido_em = time.monotonic()
+        self._ouvintes: List[OuvinteInvalidacao] = []
+
+    @staticmethod
+    def _chave(endpoint: str, data: Optional[Dict[str, Any]]) -> Chave:
+        return endpoint, chave_parametros(data)
+
+    def ttl_para(self, endpoint: str, token: Optional[str] = None) -> Optional[float]:
+        """TTL do endpoint (o de push se o tenant do token recebe webhooks da entidade); None = não cacheável"""
+        entidade = ENTIDADES_PUSH.get(endpoint)
+        if (
+            token is not None and entidade is not None and endpoint in self.ttls_push
+            and self.push_ativo(chave_token(token), entidade)
+        ):
+            return self.ttls_push[endpoint]
+        return self.ttls.get(endpoint)
+
+    def ativar_push(self, tenant: str, entidade: str, validade: float = TINY_CACHE_PUSH_VALIDADE) -> None:
+        """Tenant (chave_token) recebendo webhooks da entidade: as leituras dela ficam até a invalidação"""
+        self._push_ate[(tenant, entidade)] = time.monotonic() + validade
+        self._varrer()
+
+    def desativar_push(self, tenant: str, entidade: str) -> None:
+        """Volta aos TTLs normais (ex: eventos da entidade descartados sem invalidar)"""
+        self._push_ate.pop((tenant, entidade), None)
+
+    def push_ativo(self, tenant: str, entidade: str) -> bool:
+        ate = self._push_ate.get((tenant, entidade))
+        if ate is None:
+            return False
+        if ate <= time.monotonic():
+            del self._push_ate[(tenant, entidade)]
+            return False
+        return True
+
+    def _varrer(self) -> None:
+        """Descarta tenants fora do modo push e marcas de invalidação mais antigas que a retenção"""
+        agora = time.monotonic()
+        if agora - self._varrido_em < self.retencao_invalidacao:
+            return
+        self._varrido_em = agora
+        for chave in [chave for chave, ate in self._push_ate.items() if ate <= agora]:
+            del self._push_ate[chave]
+        limite = agora - self.retencao_invalidacao
+        for chave in [chave for chave, em in self._invalidado_em.items() if em < limite]:
+            self._invalidado_ate = max(self._invalidado_ate, self._invalidado_em.pop(chave))
+
+    def ao_invalidar(self, ouvinte: OuvinteInvalidacao) -> None:
+        """Avisa outra cópia em memória (ex: snapshot de estoque) das invalidações por escrita ou webhook"""
+        self._ouvintes.append(ouvinte)
+
+    def _contar(self, endpoint: str, campo: str) -> None:
+        contadores = self.por_endpoint.setdefault(endpoint, {"hits": 0, "misses": 0})
+        contadores[campo] += 1
+
+    def _remover(self, entradas: "OrderedDict[Chave, _Entrada]", chave: Chave) -> None:
+        entrada = entradas.pop(chave)
+        self.bytes -= entrada.tamanho
+
+    def _obter_local(self, tenant: str, chave: Chave) -> Optional[Dict[str, Any]]:
+        entradas = self.tenants.get(tenant)
+        entrada = entradas.get(chave) if entradas is not None else None
+        if entrada is None:
+            return None
+        if entrada.expira_em <= time.monotonic():
+            self._remover(entradas, chave)
+            return None
+        entradas.move_to_end(chave)
+        return entrada.valor
+
+    async def obter(self, token: str, endpoint: str, data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Retorna a resposta cacheada ou None (miss/expirada)"""
+        tenant = chave_token(token)
+        chave = self._chave(endpoint, data)
+
+        valor = self._obter_local(tenant, chave)
+        if valor is None and self.backend is not None:
+            valor, tamanho = await self._obter_compartilhado(tenant, chave)
+            ttl = self.ttl_para(endpoint, token)
+            if valor is not None and ttl is not None:
+                self.hits_compartilhado += 1
+                self._guardar_local(tenant, chave, valor, tamanho, self._ttl_local(ttl))
+
+        if valor is None:
+            self.misses += 1
+            self._contar(endpoint, "misses")
+            return None
+
+        self.hits += 1
+        self._contar(endpoint, "hits")
+        return valor
+
+    async def guardar(
+        self,
+        token: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]],
+        valor: Dict[str, Any],
+        tamanho: int,
+        iniciado_em: Optional[float] = None,
+        geracao: Optional[str] = None
+    ) -> None:
+        """
+        Armazena a resposta se o endpoint for cacheável e cabe no teto de memória.
+        iniciado_em (monotonic do início da leitura): descarta a resposta se o
+        endpoint foi invalidado para o tenant enquanto ela estava em andamento.
+        geracao (de geracao() no início da leitura): com backend compartilhado,
+        descarta a resposta se outro worker invalidou o endpoint nesse meio tempo.
+        """
+        ttl = self.ttl_para(endpoint, token)
+        if ttl is None or tamanho > self.max_bytes:
+            return
+
+        tenant = chave_token(token)
+        if iniciado_em is not None:
+            # Marcas descartadas pela varredura valem como limite conservador para qualquer endpoint
+            invalidado_em = max(self._invalidado_em.get((tenant, endpoint), 0.0), self._invalidado_ate)
+            if invalidado_em >= iniciado_em:
+                return
+        chave = self._chave(endpoint, data)
+        atual = None
+        if self.backend is not None:
+            atual = await self._geracao(tenant, endpoint)
+            if atual != geracao:
+                return
+        self._guardar_local(tenant, chave, valor, tamanho, self._ttl_local(ttl))
+        if atual is not None:
+            # atual None com backend: indisponível, fica só a cópia local
+            await self._guardar_compartilhado(tenant, chave, valor, ttl, atual)
+
+    def _ttl_local(self, ttl: float) -> float:
+        return min(ttl, TINY_CACHE_L1_TTL_COMPARTILHADO) if self.backend is not None else ttl
+
+    def _guardar_local(self, tenant: str, chave: Chave, valor: Dict[str, Any], tamanho: int, ttl: float) -> None:
+        entradas = self.tenants.setdefault(tenant, OrderedDict())
+        if chave in entradas:
+            self._remover(entradas, chave)
+
+        entradas[chave] = _Entrada(valor, time.monotonic() + ttl, tamanho)
+        self.bytes += tamanho
+
+        while len(entradas) > self.max_entradas_tenant:
+            self._remover(entradas, next(iter(entradas)))
+            self.evictions += 1
+        self._respeitar_teto(entradas)
+
+    def _respeitar_teto(self, preferido: "OrderedDict[Chave, _Entrada]") -> None:
+        """Despeja LRU do tenant atual e, se preciso, do tenant com mais entradas"""
+        while self.bytes > self.max_bytes:
+            alvo = preferido if len(preferido) > 1 else max(self.tenants.values(), key=len)
+            if not alvo:
+                break
+            self._remover(alvo, next(iter(alvo)))
+            self.evictions += 1
+
+    # -------------------------------------------------------------------------
+    # Nível compartilhado (backend)
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _chave_geracao(tenant: str, endpoint: str) -> str:
+        return chave_storage("cachegen", tenant, endpoint)
+
+    async def geracao(self, token: str, endpoint: str) -> Optional[str]:
+        """Geração do endpoint no backend compartilhado no início de uma leitura (repassar a guardar)"""
+        if self.backend is None:
+            return None
+        return await self._geracao(chave_token(token), endpoint)
+
+    async def _geracao(self, tenant: str, endpoint: str) -> Optional[str]:
+        """Geração atual (None se o backend não respondeu)"""
+        try:
+            geracao = await self.backend.get(self._chave_geracao(tenant, endpoint))
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Cache compartilhado indisponível: %s", e)
+            return None
+        return (geracao or b"0").decode()
+
+    @staticmethod
+    def _chave_compartilhada(tenant: str, chave: Chave, geracao: str) -> str:
+        endpoint, params = chave
+        resumo = hashlib.sha1(repr(params).encode("utf-8")).hexdigest()
+        return chave_storage("cache", tenant, endpoint, geracao, resumo)
+
+    async def _obter_compartilhado(self, tenant: str, chave: Chave) -> Tuple[Optional[Dict[str, Any]], int]:
+        geracao = await self._geracao(tenant, chave[0])
+        if geracao is None:
+            return None, 0
+        try:
+            dados = await self.backend.get(self._chave_compartilhada(tenant, chave, geracao))
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Cache compartilhado indisponível: %s", e)
+            return None, 0
+        if dados is None:
+            return None, 0
+        return json_codec.loads(dados), len(dados)
+
+    async def _guardar_compartilhado(
+        self,
+        tenant: str,
+        chave: Chave,
+        valor: Dict[str, Any],
+        ttl: float,
+        geracao: str
+    ) -> None:
+        try:
+            dados = json_codec.dumps(valor)
+            await self.backend.set(self._chave_compartilhada(tenant, chave, geracao), dados, ttl=ttl)
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Cache compartilhado indisponível: %s", e)
+
+    async def invalidar(self, token: str, endpoint: str, item_id: Optional[str] = None) -> int:
+        """
+        Remove as chaves de um endpoint (todas ou só as de um id).
+        No backend compartilhado a geração do endpoint é incrementada, o que
+        descarta todas as chaves dele para o tenant em todos os workers.
+        """
+        return await self.invalidar_tenant(chave_token(token), endpoint, item_id)
+
+    async def invalidar_tenant(self, tenant: str, endpoint: str, item_id: Optional[str] = None) -> int:
+        """invalidar() pela chave do tenant (webhooks só conhecem a chave_token, não o token)"""
+        self._invalidado_em[(tenant, endpoint)] = time.monotonic()
+        self._varrer()
+        for ouvinte in self._ouvintes:
+            ouvinte(tenant, endpoint, None if item_id is None else str(item_id))
+        if self.backend is not None:
+            try:
+                await self.backend.incr(self._chave_geracao(tenant, endpoint))
+            except StorageError as e:
+                self.erros_backend += 1
+                log.warning("Falha ao invalidar cache compartilhado: %s", e)
+
+        entradas = self.tenants.get(tenant)
+        if not entradas:
+            return 0
+
+        alvo = [
+            chave for chave in entradas
+            if chave[0] == endpoint and (item_id is None or ("id", str(item_id)) in chave[1])
+        ]
+        for chave in alvo:
+            self._remover(entradas, chave)
+        self.invalidacoes += len(alvo)
+        return len(alvo)
+
+    async def invalidar_escrita(self, token: str, endpoint: str, data: Optional[Dict[str, Any]]) -> None:
+        """Aplica INVALIDACOES após uma chamada de escrita"""
+        item_id = id_escrita(endpoint, data)
+        for relacionado in INVALIDACOES.get(endpoint, []):
+            await self.invalidar(token, relacionado, item_id)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entradas": sum(len(entradas) for entradas in self.tenants.values()),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "hits_compartilhado": self.hits_compartilhado,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidacoes": self.invalidacoes,
+            "backend_compartilhado": self.backend is not None,
+            "erros_backend": self.erros_backend,
+            "tenants_push": len({tenant for tenant, entidade in list(self._push_ate) if self.push_ativo(tenant, entidade)}),
+            "por_endpoint": self.por_endpoint
+        }
+
+
+def id_escrita(endpoint: str, data: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Id do registro alterado pela escrita, ou None (invalida o endpoint inteiro)"""
+    data = data or {}
+    if data.get("id"):
+        return str(data["id"])
+    campo = ID_NO_REGISTRO.get(endpoint)
+    if campo is None or not isinstance(data.get(campo), (str, bytes)):
+        return None
+    try:
+        registro = json_codec.loads(data[campo])
+    except ValueError:
+        return None
+    # {"contatos": [{"contato": {...}}]} (um registro só) ou {"contato": {...}}
+    registros = registro.get(campo + "s") if isinstance(registro, dict) else None
+    if isinstance(registros, list):
+        registro = registros[0] if len(registros) == 1 else None
+    registro = registro.get(campo) if isinstance(registro, dict) else None
+    item_id = registro.get("id") if isinstance(registro, dict) else None
+    return str(item_id) if item_id else None
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,377 @@
+"""
+Espelhos locais do catálogo (produtos e contatos, por tenant)
+Sincronização completa paginando *.pesquisa, atualização incremental (quando a
+Tiny oferece lista.atualizacoes.*) e pesquisa em memória para as tools
+*_pesquisar com source=local (palavras em qualquer parte) ou source=indice
+(índice aproximado, ver services/indice_busca.py).
+
+O espelho de um tenant nasce na primeira pesquisa local e é descartado após
+ESPELHO_*_INATIVIDADE sem uso. Enquanto não fica pronto (ou se ficar velho
+demais), a pesquisa vai para a Tiny normalmente. Cada worker mantém o próprio
+espelho.
+"""
+
+import asyncio
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, FrozenSet, NamedTuple, Optional, List, Tuple
+
+from src.services.indice_busca import IndiceTexto, dobrar
+from src.services.log import get_logger
+from src.services.por_tenant import EstadoTenant, ServicoPorTenant
+from src.services.tiny_client import TinyAPIClient
+from src.services.tiny_endpoints import chave_token
+
+log = get_logger(__name__)
+
+# Tamanho de página de *.pesquisa na Tiny (mantido nas respostas locais)
+POR_PAGINA_TINY = 100
+
+# Horário de Brasília (sem horário de verão desde 2019), usado em dataAlteracao
+FUSO_TINY = timezone(timedelta(hours=-3))
+# Sobreposição entre atualizações incrementais (relógios e alterações em andamento)
+MARGEM_INCREMENTAL = timedelta(minutes=2)
+
+CODIGO_SEM_REGISTROS = "20"
+
+# Modos de pesquisa local aceitos em "source"
+SOURCES_LOCAIS = ("local", "indice")
+
+
+class ErroSincronizacao(Exception):
+    """A Tiny devolveu erro no meio de uma sincronização"""
+
+
+class ConfigEspelho(NamedTuple):
+    """O que espelhar e como pesquisar uma entidade"""
+    entidade: str                        # "produto" (chave de cada item na lista)
+    chave_lista: str                     # "produtos"
+    metodo_pesquisa: str                 # método do TinyAPIClient paginado na sincronização completa
+    metodo_alterados: Optional[str]      # incremental (None = só ressincronização completa)
+    campos_busca: Dict[str, float]       # campo -> peso no índice
+    campos_compactos: FrozenSet[str]     # também indexados sem separadores (CPF, SKU, GTIN)
+    filtros: Dict[str, str]              # argumento da tool -> campo do registro (igualdade)
+    particao: Optional[str] = None       # argumento sincronizado por valor (ex: situacao)
+    valores_particao: Tuple[str, ...] = ()
+    padrao_particao: Optional[str] = None
+
+
+def _env(prefixo: str, nome: str, padrao: str) -> str:
+    return os.getenv(f"ESPELHO_{prefixo}_{nome}", padrao)
+
+
+def sem_registros(retorno: Dict[str, Any]) -> bool:
+    return str(retorno.get("codigo_erro", "")) == CODIGO_SEM_REGISTROS
+
+
+def marca_tiny(instante: datetime) -> str:
+    return (instante - MARGEM_INCREMENTAL).strftime("%d/%m/%Y %H:%M:%S")
+
+
+def resposta_sem_registros(origem: str) -> Dict[str, Any]:
+    """Mesmo erro da Tiny para pesquisa vazia (ou página além da última)"""
+    return {"retorno": {
+        "status_processamento": "2",
+        "status": "Erro",
+        "codigo_erro": CODIGO_SEM_REGISTROS,
+        "erros": [{"erro": "A consulta não retornou registros"}],
+        "origem": origem
+    }}
+
+
+class _EspelhoTenant(EstadoTenant):
+    """Registros de um tenant: id -> (texto normalizado, registro como veio da Tiny) + índice"""
+
+    def __init__(self, token: str, indice: IndiceTexto):
+        super().__init__(token)
+        self.registros: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self.indice = indice
+        self.pronto = False
+        self.precisa_completa = True
+        self.sincronizado_em: Optional[float] = None
+        self.ultima_completa: Optional[float] = None
+        self.marca_incremental: Optional[str] = None
+
+    def idade(self) -> Optional[float]:
+        if self.sincronizado_em is None:
+            return None
+        return time.monotonic() - self.sincronizado_em
+
+
+class Espelho(ServicoPorTenant[_EspelhoTenant]):
+    """
+    Espelhos de uma entidade por tenant (LRU, até max_tenants) e o loop que
+    os mantém atualizados. Configuração via ESPELHO_<PREFIXO>_*.
+    """
+
+    def __init__(self, config: ConfigEspelho, prefixo: str, intervalo_padrao: str):
+        super().__init__(
+            # Intervalo da atualização (incremental, ou completa se não houver)
+            intervalo=float(_env(prefixo, "INTERVALO", intervalo_padrao)),
+            inatividade=float(_env(prefixo, "INATIVIDADE", "86400")),
+            max_tenants=int(_env(prefixo, "MAX_TENANTS", "200")),
+            concorrencia=int(_env(prefixo, "CONCORRENCIA", "2"))
+        )
+        self.config = config
+        self.nome = config.chave_lista
+        # Intervalo da ressincronização completa
+        self.resync = float(_env(prefixo, "RESYNC", "21600"))
+        # Acima desta idade (s desde a última sincronização OK) a pesquisa volta para a Tiny
+        self.idade_max = float(_env(prefixo, "IDADE_MAX", "3600"))
+        self.max_paginas = int(_env(prefixo, "MAX_PAGINAS", "1000"))
+        # Sessão do scheduler usada pela sincronização: divide a cota do tenant de
+        # forma justa com as sessões dos agentes em vez de passar na frente delas
+        self.sessao = f"espelho-{self.nome}"
+        self.sincronizacoes_completas = 0
+        self.sincronizacoes_incrementais = 0
+        self.falhas = 0
+        self.consultas_locais = 0
+        self.consultas_repassadas = 0
+
+    def _novo_indice(self) -> IndiceTexto:
+        return IndiceTexto(self.config.campos_busca, self.config.campos_compactos)
+
+    def _texto_busca(self, registro: Dict[str, Any]) -> str:
+        return " ".join(dobrar(registro.get(campo)) for campo in self.config.campos_busca)
+
+    def _novo_tenant(self, token: str) -> _EspelhoTenant:
+        return _EspelhoTenant(token, self._novo_indice())
+
+    # -------------------------------------------------------------------------
+    # Sincronização
+    # -------------------------------------------------------------------------
+
+    async def _atualizar(self, tenant: _EspelhoTenant) -> None:
+        agora = time.monotonic()
+        completa = (
+            tenant.precisa_completa
+            or self.config.metodo_alterados is None
+            or tenant.marca_incremental is None
+            or tenant.ultima_completa is None
+            or agora - tenant.ultima_completa >= self.resync
+        )
+        id_tenant = chave_token(tenant.token)
+        async with self._semaforo:
+            inicio = time.perf_counter()
+            try:
+                if completa:
+                    await self._sincronizar_completo(tenant)
+                else:
+                    await self._sincronizar_incremental(tenant)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.falhas += 1
+                tenant.erros += 1
+                tenant.ultimo_erro = str(e)
+                # Incremental falhou: a próxima rodada refaz tudo
+                tenant.precisa_completa = True
+                log.warning(
+                    "Falha ao sincronizar espelho de %s: %s", self.nome, e,
+                    extra={"tenant": id_tenant, "completa": completa}
+                )
+                return
+
+        tenant.sincronizado_em = time.monotonic()
+        tenant.pronto = True
+        log.info(
+            "Espelho de %s sincronizado (%s): %d registros em %.1fs",
+            self.nome, "completo" if completa else "incremental", len(tenant.registros),
+            time.perf_counter() - inicio,
+            extra={"tenant": id_tenant}
+        )
+
+    async def _paginas(self, client: TinyAPIClient, metodo: str, **filtros):
+        """Registros da entidade em todas as páginas; "sem registros" encerra sem erro"""
+        entidade = self.config.entidade
+        async for pagina in client.iterar_paginas(metodo, max_paginas=self.max_paginas, **filtros):
+            retorno = pagina.get("retorno", {})
+            if retorno.get("status") != "OK":
+                if sem_registros(retorno):
+                    return
+                raise ErroSincronizacao(f"{metodo}: {retorno.get('erros') or retorno.get('codigo_erro')}")
+            for item in retorno.get(self.config.chave_lista) or []:
+                registro = item.get(entidade, item) if isinstance(item, dict) else None
+                if isinstance(registro, dict) and registro.get("id") is not None:
+                    yield registro
+
+    async def _sincronizar_completo(self, tenant: _EspelhoTenant) -> None:
+        config = self.config
+        marca = marca_tiny(datetime.now(FUSO_TINY))
+        client = TinyAPIClient(token=tenant.token, session_id=self.sessao)
+        registros: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        indice = self._novo_indice()
+        for valor in (config.valores_particao if config.particao else (None,)):
+            filtros = {config.particao: valor} if config.particao else {}
+            async for registro in self._paginas(client, config.metodo_pesquisa, pesquisa="", **filtros):
+                id_registro = str(registro["id"])
+                registros[id_registro] = (self._texto_busca(registro), registro)
+                indice.adicionar(id_registro, registro)
+
+        # Troca de uma vez: pesquisas em andamento seguem nos dados anteriores
+        tenant.registros = registros
+        tenant.indice = indice
+        tenant.marca_incremental = marca
+        tenant.ultima_completa = time.monotonic()
+        tenant.precisa_completa = False
+        self.sincronizacoes_completas += 1
+
+    def _espelhado(self, registro: Dict[str, Any]) -> bool:
+        config = self.config
+        if not config.particao:
+            return True
+        return registro.get(self.config.filtros[config.particao], config.padrao_particao) in config.valores_particao
+
+    async def _sincronizar_incremental(self, tenant: _EspelhoTenant) -> None:
+        marca = marca_tiny(datetime.now(FUSO_TINY))
+        client = TinyAPIClient(token=tenant.token, session_id=self.sessao)
+        alterados: List[Dict[str, Any]] = []
+        async for registro in self._paginas(
+            client, self.config.metodo_alterados, data_alteracao=tenant.marca_incremental
+        ):
+            alterados.append(registro)
+
+        for registro in alterados:
+            id_registro = str(registro["id"])
+            if self._espelhado(registro):
+                tenant.registros[id_registro] = (self._texto_busca(registro), registro)
+                tenant.indice.adicionar(id_registro, registro)
+            else:
+                tenant.registros.pop(id_registro, None)
+                tenant.indice.remover(id_registro)
+        tenant.marca_incremental = marca
+        self.sincronizacoes_incrementais += 1
+
+    # -------------------------------------------------------------------------
+    # Pesquisa
+    # -------------------------------------------------------------------------
+
+    def _passa_filtros(self, registro: Dict[str, Any], filtros: Dict[str, Any]) -> bool:
+        return all(str(registro.get(campo) or "") == str(valor) for campo, valor in filtros.items())
+
+    def filtrar(self, tenant: _EspelhoTenant, pesquisa: str, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """source=local: registros que contêm todas as palavras da pesquisa, na ordem da Tiny"""
+        palavras = dobrar(pesquisa).split()
+        return [
+            registro for texto, registro in tenant.registros.values()
+            if self._passa_filtros(registro, filtros) and all(palavra in texto for palavra in palavras)
+        ]
+
+    def ranquear(self, tenant: _EspelhoTenant, pesquisa: str, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """source=indice: registros por relevância (sem acentos, prefixos e erros de digitação)"""
+        if not dobrar(pesquisa):
+            return self.filtrar(tenant, pesquisa, filtros)
+        registros = tenant.registros
+        encontrados = (registros.get(id_registro) for id_registro, _ in tenant.indice.buscar(pesquisa))
+        return [
+            item[1] for item in encontrados
+            if item is not None and self._passa_filtros(item[1], filtros)
+        ]
+
+    async def pesquisar(
+        self,
+        client: TinyAPIClient,
+        arguments: Dict[str, Any],
+        source: str = "local"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pesquisa no espelho, no formato do *.pesquisa da Tiny.
+        None quando o espelho não pode responder (ainda sincronizando, velho
+        demais ou partição não espelhada): quem chama repassa para a Tiny.
+        """
+        config = self.config
+        filtros: Dict[str, Any] = {}
+        for argumento, campo in config.filtros.items():
+            valor = arguments.get(argumento)
+            if argumento == config.particao:
+                valor = valor or config.padrao_particao
+                if valor not in config.valores_particao:
+                    self.consultas_repassadas += 1
+                    return None
+            if valor:
+                filtros[campo] = valor
+
+        tenant = self.registrar(client.token)
+        idade = tenant.idade()
+        if not tenant.pronto or idade is None or idade > self.idade_max:
+            self.consultas_repassadas += 1
+            return None
+
+        self.consultas_locais += 1
+        pesquisa = arguments.get("pesquisa", "")
+        if source == "indice":
+            registros = self.ranquear(tenant, pesquisa, filtros)
+        else:
+            registros = self.filtrar(tenant, pesquisa, filtros)
+
+        max_registros = arguments.get("max_registros")
+        if arguments.get("todas_paginas") or max_registros:
+            pagina = 1
+            selecionados = registros[:max_registros] if max_registros else registros
+        else:
+            pagina = max(1, int(arguments.get("pagina") or 1))
+            selecionados = registros[(pagina - 1) * POR_PAGINA_TINY:pagina * POR_PAGINA_TINY]
+
+        if not selecionados:
+            return resposta_sem_registros(source)
+
+        return {"retorno": {
+            "status_processamento": "3",
+            "status": "OK",
+            "pagina": pagina,
+            "numero_paginas": math.ceil(len(registros) / POR_PAGINA_TINY),
+            "registros": len(selecionados),
+            config.chave_lista: [{config.entidade: registro} for registro in selecionados],
+            "origem": source,
+            "espelho_idade_segundos": round(idade)
+        }}
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "tenants": len(self._tenants),
+            "prontos": sum(1 for tenant in self._tenants.values() if tenant.pronto),
+            "registros": sum(len(tenant.registros) for tenant in self._tenants.values()),
+            "termos_indice": sum(tenant.indice.estatisticas()["termos"] for tenant in self._tenants.values()),
+            "sincronizacoes_completas": self.sincronizacoes_completas,
+            "sincronizacoes_incrementais": self.sincronizacoes_incrementais,
+            "falhas": self.falhas,
+            "consultas_locais": self.consultas_locais,
+            "consultas_repassadas": self.consultas_repassadas
+        }
+
+
+# Situações de produto espelhadas (A=Ativo, I=Inativo, E=Excluído); pesquisas por outras vão para a Tiny
+ESPELHO_PRODUTOS_SITUACOES = tuple(
+    s.strip() for s in os.getenv("ESPELHO_PRODUTOS_SITUACOES", "A").split(",") if s.strip()
+)
+
+espelho_produtos = Espelho(ConfigEspelho(
+    entidade="produto",
+    chave_lista="produtos",
+    metodo_pesquisa="pesquisar_produtos",
+    metodo_alterados="listar_produtos_alterados",
+    campos_busca={"nome": 3.0, "codigo": 2.0, "gtin": 2.0},
+    campos_compactos=frozenset({"codigo", "gtin"}),
+    filtros={"situacao": "situacao", "gtin": "gtin"},
+    particao="situacao",
+    valores_particao=ESPELHO_PRODUTOS_SITUACOES,
+    padrao_particao="A"
+), prefixo="PRODUTOS", intervalo_padrao="300")
+
+# contatos.pesquisa não tem lista de alterações: atualização por ressincronização completa
+espelho_contatos = Espelho(ConfigEspelho(
+    entidade="contato",
+    chave_lista="contatos",
+    metodo_pesquisa="pesquisar_contatos",
+    metodo_alterados=None,
+    campos_busca={
+        "nome": 3.0, "fantasia": 2.0, "cpf_cnpj": 3.0, "codigo": 2.0,
+        "email": 2.0, "fone": 1.0, "celular": 1.0, "cidade": 0.5,
+    },
+    campos_compactos=frozenset({"cpf_cnpj", "codigo", "fone", "celular"}),
+    filtros={"tipo_pessoa": "tipo_pessoa"}
+), prefixo="CONTATOS", intervalo_padrao="1800")
+
+ESPELHOS = (espelho_produtos, espelho_contatos)
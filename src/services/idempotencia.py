@@ -0,0 +1,203 @@
+"""
+Chaves de idempotência para escritas que criam registros no Tiny
+(pedido.incluir, conta.receber.incluir, contato.incluir)
+
+Um agente que repete tiny_pedido_incluir após um timeout não deve gerar um
+pedido duplicado. Cada escrita recebe uma chave:
+- explícita (argumento chave_idempotencia), válida por IDEMPOTENCIA_TTL; ou
+- derivada do hash do payload já sanitizado, válida por IDEMPOTENCIA_TTL_DERIVADA
+  (janela curta: o mesmo pedido idêntico em poucos minutos é repetição)
+
+Estados guardados no backend (STORAGE_URL, compartilhado entre workers):
+- em_andamento: a primeira chamada está em curso
+- concluido: resultado OK da Tiny (retorno e registros), devolvido nas repetições sem chamar a Tiny
+- incerto: a chamada falhou depois de enviada (ex: timeout de leitura); não
+  dá para saber se a Tiny criou o registro, então a repetição é recusada
+
+Falhas em que a Tiny comprovadamente não processou (conexão recusada, 4xx,
+retorno ou registro com status Erro) liberam a chave para nova tentativa.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
+
+import httpx
+
+from src.services import json_codec
+from src.services.log import get_logger
+from src.services.storage import StorageBackend, MemoryBackend, StorageError, chave_storage
+from src.services.tiny_endpoints import chave_token, chave_parametros, escrita_ok
+
+log = get_logger(__name__)
+
+IDEMPOTENCIA_TTL = float(os.getenv("IDEMPOTENCIA_TTL", "86400"))
+IDEMPOTENCIA_TTL_DERIVADA = float(os.getenv("IDEMPOTENCIA_TTL_DERIVADA", "900"))
+# Quanto tempo uma chamada "em_andamento" segura a chave (deve cobrir timeout + retries)
+IDEMPOTENCIA_TTL_EM_ANDAMENTO = float(os.getenv("IDEMPOTENCIA_TTL_EM_ANDAMENTO", "180"))
+
+ENDPOINTS_IDEMPOTENTES = frozenset({"pedido.incluir", "conta.receber.incluir", "contato.incluir"})
+
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+INCERTO = "incerto"
+
+
+class ConflitoIdempotencia(Exception):
+    """A chave já foi usada (em andamento, resultado incerto ou payload diferente)"""
+
+
+def _resultado_incerto(erro: BaseException) -> bool:
+    """True se a requisição pode ter sido processada pela Tiny apesar do erro"""
+    if isinstance(erro, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return False
+    if isinstance(erro, (httpx.TimeoutException, httpx.ReadError, httpx.WriteError, httpx.RemoteProtocolError)):
+        return True
+    if isinstance(erro, httpx.HTTPStatusError):
+        return erro.response.status_code >= 500
+    return False
+
+
+class IdempotencyStore:
+    """Registro de escritas idempotentes por tenant/endpoint/chave"""
+
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or MemoryBackend()
+        # Execuções em curso neste processo (repetições concorrentes aguardam a mesma)
+        self._em_curso: Dict[str, Tuple["asyncio.Task[Dict[str, Any]]", str]] = {}
+        self.replays = 0
+        self.conflitos = 0
+        self.executadas = 0
+        self.erros_backend = 0
+
+    @staticmethod
+    def _hash_payload(endpoint: str, data: Optional[Dict[str, Any]]) -> str:
+        return hashlib.sha256(repr((endpoint, chave_parametros(data))).encode("utf-8")).hexdigest()
+
+    def _chave(self, token: str, endpoint: str, chave_idempotencia: str) -> str:
+        resumo = hashlib.sha256(chave_idempotencia.encode("utf-8")).hexdigest()[:32]
+        return chave_storage("idem", chave_token(token), endpoint, resumo)
+
+    async def _ler(self, chave: str) -> Optional[Dict[str, Any]]:
+        dados = await self.backend.get(chave)
+        return json_codec.loads(dados) if dados is not None else None
+
+    async def _gravar(self, chave: str, registro: Dict[str, Any], ttl: float) -> None:
+        try:
+            await self.backend.set(chave, json_codec.dumps(registro), ttl=ttl)
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Falha ao gravar chave de idempotência: %s", e)
+
+    async def _remover(self, chave: str) -> None:
+        try:
+            await self.backend.delete(chave)
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Falha ao liberar chave de idempotência: %s", e)
+
+    def _responder_existente(self, registro: Dict[str, Any], hash_payload: str, endpoint: str) -> Dict[str, Any]:
+        if registro.get("payload") != hash_payload:
+            self.conflitos += 1
+            raise ConflitoIdempotencia(
+                f"chave_idempotencia já usada em {endpoint} com outro conteúdo; use uma chave nova"
+            )
+        estado = registro.get("estado")
+        if estado == CONCLUIDO:
+            self.replays += 1
+            log.info("Repetição idempotente de %s: devolvendo resultado anterior", endpoint, extra={"endpoint": endpoint})
+            return {**registro["resultado"], "replay_idempotente": True}
+        self.conflitos += 1
+        if estado == INCERTO:
+            raise ConflitoIdempotencia(
+                f"A tentativa anterior de {endpoint} falhou sem confirmação da Tiny ({registro.get('erro')}). "
+                "Confira no Tiny se o registro foi criado antes de repetir com uma nova chave_idempotencia."
+            )
+        raise ConflitoIdempotencia(f"{endpoint} com esta chave_idempotencia ainda está em andamento")
+
+    async def executar(
+        self,
+        token: str,
+        endpoint: str,
+        data: Optional[Dict[str, Any]],
+        chave_idempotencia: Optional[str],
+        chamada: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Executa a escrita uma única vez por chave; repetições devolvem o resultado guardado"""
+        hash_payload = self._hash_payload(endpoint, data)
+        explicita = bool(chave_idempotencia)
+        chave = self._chave(token, endpoint, chave_idempotencia if explicita else hash_payload)
+        ttl = IDEMPOTENCIA_TTL if explicita else IDEMPOTENCIA_TTL_DERIVADA
+
+        em_curso = self._em_curso.get(chave)
+        if em_curso is not None:
+            tarefa, hash_em_curso = em_curso
+            if hash_em_curso != hash_payload:
+                self.conflitos += 1
+                raise ConflitoIdempotencia(
+                    f"chave_idempotencia já usada em {endpoint} com outro conteúdo; use uma chave nova"
+                )
+            # Repetição concorrente no mesmo processo: aguarda a primeira
+            self.replays += 1
+            resultado = await asyncio.shield(tarefa)
+            return {**resultado, "replay_idempotente": True}
+
+        marcador = {"estado": EM_ANDAMENTO, "payload": hash_payload, "inicio": time.time()}
+        try:
+            registrada = await self.backend.set_se_ausente(
+                chave, json_codec.dumps(marcador), ttl=IDEMPOTENCIA_TTL_EM_ANDAMENTO
+            )
+            if not registrada:
+                registro = await self._ler(chave)
+                if registro is not None:
+                    return self._responder_existente(registro, hash_payload, endpoint)
+                # Expirou entre as duas operações: segue como primeira chamada
+        except StorageError as e:
+            # Sem backend a escrita não é bloqueada (mesmo comportamento de antes)
+            self.erros_backend += 1
+            log.warning("Idempotência indisponível, executando sem proteção: %s", e)
+
+        tarefa = asyncio.ensure_future(self._executar_registrando(chave, hash_payload, ttl, chamada))
+        self._em_curso[chave] = (tarefa, hash_payload)
+        tarefa.add_done_callback(lambda _: self._em_curso.pop(chave, None))
+        return await asyncio.shield(tarefa)
+
+    async def _executar_registrando(
+        self,
+        chave: str,
+        hash_payload: str,
+        ttl: float,
+        chamada: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        self.executadas += 1
+        try:
+            resultado = await chamada()
+        except BaseException as e:
+            if _resultado_incerto(e):
+                registro = {"estado": INCERTO, "payload": hash_payload, "erro": type(e).__name__}
+                await self._gravar(chave, registro, ttl)
+            else:
+                await self._remover(chave)
+            raise
+
+        if escrita_ok(resultado.get("retorno", {})):
+            await self._gravar(chave, {"estado": CONCLUIDO, "payload": hash_payload, "resultado": resultado}, ttl)
+        else:
+            # Tiny recusou (validação etc., também só no registro): nada foi criado, a chave fica livre
+            await self._remover(chave)
+        return resultado
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "em_curso": len(self._em_curso),
+            "executadas": self.executadas,
+            "replays": self.replays,
+            "conflitos": self.conflitos,
+            "backend_compartilhado": self.backend.compartilhado,
+            "erros_backend": self.erros_backend
+        }
+
+
+idempotency_store = IdempotencyStore()
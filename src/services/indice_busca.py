@@ -0,0 +1,202 @@
+"""
+Índice invertido em memória para busca aproximada (produtos, contatos)
+Sem acentos e sem diferenciar maiúsculas, com prefixo ("cam" -> "camiseta"),
+tolerância a erros de digitação por trigramas e resultados por relevância.
+
+Pontuação de um registro: para cada palavra da consulta, o melhor casamento
+entre os termos do registro (exato > prefixo > aproximado), multiplicado pelo
+idf do termo e pelo peso do campo. Registros que casam mais palavras da
+consulta vêm sempre antes.
+"""
+
+import bisect
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+# Multiplicadores por tipo de casamento
+PESO_EXATO = 1.0
+PESO_PREFIXO = 0.8
+PESO_APROXIMADO = 0.6
+
+# Similaridade mínima (Jaccard de trigramas) para um termo contar como aproximado
+SIMILARIDADE_MIN = 0.4
+# Termos da consulta com menos letras que isso só casam exato/prefixo
+TAMANHO_MIN_APROXIMADO = 4
+# Termos aproximados considerados por palavra da consulta (os mais parecidos)
+CANDIDATOS_APROXIMADOS = 20
+# Termos da consulta com menos letras que isso só casam exato (um "a" casaria
+# por prefixo com boa parte do vocabulário e percorreria quase todo o índice)
+TAMANHO_MIN_PREFIXO = 2
+# Termos por prefixo considerados por palavra da consulta (os primeiros em ordem alfabética)
+CANDIDATOS_PREFIXO = 50
+
+
+def dobrar(texto: Any) -> str:
+    """'Calçado Único-12' -> 'calcado unico 12' (sem acentos, minúsculo, só letras e números)"""
+    decomposto = unicodedata.normalize("NFKD", str(texto or ""))
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(" ", sem_acentos.lower()).strip()
+
+
+def termos(texto: Any) -> List[str]:
+    return dobrar(texto).split()
+
+
+def trigramas(termo: str) -> Set[str]:
+    marcado = f"  {termo} "
+    return {marcado[i:i + 3] for i in range(len(marcado) - 2)}
+
+
+def _similaridade(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class IndiceTexto:
+    """
+    Índice de um conjunto de registros (ex: produtos de um tenant).
+
+    campos: campo do registro -> peso. campos_compactos: campos também
+    indexados como um termo só, sem separadores (ex: CPF "123.456.789-00"
+    vira "12345678900", SKU "SKU-001" vira "sku001").
+    """
+
+    def __init__(self, campos: Dict[str, float], campos_compactos: Iterable[str] = ()):
+        self.campos = campos
+        self.campos_compactos = frozenset(campos_compactos)
+        # termo -> {id: peso do melhor campo em que aparece}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # id -> termos do registro (para remover/atualizar)
+        self._termos_por_id: Dict[str, Set[str]] = {}
+        # trigrama -> termos do vocabulário que o contêm
+        self._trigramas: Dict[str, Set[str]] = defaultdict(set)
+        self._vocabulario_ordenado: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._termos_por_id)
+
+    def _termos_registro(self, registro: Dict[str, Any]) -> Dict[str, float]:
+        pesos: Dict[str, float] = {}
+        for campo, peso in self.campos.items():
+            valor = registro.get(campo)
+            if not valor:
+                continue
+            encontrados = termos(valor)
+            if campo in self.campos_compactos and len(encontrados) > 1:
+                encontrados.append("".join(encontrados))
+            for termo in encontrados:
+                if peso > pesos.get(termo, 0.0):
+                    pesos[termo] = peso
+        return pesos
+
+    def adicionar(self, id_registro: str, registro: Dict[str, Any]) -> None:
+        """Indexa (ou reindexa) o registro"""
+        if id_registro in self._termos_por_id:
+            self.remover(id_registro)
+        pesos = self._termos_registro(registro)
+        self._termos_por_id[id_registro] = set(pesos)
+        for termo, peso in pesos.items():
+            postings = self._postings.get(termo)
+            if postings is None:
+                postings = self._postings[termo] = {}
+                for trigrama in trigramas(termo):
+                    self._trigramas[trigrama].add(termo)
+                self._vocabulario_ordenado = None
+            postings[id_registro] = peso
+
+    def remover(self, id_registro: str) -> None:
+        for termo in self._termos_por_id.pop(id_registro, ()):
+            postings = self._postings.get(termo)
+            if postings is None:
+                continue
+            postings.pop(id_registro, None)
+            if not postings:
+                del self._postings[termo]
+                for trigrama in trigramas(termo):
+                    termos_trigrama = self._trigramas.get(trigrama)
+                    if termos_trigrama is not None:
+                        termos_trigrama.discard(termo)
+                        if not termos_trigrama:
+                            del self._trigramas[trigrama]
+                self._vocabulario_ordenado = None
+
+    # -------------------------------------------------------------------------
+    # Consulta
+    # -------------------------------------------------------------------------
+
+    def _com_prefixo(self, prefixo: str, limite: int = CANDIDATOS_PREFIXO) -> List[str]:
+        if self._vocabulario_ordenado is None:
+            self._vocabulario_ordenado = sorted(self._postings)
+        vocabulario = self._vocabulario_ordenado
+        inicio = bisect.bisect_left(vocabulario, prefixo)
+        fim = bisect.bisect_left(vocabulario, prefixo + "\uffff", lo=inicio)
+        return vocabulario[inicio:min(fim, inicio + limite)]
+
+    def _aproximados(self, termo: str) -> List[Tuple[str, float]]:
+        alvo = trigramas(termo)
+        contagem: Dict[str, int] = defaultdict(int)
+        for trigrama in alvo:
+            for candidato in self._trigramas.get(trigrama, ()):
+                contagem[candidato] += 1
+        # Pré-filtro barato pela contagem antes de calcular a similaridade
+        minimo = max(1, int(len(alvo) * SIMILARIDADE_MIN))
+        similares = [
+            (candidato, _similaridade(alvo, trigramas(candidato)))
+            for candidato, comuns in contagem.items() if comuns >= minimo
+        ]
+        similares = [(candidato, sim) for candidato, sim in similares if sim >= SIMILARIDADE_MIN]
+        similares.sort(key=lambda item: -item[1])
+        return similares[:CANDIDATOS_APROXIMADOS]
+
+    def _expandir(self, termo: str) -> Dict[str, float]:
+        """Termos do vocabulário que casam com a palavra da consulta -> multiplicador"""
+        casamentos: Dict[str, float] = {}
+        if termo in self._postings:
+            casamentos[termo] = PESO_EXATO
+        if len(termo) >= TAMANHO_MIN_PREFIXO:
+            for candidato in self._com_prefixo(termo):
+                casamentos.setdefault(candidato, PESO_PREFIXO)
+        if len(termo) >= TAMANHO_MIN_APROXIMADO:
+            for candidato, similaridade in self._aproximados(termo):
+                casamentos.setdefault(candidato, PESO_APROXIMADO * similaridade)
+        return casamentos
+
+    def buscar(self, consulta: str, limite: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        [(id, pontuação)] em ordem de relevância. Exige que o registro case
+        pelo menos metade das palavras da consulta.
+        """
+        palavras = list(dict.fromkeys(termos(consulta)))
+        if not palavras:
+            return []
+
+        total = len(self._termos_por_id) or 1
+        pontuacao: Dict[str, float] = defaultdict(float)
+        casadas: Dict[str, int] = defaultdict(int)
+        for palavra in palavras:
+            melhor: Dict[str, float] = {}
+            for termo, multiplicador in self._expandir(palavra).items():
+                postings = self._postings[termo]
+                idf = math.log(1 + total / len(postings))
+                for id_registro, peso in postings.items():
+                    valor = multiplicador * peso * idf
+                    if valor > melhor.get(id_registro, 0.0):
+                        melhor[id_registro] = valor
+            for id_registro, valor in melhor.items():
+                pontuacao[id_registro] += valor
+                casadas[id_registro] += 1
+
+        minimo = math.ceil(len(palavras) / 2)
+        resultado = [
+            (id_registro, valor) for id_registro, valor in pontuacao.items()
+            if casadas[id_registro] >= minimo
+        ]
+        resultado.sort(key=lambda item: (-casadas[item[0]], -item[1]))
+        return resultado[:limite] if limite else resultado
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {"registros": len(self._termos_por_id), "termos": len(self._postings)}
@@ -0,0 +1,48 @@
+"""
+Codec JSON do servidor
+Usa orjson quando instalado (várias vezes mais rápido) e cai para o json da
+stdlib caso contrário. Saída sempre em UTF-8 (equivalente a ensure_ascii=False).
+"""
+
+import json
+import os
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+# Resultados de tools/call sem indentação (menos bytes e menos tokens para o agente)
+MCP_JSON_COMPACTO = os.getenv("MCP_JSON_COMPACTO", "true").lower() in ("1", "true", "yes", "sim")
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _dumps_stdlib(obj: Any, indentar: bool) -> bytes:
+    if indentar:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj: Any, indentar: bool = False) -> bytes:
+    """Serializa para bytes UTF-8 (compacto por padrão)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indentar else 0))
+        except TypeError:
+            # Tipos fora do suporte do orjson (ex: inteiros > 64 bits): stdlib decide
+            pass
+    return _dumps_stdlib(obj, indentar)
+
+
+def dumps_str(obj: Any, indentar: bool = False) -> str:
+    """Como dumps, mas retorna str (ex: campo "text" do conteúdo MCP)"""
+    return dumps(obj, indentar).decode("utf-8")
+
+
+def loads(dados: Union[bytes, bytearray, str]) -> Any:
+    """Desserializa bytes/str JSON (ValueError se inválido)"""
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
@@ -0,0 +1,94 @@
+"""
+Cache de JWTs decodificados (e opcionalmente verificados)
+Agentes reutilizam o mesmo bearer token por horas: decodificação e
+verificação de assinatura acontecem uma vez por token, não por requisição.
+
+- Chave: sha256 do token (o token em si não fica em memória como chave)
+- LRU limitado a JWT_CACHE_MAX entradas
+- Entrada expira no `exp` do token ou após JWT_CACHE_TTL, o que vier primeiro
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+JWT_CACHE_MAX = int(os.getenv("JWT_CACHE_MAX", "10000"))
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", "3600"))
+
+# Verificação de assinatura (python-jose) quando JWT_SECRET está definido
+JWT_SECRET = os.getenv("JWT_SECRET", "")
+JWT_ALGORITHMS = [alg.strip() for alg in os.getenv("JWT_ALGORITHMS", "HS256").split(",") if alg.strip()]
+
+
+class CacheJWT:
+    """LRU de token -> dados de autenticação, respeitando o exp do JWT"""
+
+    def __init__(self, max_entradas: int = JWT_CACHE_MAX, ttl: float = JWT_CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        # chave -> (dados, expira_em em epoch)
+        self._entradas: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    @staticmethod
+    def _chave(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def obter(self, token: str) -> Optional[Dict[str, Any]]:
+        """Dados cacheados do token ou None (ausente/expirado)"""
+        chave = self._chave(token)
+        item = self._entradas.get(chave)
+        if item is None:
+            self.misses += 1
+            return None
+
+        dados, expira_em = item
+        if expira_em <= time.time():
+            del self._entradas[chave]
+            self.expirados += 1
+            self.misses += 1
+            return None
+
+        self._entradas.move_to_end(chave)
+        self.hits += 1
+        return dados
+
+    def guardar(self, token: str, dados: Dict[str, Any], exp: Optional[float] = None) -> None:
+        """Guarda até o exp do token (se houver), limitado ao TTL do cache"""
+        expira_em = time.time() + self.ttl
+        if exp is not None:
+            expira_em = min(expira_em, float(exp))
+
+        chave = self._chave(token)
+        self._entradas[chave] = (dados, expira_em)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.evictions += 1
+
+    def limpar(self) -> None:
+        self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entradas": len(self._entradas),
+            "max": self.max_entradas,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "expirados": self.expirados,
+            "evictions": self.evictions,
+            "verifica_assinatura": bool(JWT_SECRET)
+        }
+
+
+jwt_cache = CacheJWT()
@@ -0,0 +1,157 @@
+"""
+Logging estruturado do servidor
+Níveis, formatação preguiçosa, amostragem de DEBUG e redação de tokens
+
+Uso:
+    from src.services.log import get_logger
+    log = get_logger(__name__)
+    log.debug("Resposta %s: %.500s", endpoint, corpo, extra={"endpoint": endpoint})
+
+Os argumentos só são formatados se o nível estiver habilitado (use %s, não
+f-string). Para valores caros de obter (ex: response.text), proteja com
+`log.isEnabledFor(logging.DEBUG)`.
+
+A escrita no stdout acontece numa thread separada (QueueHandler), fora do
+event loop.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json (uma linha por evento, para agregadores) ou texto (leitura humana)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Fração dos eventos DEBUG efetivamente emitidos (1 = todos)
+LOG_DEBUG_AMOSTRAGEM = float(os.getenv("LOG_DEBUG_AMOSTRAGEM", "1"))
+
+LOGGER_RAIZ = "mcp_tiny"
+
+# token=... em payload URL-encoded, "token": "..." em JSON e Bearer ... em headers
+_PADROES_SEGREDO = [
+    (re.compile(r'(token=)[^&\s"]+', re.IGNORECASE), r"\1***"),
+    (re.compile(r'("(?:token|tiny_token)"\s*:\s*")[^"]*(")', re.IGNORECASE), r"\1***\2"),
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9\-_.=]+", re.IGNORECASE), r"\1***"),
+]
+
+# Campos de extra= cujo valor nunca vai para o log
+_CAMPOS_SEGREDO = frozenset({"token", "tiny_token", "authorization", "jwt", "senha"})
+
+# Atributos padrão do LogRecord (o resto veio de extra= e vira campo estruturado)
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def redigir(texto: str) -> str:
+    """Mascara tokens/credenciais em uma string"""
+    for padrao, substituto in _PADROES_SEGREDO:
+        texto = padrao.sub(substituto, texto)
+    return texto
+
+
+class _FiltroRedacao(logging.Filter):
+    """Formata a mensagem (e o traceback) e remove segredos antes da fila, inclusive dos campos de extra="""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        mensagem = record.getMessage()
+        if record.exc_info:
+            mensagem += "\n" + logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = redigir(mensagem)
+        record.args = None
+        for chave, valor in list(vars(record).items()):
+            if chave in _ATRIBUTOS_RECORD or chave.startswith("_"):
+                continue
+            if chave.lower() in _CAMPOS_SEGREDO:
+                setattr(record, chave, "***")
+            elif isinstance(valor, str):
+                setattr(record, chave, redigir(valor))
+        return True
+
+
+class _FiltroAmostragem(logging.Filter):
+    """Deixa passar só uma fração dos eventos DEBUG"""
+
+    def __init__(self, taxa: float):
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.taxa >= 1:
+            return True
+        return random.random() < self.taxa
+
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha: ts, nivel, logger, msg + campos de extra="""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_RECORD and not chave.startswith("_"):
+                evento[chave] = valor
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configurar_logging(
+    nivel: str = LOG_LEVEL,
+    formato: str = LOG_FORMAT,
+    amostragem_debug: float = LOG_DEBUG_AMOSTRAGEM
+) -> None:
+    """Configura o logger raiz do app (idempotente; chamado no import do main)"""
+    global _listener
+
+    raiz = logging.getLogger(LOGGER_RAIZ)
+    raiz.setLevel(nivel)
+    raiz.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(raiz.handlers):
+        raiz.removeHandler(handler)
+
+    saida = logging.StreamHandler()
+    if formato == "texto":
+        saida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        saida.setFormatter(FormatadorJSON())
+
+    # Filtros rodam no thread de quem loga (antes da fila), então só o que
+    # passa pela amostragem é formatado/redigido
+    fila = logging.handlers.QueueHandler(queue.SimpleQueue())
+    fila.addFilter(_FiltroAmostragem(amostragem_debug))
+    fila.addFilter(_FiltroRedacao())
+    raiz.addHandler(fila)
+
+    _listener = logging.handlers.QueueListener(fila.queue, saida, respect_handler_level=True)
+    _listener.start()
+
+
+def parar_logging() -> None:
+    """Esvazia a fila de logs (shutdown)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(parar_logging)
+
+
+def get_logger(nome: str) -> logging.Logger:
+    """Logger filho de "mcp_tiny" (ex: get_logger(__name__) -> mcp_tiny.src.services.cache)"""
+    return logging.getLogger(f"{LOGGER_RAIZ}.{nome}")
@@ -0,0 +1,289 @@
+"""
+Métricas no formato de exposição do Prometheus (text/plain 0.0.4)
+Counters, gauges e histogramas com labels, sem dependência externa
+
+Os valores de label são passados posicionalmente, na ordem declarada:
+    TINY_REQUEST_SECONDS.observe(0.231, "pedidos.pesquisa")
+"""
+
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, List, Callable, Iterator
+
+# Latências da API Tiny vão de dezenas de ms a dezenas de segundos (timeout 30s)
+BUCKETS_LATENCIA: Tuple[float, ...] = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_labels(nomes: Tuple[str, ...], valores: Labels, extra: str = "") -> str:
+    partes = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica(ABC):
+    tipo = "untyped"
+
+    def __init__(self, nome: str, descricao: str, labels: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.labels = tuple(labels)
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+
+    @abstractmethod
+    def renderizar(self) -> List[str]:
+        """Linhas no formato de exposição (HELP, TYPE e amostras)"""
+
+
+class Counter(_Metrica):
+    """Counter incrementado pelo código ou lido de uma função na coleta (total mantido em outro módulo)"""
+
+    tipo = "counter"
+
+    def __init__(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Tuple[str, ...] = (),
+        funcao: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(nome, descricao, labels)
+        self._valores: Dict[Labels, float] = {}
+        self.funcao = funcao
+
+    def inc(self, *labels: str, valor: float = 1) -> None:
+        self._valores[labels] = self._valores.get(labels, 0) + valor
+
+    def valor(self, *labels: str) -> float:
+        return self._valores.get(labels, 0)
+
+    def renderizar(self) -> List[str]:
+        linhas = self._cabecalho()
+        if self.funcao is not None:
+            linhas.append(f"{self.nome} {_formatar_numero(self.funcao())}")
+            return linhas
+        for labels, valor in sorted(self._valores.items()):
+            linhas.append(f"{self.nome}{_formatar_labels(self.labels, labels)} {_formatar_numero(valor)}")
+        return linhas
+
+
+class Gauge(_Metrica):
+    """Gauge com valor definido pelo código ou lido de uma função na coleta"""
+
+    tipo = "gauge"
+
+    def __init__(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Tuple[str, ...] = (),
+        funcao: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(nome, descricao, labels)
+        self._valores: Dict[Labels, float] = {}
+        self.funcao = funcao
+
+    def set(self, valor: float, *labels: str) -> None:
+        self._valores[labels] = valor
+
+    def inc(self, *labels: str, valor: float = 1) -> None:
+        self._valores[labels] = self._valores.get(labels, 0) + valor
+
+    def dec(self, *labels: str, valor: float = 1) -> None:
+        self._valores[labels] = self._valores.get(labels, 0) - valor
+
+    def valor(self, *labels: str) -> float:
+        return self._valores.get(labels, 0)
+
+    def renderizar(self) -> List[str]:
+        linhas = self._cabecalho()
+        if self.funcao is not None:
+            linhas.append(f"{self.nome} {_formatar_numero(self.funcao())}")
+            return linhas
+        for labels, valor in sorted(self._valores.items()):
+            linhas.append(f"{self.nome}{_formatar_labels(self.labels, labels)} {_formatar_numero(valor)}")
+        return linhas
+
+
+class _Serie:
+    __slots__ = ("buckets", "soma", "contagem")
+
+    def __init__(self, quantidade_buckets: int):
+        self.buckets = [0] * quantidade_buckets
+        self.soma = 0.0
+        self.contagem = 0
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = BUCKETS_LATENCIA
+    ):
+        super().__init__(nome, descricao, labels)
+        self.limites = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Labels, _Serie] = {}
+
+    def observe(self, valor: float, *labels: str) -> None:
+        serie = self._series.get(labels)
+        if serie is None:
+            serie = self._series[labels] = _Serie(len(self.limites))
+        # Guarda a contagem do bucket exato; o acumulado é montado na coleta
+        serie.buckets[bisect_left(self.limites, valor)] += 1
+        serie.soma += valor
+        serie.contagem += 1
+
+    def contagem(self, *labels: str) -> int:
+        serie = self._series.get(labels)
+        return serie.contagem if serie is not None else 0
+
+    @contextmanager
+    def medir(self, *labels: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, *labels)
+
+    def renderizar(self) -> List[str]:
+        linhas = self._cabecalho()
+        for labels, serie in sorted(self._series.items()):
+            acumulado = 0
+            for limite, quantidade in zip(self.limites, serie.buckets):
+                acumulado += quantidade
+                le = f'le="{_formatar_numero(limite)}"'
+                linhas.append(f"{self.nome}_bucket{_formatar_labels(self.labels, labels, le)} {acumulado}")
+            sufixo = _formatar_labels(self.labels, labels)
+            linhas.append(f"{self.nome}_sum{sufixo} {_formatar_numero(serie.soma)}")
+            linhas.append(f"{self.nome}_count{sufixo} {serie.contagem}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas do processo exposto em /metrics"""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+
+    def _registrar(self, metrica: _Metrica) -> Any:
+        if metrica.nome in self._metricas:
+            raise ValueError(f"Métrica já registrada: {metrica.nome}")
+        self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def counter(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Tuple[str, ...] = (),
+        funcao: Optional[Callable[[], float]] = None
+    ) -> Counter:
+        return self._registrar(Counter(nome, descricao, labels, funcao))
+
+    def gauge(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Tuple[str, ...] = (),
+        funcao: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self._registrar(Gauge(nome, descricao, labels, funcao))
+
+    def histogram(
+        self,
+        nome: str,
+        descricao: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = BUCKETS_LATENCIA
+    ) -> Histogram:
+        return self._registrar(Histogram(nome, descricao, labels, buckets))
+
+    def obter(self, nome: str) -> Optional[_Metrica]:
+        return self._metricas.get(nome)
+
+    def renderizar(self) -> str:
+        linhas: List[str] = []
+        for metrica in self._metricas.values():
+            linhas.extend(metrica.renderizar())
+        return "\n".join(linhas) + "\n"
+
+
+registro = RegistroMetricas()
+
+
+# =============================================================================
+# MÉTRICAS DO SERVIDOR
+# =============================================================================
+
+# Chamadas à API Tiny (TinyAPIClient._request)
+TINY_REQUEST_SECONDS = registro.histogram(
+    "tiny_request_duration_seconds",
+    "Latência das chamadas HTTP à API Tiny (sem espera de rate limit nem cache)",
+    ("endpoint",)
+)
+TINY_RATE_LIMIT_WAIT_SECONDS = registro.histogram(
+    "tiny_rate_limit_wait_seconds",
+    "Tempo de espera na fila do rate limiter antes da chamada à API Tiny",
+    ("endpoint",)
+)
+TINY_REQUESTS_TOTAL = registro.counter(
+    "tiny_requests_total",
+    "Chamadas à API Tiny por endpoint e origem (api ou cache)",
+    ("endpoint", "origem")
+)
+TINY_ERRORS_TOTAL = registro.counter(
+    "tiny_errors_total",
+    "Erros da API Tiny por classe (http_<status>, timeout, conexao, tiny_erro_<codigo>)",
+    ("endpoint", "classe")
+)
+TINY_IN_FLIGHT = registro.gauge(
+    "tiny_requests_in_flight",
+    "Chamadas HTTP à API Tiny em andamento",
+    ("endpoint",)
+)
+
+# Tools MCP (execute_tiny_tool)
+MCP_TOOL_SECONDS = registro.histogram(
+    "mcp_tool_duration_seconds",
+    "Latência de ponta a ponta das tools MCP",
+    ("tool",)
+)
+MCP_TOOL_CALLS_TOTAL = registro.counter(
+    "mcp_tool_calls_total",
+    "Chamadas de tools MCP por resultado (ok, erro, tiny_erro)",
+    ("tool", "resultado")
+)
+MCP_TOOL_IN_FLIGHT = registro.gauge(
+    "mcp_tool_calls_in_flight",
+    "Tools MCP em execução",
+    ("tool",)
+)
+
+
+def classe_erro_tiny(resultado: Any) -> Optional[str]:
+    """Classe do erro lógico da Tiny (retorno.status = "Erro") ou None se OK"""
+    retorno = resultado.get("retorno") if isinstance(resultado, dict) else None
+    if not isinstance(retorno, dict) or retorno.get("status") != "Erro":
+        return None
+    codigo = retorno.get("codigo_erro")
+    return f"tiny_erro_{codigo}" if codigo else "tiny_erro"
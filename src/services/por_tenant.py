@@ -0,0 +1,126 @@
+"""
+Estado em memória por tenant mantido por um loop em segundo plano
+Base dos espelhos do catálogo (services/espelho.py) e do snapshot de estoque
+(services/snapshot_estoque.py): registro LRU de tenants, atualização agendada
+a cada intervalo, descarte por inatividade e start/stop no lifespan.
+"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+from src.services.tiny_endpoints import chave_token
+
+
+class EstadoTenant:
+    """Controle comum a cada tenant: token atual, uso, última tentativa e tarefa em andamento"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.ultimo_uso = time.monotonic()
+        self.ultima_tentativa: Optional[float] = None
+        self.tarefa: Optional[asyncio.Task] = None
+        self.erros = 0
+        self.ultimo_erro: Optional[str] = None
+
+
+T = TypeVar("T", bound=EstadoTenant)
+
+
+class ServicoPorTenant(ABC, Generic[T]):
+    """
+    Tenants (LRU, até max_tenants) e o loop que chama _atualizar para cada um
+    a cada intervalo, no máximo concorrencia ao mesmo tempo. Tenants sem uso
+    há mais de inatividade segundos são descartados.
+    """
+
+    def __init__(self, intervalo: float, inatividade: float, max_tenants: int, concorrencia: int):
+        self.intervalo = intervalo
+        self.inatividade = inatividade
+        self.max_tenants = max_tenants
+        # Tenants atualizando ao mesmo tempo (cada um ainda passa pelo próprio rate limit)
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._tenants: "OrderedDict[str, T]" = OrderedDict()
+        self._loop: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    @abstractmethod
+    def _novo_tenant(self, token: str) -> T:
+        ...
+
+    @abstractmethod
+    async def _atualizar(self, tenant: T) -> None:
+        """Uma rodada de atualização do tenant (chamada pelo loop; deve tratar os próprios erros)"""
+
+    # -------------------------------------------------------------------------
+    # Registro de tenants
+    # -------------------------------------------------------------------------
+
+    def registrar(self, token: str) -> T:
+        """Estado do tenant (criado e agendado na primeira vez)"""
+        chave = chave_token(token)
+        tenant = self._tenants.get(chave)
+        if tenant is None:
+            tenant = self._tenants[chave] = self._novo_tenant(token)
+            while len(self._tenants) > self.max_tenants:
+                _, despejado = self._tenants.popitem(last=False)
+                self._cancelar(despejado)
+        else:
+            # O tiny_token vem do JWT atual (pode ter sido renovado)
+            tenant.token = token
+            self._tenants.move_to_end(chave)
+        tenant.ultimo_uso = time.monotonic()
+
+        # Primeira atualização na hora; novas tentativas ficam com o loop
+        if tenant.ultima_tentativa is None:
+            self._agendar(tenant)
+        return tenant
+
+    @staticmethod
+    def _ocupado(tenant: T) -> bool:
+        return tenant.tarefa is not None and not tenant.tarefa.done()
+
+    @staticmethod
+    def _cancelar(tenant: T) -> None:
+        if tenant.tarefa is not None:
+            tenant.tarefa.cancel()
+
+    def _agendar(self, tenant: T) -> None:
+        tenant.ultima_tentativa = time.monotonic()
+        tenant.tarefa = asyncio.create_task(self._atualizar(tenant))
+
+    # -------------------------------------------------------------------------
+    # Loop de atualização
+    # -------------------------------------------------------------------------
+
+    async def _loop_atualizacao(self) -> None:
+        while True:
+            await asyncio.sleep(min(30.0, self.intervalo))
+            agora = time.monotonic()
+            for chave, tenant in list(self._tenants.items()):
+                if agora - tenant.ultimo_uso > self.inatividade:
+                    self._cancelar(tenant)
+                    del self._tenants[chave]
+                elif not self._ocupado(tenant) and (
+                    tenant.ultima_tentativa is None or agora - tenant.ultima_tentativa >= self.intervalo
+                ):
+                    self._agendar(tenant)
+
+    async def iniciar(self) -> None:
+        """Inicia o loop de atualização (startup do FastAPI)"""
+        if self._loop is None or self._loop.done():
+            self._loop = asyncio.create_task(self._loop_atualizacao())
+
+    async def parar(self) -> None:
+        """Para o loop e as atualizações em andamento (shutdown do FastAPI)"""
+        tarefas = [tenant.tarefa for tenant in self._tenants.values() if tenant.tarefa is not None]
+        if self._loop is not None:
+            tarefas.append(self._loop)
+            self._loop = None
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
@@ -0,0 +1,146 @@
+"""
+Projeção de respostas da API Tiny (campos / visao)
+Reduz o "retorno" antes da serialização: menos bytes, menos CPU e menos
+tokens de contexto para o agente.
+
+- campos: lista de caminhos com ponto, relativos à entidade
+  (ex: ["numero", "situacao", "cliente.nome", "itens.item.descricao"])
+- visao: "completo" (padrão), "sem_vazios" ou "resumo"
+
+Os valores do cache são compartilhados: a projeção sempre monta dicts novos.
+"""
+
+from typing import Dict, Any, List, Optional, Union
+
+VISOES = ("completo", "sem_vazios", "resumo")
+
+# Chaves de controle do "retorno" que nunca são projetadas
+METADADOS_RETORNO = frozenset({
+    "status_processamento", "status", "codigo_erro", "erros",
+    "pagina", "numero_paginas", "paginas_obtidas", "registros", "erro_paginacao",
+})
+
+# Campos da visão "resumo" por entidade (cobrem o formato de *.obter e de *.pesquisa;
+# caminhos ausentes são ignorados)
+CAMPOS_RESUMO: Dict[str, List[str]] = {
+    "pedido": [
+        "id", "numero", "numero_ecommerce", "data_pedido", "situacao",
+        "total_pedido", "valor", "nome", "cliente.nome", "codigo_rastreamento",
+    ],
+    "produto": [
+        "id", "codigo", "nome", "preco", "preco_promocional", "unidade", "gtin", "situacao", "saldo",
+    ],
+    "contato": [
+        "id", "codigo", "nome", "fantasia", "tipo_pessoa", "cpf_cnpj",
+        "email", "fone", "celular", "cidade", "uf", "situacao",
+    ],
+    "nota_fiscal": [
+        "id", "numero", "serie", "data_emissao", "situacao", "valor", "valor_nota",
+        "nome", "cliente.nome", "chave_acesso",
+    ],
+    "conta": [
+        "id", "numero_doc", "data_emissao", "data_vencimento", "valor", "saldo",
+        "situacao", "nome_cliente", "cliente.nome", "historico",
+    ],
+}
+
+Arvore = Dict[str, Optional["Arvore"]]
+
+
+def compilar_campos(campos: Union[str, List[str]]) -> Arvore:
+    """["a", "b.c"] -> {"a": None, "b": {"c": None}} (None = valor inteiro)"""
+    if isinstance(campos, str):
+        campos = campos.split(",")
+    arvore: Arvore = {}
+    for caminho in campos:
+        partes = [parte for parte in str(caminho).strip().split(".") if parte]
+        no = arvore
+        for i, parte in enumerate(partes):
+            if i == len(partes) - 1:
+                no[parte] = None
+                break
+            filho = no.get(parte, {})
+            if filho is None:
+                break  # um prefixo já pede o valor inteiro
+            no = no.setdefault(parte, filho)
+    return arvore
+
+
+_ARVORES_RESUMO: Dict[str, Arvore] = {
+    entidade: compilar_campos(campos) for entidade, campos in CAMPOS_RESUMO.items()
+}
+
+
+def _aplicar(valor: Any, arvore: Optional[Arvore]) -> Any:
+    if arvore is None:
+        return valor
+    if isinstance(valor, list):
+        return [_aplicar(item, arvore) for item in valor]
+    if isinstance(valor, dict):
+        return {chave: _aplicar(valor[chave], sub) for chave, sub in arvore.items() if chave in valor}
+    return valor
+
+
+def _sem_vazios(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        limpo = {chave: _sem_vazios(item) for chave, item in valor.items()}
+        return {chave: item for chave, item in limpo.items() if item not in ("", None, [], {})}
+    if isinstance(valor, list):
+        return [_sem_vazios(item) for item in valor]
+    return valor
+
+
+def _projetar_entidade(entidade: str, dados: Any, arvore: Optional[Arvore], visao: str) -> Any:
+    if arvore is None and visao == "resumo":
+        arvore = _ARVORES_RESUMO.get(entidade)
+    if arvore is not None:
+        dados = _aplicar(dados, arvore)
+    if visao != "completo":
+        dados = _sem_vazios(dados)
+    return dados
+
+
+def _projetar_item(chave: str, item: Any, arvore: Optional[Arvore], visao: str) -> Any:
+    # Listas da Tiny vêm como [{"pedido": {...}}, ...]
+    if isinstance(item, dict) and len(item) == 1:
+        entidade, dados = next(iter(item.items()))
+        if isinstance(dados, dict):
+            return {entidade: _projetar_entidade(entidade, dados, arvore, visao)}
+    if isinstance(item, dict):
+        return _projetar_entidade(chave, item, arvore, visao)
+    return item
+
+
+def validar_visao(visao: Optional[str]) -> str:
+    visao = visao or "completo"
+    if visao not in VISOES:
+        raise ValueError(f"visao inválida: {visao} (use {', '.join(VISOES)})")
+    return visao
+
+
+def projetar(
+    resultado: Dict[str, Any],
+    campos: Optional[Union[str, List[str]]] = None,
+    visao: Optional[str] = None
+) -> Dict[str, Any]:
+    """Aplica campos/visao às entidades do "retorno" (metadados e erros ficam intactos)"""
+    visao = validar_visao(visao)
+    if not campos and visao == "completo":
+        return resultado
+
+    retorno = resultado.get("retorno") if isinstance(resultado, dict) else None
+    if not isinstance(retorno, dict):
+        return resultado
+
+    arvore = compilar_campos(campos) if campos else None
+    projetado: Dict[str, Any] = {}
+    for chave, valor in retorno.items():
+        if chave in METADADOS_RETORNO:
+            projetado[chave] = valor
+        elif isinstance(valor, dict):
+            projetado[chave] = _projetar_entidade(chave, valor, arvore, visao)
+        elif isinstance(valor, list):
+            projetado[chave] = [_projetar_item(chave, item, arvore, visao) for item in valor]
+        else:
+            projetado[chave] = valor
+    return {**resultado, "retorno": projetado}
@@ -0,0 +1,208 @@
+"""
+Rate limiter por tenant para chamadas à API Tiny
+Token bucket por tiny_token + fila justa entre sessões com prioridade para escritas
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Deque
+
+from src.services.tiny_endpoints import chave_token
+
+TINY_RATE_LIMIT_POR_MINUTO = float(os.getenv("TINY_RATE_LIMIT_POR_MINUTO", "60"))
+TINY_RATE_LIMIT_BURST = float(os.getenv("TINY_RATE_LIMIT_BURST", "10"))
+# Intervalo (segundos) entre varreduras que descartam tenants ociosos
+TINY_RATE_LIMIT_VARREDURA = float(os.getenv("TINY_RATE_LIMIT_VARREDURA", "60"))
+
+
+class TokenBucket:
+    """Token bucket clássico: `taxa` tokens por segundo, até `capacidade`"""
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.atualizado_em = time.monotonic()
+
+    def _repor(self) -> None:
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+
+    def tentar_consumir(self) -> bool:
+        """Consome um token se houver disponível"""
+        self._repor()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def devolver(self) -> None:
+        """Devolve um token consumido sem uso"""
+        self.tokens = min(self.capacidade, self.tokens + 1)
+
+    def tempo_ate_proximo(self) -> float:
+        """Segundos até haver um token disponível"""
+        self._repor()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.taxa
+
+    def cheio(self) -> bool:
+        """Bucket na capacidade: equivale a um bucket recém-criado"""
+        self._repor()
+        return self.tokens >= self.capacidade
+
+
+class _Espera:
+    """Requisição aguardando vez na fila do tenant"""
+
+    __slots__ = ("future", "enfileirado_em")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.enfileirado_em = time.monotonic()
+
+
+class FilaTenant:
+    """
+    Fila de um tenant (tiny_token).
+
+    Cada prioridade tem uma fila por sessão; dentro da mesma prioridade as
+    sessões são atendidas em round-robin, então uma sessão fazendo varredura
+    de páginas não monopoliza a cota das demais.
+    """
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.filas: Dict[int, "OrderedDict[str, Deque[_Espera]]"] = {}
+        self._bomba: Optional[asyncio.Task] = None
+        self.pendentes = 0
+        self.atendidas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def _registrar_espera(self, espera: float) -> None:
+        self.atendidas += 1
+        self.espera_total += espera
+        if espera > self.espera_max:
+            self.espera_max = espera
+
+    async def adquirir(self, prioridade: int, sessao: str) -> float:
+        """Aguarda a vez e um token livre. Retorna o tempo de espera em segundos"""
+        # Caminho rápido: ninguém na fila e há token disponível
+        if self.pendentes == 0 and self.bucket.tentar_consumir():
+            self._registrar_espera(0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        espera = _Espera(future)
+        por_sessao = self.filas.setdefault(prioridade, OrderedDict())
+        por_sessao.setdefault(sessao, deque()).append(espera)
+        self.pendentes += 1
+
+        if self._bomba is None or self._bomba.done():
+            self._bomba = asyncio.create_task(self._bombear())
+
+        await future
+        return time.monotonic() - espera.enfileirado_em
+
+    def _proxima(self) -> Optional[_Espera]:
+        """Próxima requisição: menor prioridade primeiro, round-robin entre sessões"""
+        for prioridade in sorted(self.filas):
+            por_sessao = self.filas[prioridade]
+            while por_sessao:
+                sessao, fila = next(iter(por_sessao.items()))
+                espera = fila.popleft()
+                self.pendentes -= 1
+                if fila:
+                    por_sessao.move_to_end(sessao)
+                else:
+                    del por_sessao[sessao]
+                if not espera.future.done():
+                    return espera
+        return None
+
+    async def _bombear(self) -> None:
+        """Libera as requisições enfileiradas no ritmo do token bucket"""
+        while self.pendentes > 0:
+            atraso = self.bucket.tempo_ate_proximo()
+            if atraso > 0:
+                await asyncio.sleep(atraso)
+            if not self.bucket.tentar_consumir():
+                continue
+            espera = self._proxima()
+            if espera is None:
+                # Todas as esperas restantes foram canceladas
+                self.bucket.devolver()
+                break
+            self._registrar_espera(time.monotonic() - espera.enfileirado_em)
+            espera.future.set_result(None)
+
+    def ociosa(self) -> bool:
+        """Sem ninguém esperando e com o bucket cheio: pode ser descartada sem mudar o ritmo"""
+        return self.pendentes == 0 and (self._bomba is None or self._bomba.done()) and self.bucket.cheio()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "fila": self.pendentes,
+            "tokens_disponiveis": round(self.bucket.tokens, 2),
+            "atendidas": self.atendidas,
+            "espera_media_ms": round(self.espera_total / self.atendidas * 1000, 2) if self.atendidas else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 2)
+        }
+
+
+class TinyScheduler:
+    """Agenda chamadas à API Tiny respeitando a cota de cada tiny_token"""
+
+    def __init__(
+        self,
+        por_minuto: float = TINY_RATE_LIMIT_POR_MINUTO,
+        burst: float = TINY_RATE_LIMIT_BURST,
+        varredura: float = TINY_RATE_LIMIT_VARREDURA
+    ):
+        self.por_minuto = por_minuto
+        self.burst = burst
+        self.varredura = varredura
+        self.tenants: Dict[str, FilaTenant] = {}
+        self.tenants_descartados = 0
+        self._varrido_em = time.monotonic()
+
+    def _varrer(self) -> None:
+        """Descarta tenants ociosos para o dicionário não crescer com tokens que não voltam"""
+        self._varrido_em = time.monotonic()
+        for chave in [chave for chave, fila in self.tenants.items() if fila.ociosa()]:
+            del self.tenants[chave]
+            self.tenants_descartados += 1
+
+    def _fila(self, token: str) -> FilaTenant:
+        if time.monotonic() - self._varrido_em >= self.varredura:
+            self._varrer()
+        chave = chave_token(token)
+        fila = self.tenants.get(chave)
+        if fila is None:
+            fila = FilaTenant(TokenBucket(self.por_minuto / 60.0, self.burst))
+            self.tenants[chave] = fila
+        return fila
+
+    async def adquirir(self, token: str, prioridade: int, sessao: Optional[str] = None) -> float:
+        """Bloqueia até a chamada poder ser feita. Retorna o tempo de espera em segundos"""
+        return await self._fila(token).adquirir(prioridade, sessao or "-")
+
+    def profundidade_fila(self) -> int:
+        return sum(fila.pendentes for fila in self.tenants.values())
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "limite_por_minuto": self.por_minuto,
+            "burst": self.burst,
+            "fila_total": self.profundidade_fila(),
+            "tenants_descartados": self.tenants_descartados,
+            "tenants": {chave: fila.estatisticas() for chave, fila in self.tenants.items()}
+        }
+
+
+scheduler = TinyScheduler()
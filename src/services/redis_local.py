@@ -0,0 +1,155 @@
+"""
+Servidor local compatível com o protocolo Redis (RESP)
+Stand-in para testes e desenvolvimento do RedisBackend sem um Redis real
+
+Uso:
+    python -m src.services.redis_local --port 6379
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class LocalRedisServer:
+    """Implementa PING, GET, SET (EX/PX/NX), DEL, INCR, EXPIRE, SELECT, AUTH e FLUSHDB"""
+
+    def __init__(self):
+        self._dados: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._conexoes: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self.comandos = 0
+
+    # -------------------------------------------------------------------------
+    # Protocolo
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _resposta(valor: Any) -> bytes:
+        if valor is None:
+            return b"$-1\r\n"
+        if isinstance(valor, bool):
+            return b":%d\r\n" % int(valor)
+        if isinstance(valor, int):
+            return b":%d\r\n" % valor
+        if isinstance(valor, bytes):
+            return b"$%d\r\n%s\r\n" % (len(valor), valor)
+        if isinstance(valor, Exception):
+            return b"-ERR %s\r\n" % str(valor).encode()
+        return b"+%s\r\n" % str(valor).encode()
+
+    @staticmethod
+    async def _ler_comando(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        linha = await reader.readline()
+        if not linha:
+            return None
+        if not linha.startswith(b"*"):
+            return linha.strip().split()
+        args = []
+        for _ in range(int(linha[1:-2])):
+            tamanho = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(tamanho + 2))[:-2])
+        return args
+
+    def _vivo(self, chave: bytes) -> Optional[bytes]:
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        if item[1] is not None and item[1] <= time.monotonic():
+            del self._dados[chave]
+            return None
+        return item[0]
+
+    def executar(self, args: List[bytes]) -> Any:
+        self.comandos += 1
+        nome = args[0].upper().decode()
+        if nome == "PING":
+            return "PONG"
+        if nome in ("SELECT", "AUTH"):
+            return "OK"
+        if nome == "FLUSHDB":
+            self._dados.clear()
+            return "OK"
+        if nome == "GET":
+            return self._vivo(args[1])
+        if nome == "SET":
+            expira_em = None
+            opcoes = [a.upper() for a in args[3:]]
+            if b"EX" in opcoes:
+                expira_em = time.monotonic() + int(args[3 + opcoes.index(b"EX") + 1])
+            if b"PX" in opcoes:
+                expira_em = time.monotonic() + int(args[3 + opcoes.index(b"PX") + 1]) / 1000
+            if b"NX" in opcoes and self._vivo(args[1]) is not None:
+                return None
+            self._dados[args[1]] = (args[2], expira_em)
+            return "OK"
+        if nome == "DEL":
+            return sum(1 for chave in args[1:] if self._dados.pop(chave, None) is not None)
+        if nome == "INCR":
+            atual = self._vivo(args[1])
+            try:
+                novo = int(atual or 0) + 1
+            except ValueError:
+                return ValueError("value is not an integer or out of range")
+            expira_em = self._dados[args[1]][1] if args[1] in self._dados else None
+            self._dados[args[1]] = (str(novo).encode(), expira_em)
+            return novo
+        if nome == "EXPIRE":
+            valor = self._vivo(args[1])
+            if valor is None:
+                return 0
+            self._dados[args[1]] = (valor, time.monotonic() + int(args[2]))
+            return 1
+        return ValueError(f"unknown command '{nome}'")
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tarefa = asyncio.current_task()
+        self._conexoes[tarefa] = writer
+        try:
+            while True:
+                args = await self._ler_comando(reader)
+                if not args:
+                    break
+                writer.write(self._resposta(self.executar(args)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._conexoes.pop(tarefa, None)
+            writer.close()
+
+    # -------------------------------------------------------------------------
+    # Ciclo de vida
+    # -------------------------------------------------------------------------
+
+    async def iniciar(self, host: str = "127.0.0.1", porta: int = 0) -> int:
+        """Sobe o servidor e retorna a porta efetiva (porta=0 escolhe uma livre)"""
+        self._server = await asyncio.start_server(self._atender, host, porta)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def parar(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Encerra clientes conectados para os handlers terminarem com EOF
+            tarefas = list(self._conexoes)
+            for writer in self._conexoes.values():
+                writer.close()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def _main(host: str, porta: int) -> None:
+    servidor = LocalRedisServer()
+    porta_efetiva = await servidor.iniciar(host, porta)
+    print(f"Redis local ouvindo em redis://{host}:{porta_efetiva}/0")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local compatível com Redis (RESP)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    opcoes = parser.parse_args()
+    asyncio.run(_main(opcoes.host, opcoes.port))
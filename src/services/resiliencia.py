@@ -0,0 +1,215 @@
+"""
+Retry com backoff exponencial + jitter e circuit breaker por endpoint Tiny
+
+Retry:
+- Leituras (idempotentes): timeout, falha de conexão, HTTP 429/5xx e
+  bloqueio por excesso de acessos da Tiny (codigo_erro 6)
+- Escritas: só quando a requisição comprovadamente não saiu (falha ao
+  conectar); nunca após envio, para não duplicar pedidos/contas
+- Espera "full jitter": uniforme entre 0 e min(max, base * 2^tentativa),
+  respeitando Retry-After quando a Tiny informa
+
+Circuit breaker (um por endpoint, compartilhado entre tenants):
+- fechado: tudo passa; N falhas seguidas de saúde (timeout, conexão, 5xx) abrem
+- aberto: falha imediata (CircuitoAbertoError) até o tempo de resfriamento
+- meio_aberto: deixa passar uma sonda; sucesso fecha, falha reabre
+"""
+
+import os
+import random
+import time
+from typing import Dict, Any, Optional
+
+import httpx
+
+from src.services.metrics import registro
+from src.services.tiny_endpoints import eh_escrita
+
+TINY_RETRY_TENTATIVAS = int(os.getenv("TINY_RETRY_TENTATIVAS", "3"))
+TINY_RETRY_BASE = float(os.getenv("TINY_RETRY_BASE", "0.5"))
+TINY_RETRY_MAX = float(os.getenv("TINY_RETRY_MAX", "8"))
+
+TINY_CIRCUITO_FALHAS = int(os.getenv("TINY_CIRCUITO_FALHAS", "5"))
+TINY_CIRCUITO_RESFRIAMENTO = float(os.getenv("TINY_CIRCUITO_RESFRIAMENTO", "30"))
+
+# codigo_erro da Tiny para "API bloqueada - excedido o número de acessos"
+CODIGO_ERRO_LIMITE_TINY = "6"
+
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+_VALOR_ESTADO = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+
+TINY_RETRIES_TOTAL = registro.counter(
+    "tiny_retries_total",
+    "Novas tentativas de chamadas à API Tiny por motivo",
+    ("endpoint", "motivo")
+)
+TINY_CIRCUIT_STATE = registro.gauge(
+    "tiny_circuit_state",
+    "Estado do circuit breaker por endpoint (0=fechado, 1=meio_aberto, 2=aberto)",
+    ("endpoint",)
+)
+TINY_CIRCUIT_REJECTIONS_TOTAL = registro.counter(
+    "tiny_circuit_rejections_total",
+    "Chamadas recusadas sem ir à API Tiny porque o circuito estava aberto",
+    ("endpoint",)
+)
+
+
+class CircuitoAbertoError(Exception):
+    """Endpoint Tiny degradado: chamada recusada sem tentar"""
+
+    def __init__(self, endpoint: str, retry_em: float):
+        super().__init__(
+            f"API Tiny instável em {endpoint}: circuito aberto, nova tentativa em {retry_em:.0f}s"
+        )
+        self.endpoint = endpoint
+        self.retry_em = retry_em
+
+
+class ErroLimiteTiny(Exception):
+    """Tiny respondeu "excedido o número de acessos" (codigo_erro 6)"""
+
+
+# =============================================================================
+# RETRY
+# =============================================================================
+
+def motivo_retry(endpoint: str, erro: Exception) -> Optional[str]:
+    """Motivo (label de métrica) se o erro permite nova tentativa, senão None"""
+    if isinstance(erro, (httpx.ConnectError, httpx.ConnectTimeout)):
+        # A requisição não chegou a ser enviada: seguro até para escritas
+        return "conexao"
+    if eh_escrita(endpoint):
+        return None
+    if isinstance(erro, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(erro, httpx.TransportError):
+        return "conexao"
+    if isinstance(erro, httpx.HTTPStatusError) and erro.response.status_code in STATUS_RETENTAVEIS:
+        return f"http_{erro.response.status_code}"
+    if isinstance(erro, ErroLimiteTiny):
+        return "limite_tiny"
+    return None
+
+
+def _retry_after(erro: Exception) -> Optional[float]:
+    if not isinstance(erro, httpx.HTTPStatusError):
+        return None
+    valor = erro.response.headers.get("retry-after")
+    try:
+        return float(valor) if valor is not None else None
+    except ValueError:
+        return None
+
+
+def espera_retry(tentativa: int, erro: Exception) -> float:
+    """Backoff exponencial com full jitter (tentativa 0 = primeira nova tentativa)"""
+    teto = min(TINY_RETRY_MAX, TINY_RETRY_BASE * (2 ** tentativa))
+    espera = random.uniform(0, teto)
+    retry_after = _retry_after(erro)
+    if retry_after is not None:
+        espera = max(espera, min(retry_after, TINY_RETRY_MAX))
+    return espera
+
+
+def eh_falha_de_saude(erro: Exception) -> bool:
+    """Erros que indicam Tiny degradada (contam para o circuit breaker)"""
+    if isinstance(erro, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    return isinstance(erro, httpx.HTTPStatusError) and erro.response.status_code >= 500
+
+
+# =============================================================================
+# CIRCUIT BREAKER
+# =============================================================================
+
+class CircuitBreaker:
+    """Circuit breaker de um endpoint Tiny"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        limite_falhas: int = TINY_CIRCUITO_FALHAS,
+        resfriamento: float = TINY_CIRCUITO_RESFRIAMENTO
+    ):
+        self.endpoint = endpoint
+        self.limite_falhas = limite_falhas
+        self.resfriamento = resfriamento
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.aberto_em = 0.0
+        self.aberturas = 0
+        self._sonda_em_andamento = False
+
+    def _mudar(self, estado: str) -> None:
+        self.estado = estado
+        TINY_CIRCUIT_STATE.set(_VALOR_ESTADO[estado], self.endpoint)
+
+    def permitir(self) -> bool:
+        """
+        Libera a chamada ou levanta CircuitoAbertoError.
+        True se esta chamada é a sonda do meio_aberto: só ela pode liberar_sonda().
+        """
+        if self.estado == FECHADO:
+            return False
+        restante = self.aberto_em + self.resfriamento - time.monotonic()
+        if self.estado == ABERTO and restante <= 0:
+            self._mudar(MEIO_ABERTO)
+        if self.estado == MEIO_ABERTO and not self._sonda_em_andamento:
+            self._sonda_em_andamento = True
+            return True
+        TINY_CIRCUIT_REJECTIONS_TOTAL.inc(self.endpoint)
+        raise CircuitoAbertoError(self.endpoint, max(restante, 0))
+
+    def registrar_sucesso(self) -> None:
+        self.falhas_seguidas = 0
+        self._sonda_em_andamento = False
+        if self.estado != FECHADO:
+            self._mudar(FECHADO)
+
+    def registrar_falha(self) -> None:
+        self.falhas_seguidas += 1
+        self._sonda_em_andamento = False
+        if self.estado == MEIO_ABERTO or self.falhas_seguidas >= self.limite_falhas:
+            if self.estado != ABERTO:
+                self.aberturas += 1
+            self.aberto_em = time.monotonic()
+            self._mudar(ABERTO)
+
+    def liberar_sonda(self) -> None:
+        """Sonda interrompida sem resultado (ex: cancelamento): permite outra. Só quem recebeu True de permitir()"""
+        self._sonda_em_andamento = False
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "falhas_seguidas": self.falhas_seguidas,
+            "aberturas": self.aberturas
+        }
+
+
+class Disjuntores:
+    """Circuit breakers por endpoint (criados sob demanda)"""
+
+    def __init__(self):
+        self._por_endpoint: Dict[str, CircuitBreaker] = {}
+
+    def para(self, endpoint: str) -> CircuitBreaker:
+        disjuntor = self._por_endpoint.get(endpoint)
+        if disjuntor is None:
+            disjuntor = self._por_endpoint[endpoint] = CircuitBreaker(endpoint)
+        return disjuntor
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            endpoint: disjuntor.estatisticas()
+            for endpoint, disjuntor in self._por_endpoint.items()
+            if disjuntor.estado != FECHADO or disjuntor.aberturas
+        }
+
+
+disjuntores = Disjuntores()
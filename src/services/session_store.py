@@ -0,0 +1,194 @@
+"""
+Armazenamento de sessões MCP
+TTL por inatividade, limite de tamanho com despejo LRU e varredura periódica
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from src.services.log import get_logger
+from src.services.storage import StorageBackend, StorageError, chave_storage
+
+log = get_logger(__name__)
+
+MCP_SESSION_TTL = float(os.getenv("MCP_SESSION_TTL", "1800"))
+MCP_SESSION_MAX = int(os.getenv("MCP_SESSION_MAX", "10000"))
+MCP_SESSION_VARREDURA = float(os.getenv("MCP_SESSION_VARREDURA", "60"))
+
+
+class SessionStore:
+    """
+    Sessões em ordem de último acesso (a mais antiga fica no início).
+
+    Como o acesso move a sessão para o fim, a varredura de expiradas para
+    na primeira sessão ainda válida.
+
+    Com um `backend` compartilhado (ex: Redis), obter/salvar/encerrar usam o
+    backend como fonte da verdade, para que qualquer worker enxergue a sessão.
+    """
+
+    def __init__(
+        self,
+        ttl: float = MCP_SESSION_TTL,
+        max_sessoes: int = MCP_SESSION_MAX,
+        intervalo_varredura: float = MCP_SESSION_VARREDURA,
+        backend: Optional[StorageBackend] = None,
+        serializar: Callable[[Any], Dict[str, Any]] = lambda sessao: sessao,
+        desserializar: Callable[[Dict[str, Any]], Any] = lambda dados: dados
+    ):
+        self.ttl = ttl
+        self.max_sessoes = max_sessoes
+        self.intervalo_varredura = intervalo_varredura
+        self.backend = backend
+        self.serializar = serializar
+        self.desserializar = desserializar
+        self.erros_backend = 0
+        self._sessoes: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._varredura: Optional[asyncio.Task] = None
+        self.criadas = 0
+        self.expiradas = 0
+        self.evictions = 0
+        self.encerradas = 0
+
+    def __len__(self) -> int:
+        return len(self._sessoes)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Retorna a sessão (renovando o TTL) ou None se não existe/expirou"""
+        item = self._sessoes.get(session_id)
+        if item is None:
+            return None
+
+        sessao, ultimo_acesso = item
+        agora = time.monotonic()
+        if agora - ultimo_acesso > self.ttl:
+            del self._sessoes[session_id]
+            self.expiradas += 1
+            return None
+
+        self._sessoes[session_id] = (sessao, agora)
+        self._sessoes.move_to_end(session_id)
+        return sessao
+
+    def put(self, session_id: str, sessao: Any) -> None:
+        """Registra a sessão, despejando as menos usadas acima de max_sessoes"""
+        if session_id not in self._sessoes:
+            self.criadas += 1
+        self._sessoes[session_id] = (sessao, time.monotonic())
+        self._sessoes.move_to_end(session_id)
+
+        while len(self._sessoes) > self.max_sessoes:
+            self._sessoes.popitem(last=False)
+            self.evictions += 1
+
+    def remove(self, session_id: str) -> bool:
+        """Encerra a sessão explicitamente (DELETE /mcp)"""
+        if self._sessoes.pop(session_id, None) is None:
+            return False
+        self.encerradas += 1
+        return True
+
+    # -------------------------------------------------------------------------
+    # API assíncrona (considera o backend compartilhado, se houver)
+    # -------------------------------------------------------------------------
+
+    async def obter(self, session_id: str) -> Optional[Any]:
+        """Busca a sessão no backend compartilhado (ou na memória local)"""
+        if self.backend is None:
+            return self.get(session_id)
+
+        try:
+            dados = await self.backend.get(chave_storage("sessao", session_id))
+        except StorageError as e:
+            # Backend fora: degrada para a cópia local
+            self.erros_backend += 1
+            log.warning("Falha ao ler sessão do backend: %s", e)
+            return self.get(session_id)
+
+        if dados is None:
+            self._sessoes.pop(session_id, None)
+            return None
+
+        sessao = self.desserializar(json.loads(dados))
+        self._sessoes[session_id] = (sessao, time.monotonic())
+        self._sessoes.move_to_end(session_id)
+        return sessao
+
+    async def salvar(self, session_id: str, sessao: Any) -> None:
+        """Registra a sessão localmente e renova o TTL no backend compartilhado"""
+        self.put(session_id, sessao)
+        if self.backend is None:
+            return
+
+        try:
+            dados = json.dumps(self.serializar(sessao)).encode("utf-8")
+            await self.backend.set(chave_storage("sessao", session_id), dados, ttl=self.ttl)
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Falha ao gravar sessão no backend: %s", e)
+
+    async def encerrar(self, session_id: str) -> bool:
+        """Encerra a sessão em todos os workers"""
+        removida = self.remove(session_id)
+        if self.backend is None:
+            return removida
+
+        try:
+            return await self.backend.delete(chave_storage("sessao", session_id)) > 0 or removida
+        except StorageError as e:
+            self.erros_backend += 1
+            log.warning("Falha ao remover sessão do backend: %s", e)
+            return removida
+
+    def varrer(self) -> int:
+        """Remove sessões expiradas. Retorna quantas foram removidas"""
+        limite = time.monotonic() - self.ttl
+        removidas = 0
+        while self._sessoes:
+            session_id, (_, ultimo_acesso) = next(iter(self._sessoes.items()))
+            if ultimo_acesso > limite:
+                break
+            del self._sessoes[session_id]
+            removidas += 1
+        self.expiradas += removidas
+        return removidas
+
+    async def _loop_varredura(self) -> None:
+        while True:
+            await asyncio.sleep(self.intervalo_varredura)
+            self.varrer()
+
+    async def iniciar_varredura(self) -> None:
+        """Inicia a varredura periódica (startup do FastAPI)"""
+        if self._varredura is None or self._varredura.done():
+            self._varredura = asyncio.create_task(self._loop_varredura())
+
+    async def parar_varredura(self) -> None:
+        """Para a varredura periódica (shutdown do FastAPI)"""
+        if self._varredura is not None:
+            self._varredura.cancel()
+            try:
+                await self._varredura
+            except asyncio.CancelledError:
+                pass
+            self._varredura = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "vivas": len(self._sessoes),
+            "max": self.max_sessoes,
+            "ttl_segundos": self.ttl,
+            "criadas": self.criadas,
+            "expiradas": self.expiradas,
+            "evictions": self.evictions,
+            "encerradas": self.encerradas,
+            "backend_compartilhado": self.backend is not None,
+            "erros_backend": self.erros_backend
+        }
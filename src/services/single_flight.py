@@ -0,0 +1,57 @@
+"""
+Single-flight: chamadas idênticas e concorrentes compartilham uma execução
+Ex: dezenas de chats do mesmo tenant pedindo o mesmo produto ao mesmo tempo
+viram uma única chamada à API Tiny (e consomem uma única cota do rate limit).
+"""
+
+import asyncio
+from typing import Dict, Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    A primeira chamada de uma chave cria a tarefa; as demais aguardam a mesma.
+
+    A tarefa não é cancelada se quem a iniciou desistir (shield): ela segue
+    para quem ainda está aguardando. O resultado é o mesmo objeto para todos,
+    então não deve ser alterado in-place.
+    """
+
+    def __init__(self):
+        self._em_voo: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.executadas = 0
+        self.compartilhadas = 0
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._em_voo
+
+    def __len__(self) -> int:
+        return len(self._em_voo)
+
+    def _finalizar(self, chave: Hashable, tarefa: "asyncio.Task[Any]") -> None:
+        if self._em_voo.get(chave) is tarefa:
+            del self._em_voo[chave]
+        # Marca a exceção como lida mesmo se todos os interessados desistiram
+        if not tarefa.cancelled():
+            tarefa.exception()
+
+    async def executar(self, chave: Hashable, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        tarefa = self._em_voo.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(fabrica())
+            self._em_voo[chave] = tarefa
+            tarefa.add_done_callback(lambda concluida: self._finalizar(chave, concluida))
+            self.executadas += 1
+        else:
+            self.compartilhadas += 1
+        return await asyncio.shield(tarefa)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "em_voo": len(self._em_voo),
+            "executadas": self.executadas,
+            "compartilhadas": self.compartilhadas
+        }
+
+
+single_flight = SingleFlight()
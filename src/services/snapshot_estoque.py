@@ -0,0 +1,519 @@
+"""
+Snapshot de estoque por tenant (saldo de cada produto em memória)
+
+Preenchido pelas leituras de produto.obter.estoque e pela carga dos depósitos
+(depositos.lista + deposito.obter.estoque), e mantido em dia pelas
+movimentações de estoque (movimentacoes.estoque.pesquisa desde a última
+consulta) em vez de reler cada produto. Responde tiny_produto_obter_estoque
+enquanto o saldo foi confirmado há no máximo idade_maxima segundos, e
+tiny_relatorio_estoque_baixo depois da primeira carga dos depósitos.
+
+Uma movimentação nova só é somada a um saldo obtido antes da janela em que
+ela apareceu; caso contrário (movimentação sem id, depósito ambíguo, saldo
+obtido durante a janela) o produto fica obsoleto e a próxima leitura vai
+para a Tiny. Escritas por este servidor e webhooks (invalidações do cache de
+respostas) também tornam o produto obsoleto. Cada worker mantém o próprio
+snapshot.
+"""
+
+import asyncio
+import copy
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Set
+
+from src.services.cache import response_cache
+from src.services.espelho import (
+    FUSO_TINY,
+    MARGEM_INCREMENTAL,
+    ErroSincronizacao,
+    marca_tiny,
+    resposta_sem_registros,
+    sem_registros,
+)
+from src.services.log import get_logger
+from src.services.por_tenant import EstadoTenant, ServicoPorTenant
+from src.services.tiny_client import TinyAPIClient
+from src.services.tiny_endpoints import chave_token
+
+log = get_logger(__name__)
+
+# Idade máxima padrão (s desde a última confirmação) de um saldo servido da memória
+ESTOQUE_SNAPSHOT_IDADE_MAX = float(os.getenv("ESTOQUE_SNAPSHOT_IDADE_MAX", "120"))
+# Intervalo entre consultas de movimentações (deltas)
+ESTOQUE_SNAPSHOT_INTERVALO = float(os.getenv("ESTOQUE_SNAPSHOT_INTERVALO", "60"))
+# Recarga completa pelos depósitos (0 = não carrega: só leituras + movimentações, sem relatório local)
+ESTOQUE_SNAPSHOT_RESYNC = float(os.getenv("ESTOQUE_SNAPSHOT_RESYNC", "21600"))
+ESTOQUE_SNAPSHOT_INATIVIDADE = float(os.getenv("ESTOQUE_SNAPSHOT_INATIVIDADE", "86400"))
+ESTOQUE_SNAPSHOT_MAX_TENANTS = int(os.getenv("ESTOQUE_SNAPSHOT_MAX_TENANTS", "200"))
+# Páginas de movimentações por consulta; acima disso o snapshot do tenant é recarregado
+ESTOQUE_SNAPSHOT_MAX_PAGINAS = int(os.getenv("ESTOQUE_SNAPSHOT_MAX_PAGINAS", "50"))
+# Produtos obsoletos relidos na Tiny antes do relatório local (acima disso, relatório da Tiny)
+ESTOQUE_SNAPSHOT_MAX_RELEITURAS = int(os.getenv("ESTOQUE_SNAPSHOT_MAX_RELEITURAS", "20"))
+# Tenants atualizando ao mesmo tempo (cada um ainda passa pelo próprio rate limit)
+ESTOQUE_SNAPSHOT_CONCORRENCIA = int(os.getenv("ESTOQUE_SNAPSHOT_CONCORRENCIA", "2"))
+
+# Nova tentativa de carga dos depósitos após falha
+_ESPERA_APOS_FALHA_CARGA = 900.0
+# Invalidações lembradas para descartar leituras que estavam em andamento
+_RETENCAO_INVALIDACOES = 600.0
+
+
+class _MovimentacoesDemais(ErroSincronizacao):
+    """Mais páginas de movimentações do que ESTOQUE_SNAPSHOT_MAX_PAGINAS"""
+
+
+def _numero(valor: Any) -> Optional[float]:
+    if valor is None or isinstance(valor, bool):
+        return None
+    try:
+        return float(str(valor).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _depositos(produto: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        item.get("deposito", item) for item in produto.get("depositos") or []
+        if isinstance(item, dict)
+    ]
+
+
+def _id_produto(movimentacao: Dict[str, Any]) -> str:
+    produto = movimentacao.get("produto")
+    id_produto = (
+        movimentacao.get("idProduto")
+        or movimentacao.get("id_produto")
+        or (produto.get("id") if isinstance(produto, dict) else None)
+    )
+    return str(id_produto or "")
+
+
+def _nome_deposito(movimentacao: Dict[str, Any]) -> Optional[str]:
+    deposito = movimentacao.get("deposito")
+    if isinstance(deposito, dict):
+        deposito = deposito.get("nome")
+    return deposito or movimentacao.get("nomeDeposito") or None
+
+
+def _movimentado(atual: float, tipo: str, quantidade: float) -> float:
+    if tipo == "E":
+        return atual + quantidade
+    if tipo == "S":
+        return atual - quantidade
+    return quantidade  # B = balanço (saldo informado)
+
+
+def movimentar(produto: Dict[str, Any], movimentacao: Dict[str, Any]) -> bool:
+    """
+    Aplica a movimentação (E/S/B) ao saldo do produto (formato de
+    produto.obter.estoque), no depósito dela. False (produto intocado) se não
+    dá para saber o efeito: tipo/quantidade inválidos ou depósito ambíguo.
+    """
+    tipo = str(movimentacao.get("tipo") or "").strip().upper()[:1]
+    quantidade = _numero(movimentacao.get("quantidade"))
+    saldo = _numero(produto.get("saldo"))
+    if tipo not in ("E", "S", "B") or quantidade is None or saldo is None:
+        return False
+
+    depositos = _depositos(produto)
+    nome = _nome_deposito(movimentacao)
+    if nome:
+        alvo = next((deposito for deposito in depositos if deposito.get("nome") == nome), None)
+        if alvo is None:
+            return False
+    elif len(depositos) == 1:
+        alvo = depositos[0]
+    elif not depositos:
+        alvo = None
+    else:
+        return False
+
+    if alvo is None:
+        produto["saldo"] = _movimentado(saldo, tipo, quantidade)
+        return True
+    anterior = _numero(alvo.get("saldo"))
+    if anterior is None:
+        return False
+    novo = _movimentado(anterior, tipo, quantidade)
+    alvo["saldo"] = novo
+    if alvo.get("desconsiderar") != "S":
+        produto["saldo"] = saldo + novo - anterior
+    return True
+
+
+class _Saldo:
+    __slots__ = ("produto", "obtido_em", "obsoleto")
+
+    def __init__(self, produto: Dict[str, Any], obtido_em: float):
+        self.produto = produto          # cópia própria (movimentações alteram in-place)
+        self.obtido_em = obtido_em      # monotonic do início da leitura
+        self.obsoleto = False
+
+
+class _SnapshotTenant(EstadoTenant):
+    """Saldos de um tenant e o estado da consulta de movimentações"""
+
+    def __init__(self, token: str):
+        super().__init__(token)
+        self.saldos: Dict[str, _Saldo] = {}
+        # Movimentações acompanhadas a partir daqui (saldos obtidos antes não são confirmados por elas)
+        self.coberto_desde: Optional[float] = None
+        # Movimentações novas só são somadas a saldos obtidos antes disto
+        self.janela_desde: Optional[float] = None
+        # Início da última consulta de movimentações OK: saldos cobertos valem até aqui
+        self.confirmado_em: Optional[float] = None
+        self.marca: Optional[str] = None        # dataInicio da próxima consulta (horário de Brasília)
+        self.vistas: Set[str] = set()           # ids de movimentação da última consulta (sobreposição)
+        self.carregado_em: Optional[float] = None
+        self.proxima_carga = 0.0
+        self.invalidado_em: Dict[str, float] = {}
+        self.invalidado_tudo_em = 0.0
+
+    def idade(self, saldo: _Saldo) -> float:
+        confirmado = saldo.obtido_em
+        if (
+            self.coberto_desde is not None and self.confirmado_em is not None
+            and saldo.obtido_em >= self.coberto_desde
+        ):
+            confirmado = max(confirmado, self.confirmado_em)
+        return time.monotonic() - confirmado
+
+    def invalidado_desde(self, id_produto: str, instante: float) -> bool:
+        return max(self.invalidado_em.get(id_produto, 0.0), self.invalidado_tudo_em) >= instante
+
+
+class SnapshotEstoque(ServicoPorTenant[_SnapshotTenant]):
+    """
+    Snapshots por tenant (LRU, até max_tenants) e o loop que consulta as
+    movimentações e recarrega os depósitos. Configuração via ESTOQUE_SNAPSHOT_*.
+    """
+
+    def __init__(self):
+        super().__init__(
+            intervalo=ESTOQUE_SNAPSHOT_INTERVALO,
+            inatividade=ESTOQUE_SNAPSHOT_INATIVIDADE,
+            max_tenants=ESTOQUE_SNAPSHOT_MAX_TENANTS,
+            concorrencia=ESTOQUE_SNAPSHOT_CONCORRENCIA
+        )
+        self.idade_max = ESTOQUE_SNAPSHOT_IDADE_MAX
+        self.resync = ESTOQUE_SNAPSHOT_RESYNC
+        # Sessão do scheduler: divide a cota do tenant com as sessões dos agentes
+        self.sessao = "snapshot-estoque"
+        self.consultas_locais = 0
+        self.leituras_tiny = 0
+        self.relatorios_locais = 0
+        self.relatorios_repassados = 0
+        self.movimentacoes_aplicadas = 0
+        self.saldos_obsoletos = 0
+        self.consultas_movimentacoes = 0
+        self.cargas_depositos = 0
+        self.falhas = 0
+
+    def _novo_tenant(self, token: str) -> _SnapshotTenant:
+        return _SnapshotTenant(token)
+
+    def descartar(self, tenant_chave: str, endpoint: str, item_id: Optional[str]) -> None:
+        """Ouvinte das invalidações do cache de respostas (escritas e webhooks)"""
+        if endpoint != "produto.obter.estoque":
+            return
+        tenant = self._tenants.get(tenant_chave)
+        if tenant is None:
+            return
+        agora = time.monotonic()
+        if item_id is None:
+            tenant.invalidado_tudo_em = agora
+            alvo = list(tenant.saldos.values())
+        else:
+            tenant.invalidado_em[item_id] = agora
+            alvo = [tenant.saldos[item_id]] if item_id in tenant.saldos else []
+        for saldo in alvo:
+            saldo.obsoleto = True
+
+    # -------------------------------------------------------------------------
+    # Atualização (movimentações e carga dos depósitos)
+    # -------------------------------------------------------------------------
+
+    async def _atualizar(self, tenant: _SnapshotTenant) -> None:
+        id_tenant = chave_token(tenant.token)
+        client = TinyAPIClient(token=tenant.token, session_id=self.sessao)
+        async with self._semaforo:
+            etapas = [("movimentações", self._consultar_movimentacoes)]
+            if self.resync > 0 and time.monotonic() >= tenant.proxima_carga:
+                etapas.append(("depósitos", self._carregar_depositos))
+            for nome, etapa in etapas:
+                try:
+                    await etapa(client, tenant)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.falhas += 1
+                    tenant.erros += 1
+                    tenant.ultimo_erro = f"{nome}: {e}"
+                    if nome == "depósitos":
+                        tenant.proxima_carga = time.monotonic() + min(self.resync, _ESPERA_APOS_FALHA_CARGA)
+                    log.warning(
+                        "Falha ao atualizar snapshot de estoque (%s): %s", nome, e,
+                        extra={"tenant": id_tenant}
+                    )
+
+    async def _movimentacoes(self, client: TinyAPIClient, marca: str) -> List[Dict[str, Any]]:
+        """Movimentações desde a marca (todas as páginas ou _MovimentacoesDemais)"""
+        movimentacoes: List[Dict[str, Any]] = []
+        async for pagina in client.iterar_paginas(
+            "pesquisar_movimentacoes_estoque", max_paginas=ESTOQUE_SNAPSHOT_MAX_PAGINAS, data_inicio=marca
+        ):
+            retorno = pagina.get("retorno", {})
+            if retorno.get("status") != "OK":
+                if sem_registros(retorno):
+                    break
+                raise ErroSincronizacao(
+                    f"movimentacoes.estoque.pesquisa: {retorno.get('erros') or retorno.get('codigo_erro')}"
+                )
+            if int(retorno.get("numero_paginas") or 1) > ESTOQUE_SNAPSHOT_MAX_PAGINAS:
+                raise _MovimentacoesDemais("movimentações demais desde a última consulta")
+            for item in retorno.get("movimentacoes") or []:
+                movimentacao = item.get("movimentacao", item) if isinstance(item, dict) else None
+                if isinstance(movimentacao, dict):
+                    movimentacoes.append(movimentacao)
+        return movimentacoes
+
+    async def _consultar_movimentacoes(self, client: TinyAPIClient, tenant: _SnapshotTenant) -> None:
+        inicio = time.monotonic()
+        marca = marca_tiny(datetime.now(FUSO_TINY))
+        margem = MARGEM_INCREMENTAL.total_seconds()
+        try:
+            movimentacoes = await self._movimentacoes(client, tenant.marca or marca)
+        except _MovimentacoesDemais:
+            # Sem a lista completa não há como saber o que mudou: recomeça a partir de agora
+            for saldo in tenant.saldos.values():
+                saldo.obsoleto = True
+            tenant.coberto_desde = None
+            tenant.marca = None
+            tenant.vistas = set()
+            tenant.proxima_carga = 0.0
+            raise
+
+        if tenant.coberto_desde is None:
+            # Primeira consulta: as movimentações da janela podem ou não estar nos saldos já lidos
+            tenant.coberto_desde = tenant.janela_desde = inicio - margem
+
+        vistas: Set[str] = set()
+        for movimentacao in movimentacoes:
+            id_movimentacao = str(movimentacao.get("id") or "")
+            if id_movimentacao:
+                vistas.add(id_movimentacao)
+                if id_movimentacao in tenant.vistas:
+                    continue
+            saldo = tenant.saldos.get(_id_produto(movimentacao))
+            if saldo is None or saldo.obsoleto:
+                continue
+            if (
+                id_movimentacao
+                and tenant.coberto_desde <= saldo.obtido_em < tenant.janela_desde
+                and movimentar(saldo.produto, movimentacao)
+            ):
+                self.movimentacoes_aplicadas += 1
+            else:
+                saldo.obsoleto = True
+                self.saldos_obsoletos += 1
+
+        tenant.vistas = vistas
+        tenant.marca = marca
+        tenant.janela_desde = inicio - margem
+        tenant.confirmado_em = inicio
+        tenant.invalidado_em = {
+            id_produto: instante for id_produto, instante in tenant.invalidado_em.items()
+            if instante > inicio - _RETENCAO_INVALIDACOES
+        }
+        self.consultas_movimentacoes += 1
+
+    @staticmethod
+    def _itens_deposito(retorno: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        deposito = retorno.get("deposito")
+        itens = retorno.get("produtos") or (deposito.get("produtos") if isinstance(deposito, dict) else None)
+        for item in itens or []:
+            produto = item.get("produto", item) if isinstance(item, dict) else None
+            if isinstance(produto, dict):
+                yield produto
+
+    async def _carregar_depositos(self, client: TinyAPIClient, tenant: _SnapshotTenant) -> None:
+        """Saldos de todos os produtos, somando os depósitos que entram no saldo (desconsiderar != S)"""
+        inicio = time.monotonic()
+        retorno = (await client.listar_depositos()).get("retorno", {})
+        if retorno.get("status") != "OK":
+            raise ErroSincronizacao(f"depositos.lista: {retorno.get('erros') or retorno.get('codigo_erro')}")
+
+        produtos: Dict[str, Dict[str, Any]] = {}
+        for item in retorno.get("depositos") or []:
+            deposito = item.get("deposito", item) if isinstance(item, dict) else None
+            if not isinstance(deposito, dict) or deposito.get("id") is None or deposito.get("desconsiderar") == "S":
+                continue
+            estoque = (await client.obter_estoque_deposito(str(deposito["id"]))).get("retorno", {})
+            if estoque.get("status") != "OK":
+                if sem_registros(estoque):
+                    continue
+                raise ErroSincronizacao(
+                    f"deposito.obter.estoque: {estoque.get('erros') or estoque.get('codigo_erro')}"
+                )
+            for item_produto in self._itens_deposito(estoque):
+                id_produto = item_produto.get("id") or item_produto.get("idProduto")
+                saldo = _numero(item_produto.get("saldo"))
+                if id_produto is None or saldo is None:
+                    continue
+                produto = produtos.setdefault(str(id_produto), {
+                    "id": str(id_produto),
+                    "nome": item_produto.get("nome", ""),
+                    "codigo": item_produto.get("codigo", ""),
+                    "unidade": item_produto.get("unidade", ""),
+                    "saldo": 0.0,
+                    "depositos": []
+                })
+                produto["saldo"] += saldo
+                produto["depositos"].append(
+                    {"deposito": {"nome": deposito.get("nome", ""), "desconsiderar": "N", "saldo": saldo}}
+                )
+
+        saldos = {id_produto: _Saldo(produto, inicio) for id_produto, produto in produtos.items()}
+        for id_produto, saldo in saldos.items():
+            saldo.obsoleto = tenant.invalidado_desde(id_produto, inicio)
+        # Leituras feitas durante a carga são mais recentes que ela
+        for id_produto, saldo in tenant.saldos.items():
+            if saldo.obtido_em > inicio:
+                saldos[id_produto] = saldo
+        tenant.saldos = saldos
+        tenant.carregado_em = inicio
+        tenant.proxima_carga = inicio + self.resync
+        self.cargas_depositos += 1
+        log.info(
+            "Snapshot de estoque carregado: %d produtos em %.1fs", len(saldos), time.monotonic() - inicio,
+            extra={"tenant": chave_token(tenant.token)}
+        )
+
+    # -------------------------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------------------------
+
+    async def _ler(self, client: TinyAPIClient, tenant: _SnapshotTenant, id_produto: str) -> Dict[str, Any]:
+        """produto.obter.estoque na Tiny, guardando o saldo no snapshot"""
+        inicio = time.monotonic()
+        resposta = await client.obter_estoque_produto(id_produto)
+        retorno = resposta.get("retorno", {})
+        produto = retorno.get("produto")
+        if retorno.get("status") == "OK" and isinstance(produto, dict):
+            if not tenant.invalidado_desde(id_produto, inicio):
+                tenant.saldos[id_produto] = _Saldo(copy.deepcopy(produto), inicio)
+        elif sem_registros(retorno):
+            tenant.saldos.pop(id_produto, None)
+        return resposta
+
+    async def obter(
+        self,
+        client: TinyAPIClient,
+        arguments: Dict[str, Any],
+        source: str = "local"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        tiny_produto_obter_estoque: saldo da memória se confirmado há no máximo
+        idade_maxima segundos; senão lê na Tiny (e guarda).
+        """
+        id_produto = str(arguments.get("id") or "")
+        if not id_produto:
+            return None
+        tenant = self.registrar(client.token)
+        limite = _numero(arguments.get("idade_maxima"))
+        if limite is None:
+            limite = self.idade_max
+
+        saldo = tenant.saldos.get(id_produto)
+        if saldo is not None and not saldo.obsoleto:
+            idade = tenant.idade(saldo)
+            if idade <= limite:
+                self.consultas_locais += 1
+                return {"retorno": {
+                    "status_processamento": "3",
+                    "status": "OK",
+                    "produto": copy.deepcopy(saldo.produto),
+                    "origem": "snapshot",
+                    "snapshot_idade_segundos": round(idade)
+                }}
+
+        self.leituras_tiny += 1
+        return await self._ler(client, tenant, id_produto)
+
+    async def relatorio_baixo(
+        self,
+        client: TinyAPIClient,
+        arguments: Dict[str, Any],
+        source: str = "local"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        tiny_relatorio_estoque_baixo: produtos com saldo abaixo de "minimo".
+        None (relatório da Tiny) sem carga dos depósitos ou com saldos demais
+        para reler.
+        """
+        tenant = self.registrar(client.token)
+        if tenant.carregado_em is None:
+            self.relatorios_repassados += 1
+            return None
+
+        velhos = [
+            id_produto for id_produto, saldo in tenant.saldos.items()
+            if saldo.obsoleto or tenant.idade(saldo) > self.idade_max
+        ]
+        if len(velhos) > ESTOQUE_SNAPSHOT_MAX_RELEITURAS:
+            self.relatorios_repassados += 1
+            return None
+        for resposta in await asyncio.gather(*(self._ler(client, tenant, id_produto) for id_produto in velhos)):
+            retorno = resposta.get("retorno", {})
+            if retorno.get("status") != "OK" and not sem_registros(retorno):
+                self.relatorios_repassados += 1
+                return None
+
+        minimo = _numero(arguments.get("minimo"))
+        if minimo is None:
+            minimo = 5.0
+        abaixo = [
+            saldo.produto for saldo in tenant.saldos.values()
+            if (_numero(saldo.produto.get("saldo")) or 0.0) < minimo
+        ]
+        self.relatorios_locais += 1
+        if not abaixo:
+            return resposta_sem_registros("snapshot")
+        abaixo.sort(key=lambda produto: _numero(produto.get("saldo")) or 0.0)
+        idade = max(tenant.idade(saldo) for saldo in tenant.saldos.values())
+        return {"retorno": {
+            "status_processamento": "3",
+            "status": "OK",
+            "minimo": minimo,
+            "registros": len(abaixo),
+            "produtos": [
+                {"produto": {campo: produto.get(campo) for campo in ("id", "codigo", "nome", "unidade", "saldo")}}
+                for produto in abaixo
+            ],
+            "origem": "snapshot",
+            "snapshot_idade_segundos": round(idade)
+        }}
+
+    def estatisticas(self) -> Dict[str, Any]:
+        tenants = list(self._tenants.values())
+        return {
+            "tenants": len(tenants),
+            "carregados": sum(1 for tenant in tenants if tenant.carregado_em is not None),
+            "saldos": sum(len(tenant.saldos) for tenant in tenants),
+            "obsoletos": sum(1 for tenant in tenants for saldo in tenant.saldos.values() if saldo.obsoleto),
+            "consultas_locais": self.consultas_locais,
+            "leituras_tiny": self.leituras_tiny,
+            "relatorios_locais": self.relatorios_locais,
+            "relatorios_repassados": self.relatorios_repassados,
+            "movimentacoes_aplicadas": self.movimentacoes_aplicadas,
+            "saldos_obsoletos": self.saldos_obsoletos,
+            "consultas_movimentacoes": self.consultas_movimentacoes,
+            "cargas_depositos": self.cargas_depositos,
+            "falhas": self.falhas
+        }
+
+
+snapshot_estoque = SnapshotEstoque()
+response_cache.ao_invalidar(snapshot_estoque.descartar)
@@ -0,0 +1,313 @@
+"""
+Backend de armazenamento chave-valor compartilhado
+Permite que sessões e cache sejam vistos por todos os workers/réplicas
+
+STORAGE_URL:
+- memory://                     (padrão, só o processo atual)
+- redis://[:senha@]host:porta/db (protocolo Redis / RESP)
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import time
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+STORAGE_URL = os.getenv("STORAGE_URL", "memory://")
+STORAGE_PREFIXO = os.getenv("STORAGE_PREFIXO", "mcp-tiny:")
+STORAGE_MAX_CONEXOES = int(os.getenv("STORAGE_MAX_CONEXOES", "10"))
+STORAGE_TIMEOUT = float(os.getenv("STORAGE_TIMEOUT", "2"))
+
+
+class StorageError(Exception):
+    """Falha de comunicação com o backend de armazenamento"""
+
+
+class _ConexaoPerdida(StorageError):
+    """A conexão caiu no meio do comando e não pode voltar ao pool"""
+
+
+def chave_storage(*partes: str) -> str:
+    """Monta a chave com o prefixo do app (ex: "mcp-tiny:sessao:<id>")"""
+    return STORAGE_PREFIXO + ":".join(partes)
+
+
+class StorageBackend(ABC):
+    """Interface dos backends. Valores são bytes; ttl em segundos"""
+
+    compartilhado = False
+
+    @abstractmethod
+    async def get(self, chave: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, chave: str, valor: bytes, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def set_se_ausente(self, chave: str, valor: bytes, ttl: Optional[float] = None) -> bool:
+        """Grava só se a chave não existe (atômico). Retorna True se gravou"""
+
+    @abstractmethod
+    async def delete(self, *chaves: str) -> int:
+        ...
+
+    @abstractmethod
+    async def incr(self, chave: str) -> int:
+        ...
+
+    @abstractmethod
+    async def ping(self) -> bool:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+# =============================================================================
+# MEMÓRIA (processo atual)
+# =============================================================================
+
+class MemoryBackend(StorageBackend):
+    """Backend em memória do processo (um único worker)"""
+
+    def __init__(self):
+        self._dados: Dict[str, Tuple[bytes, Optional[float]]] = {}
+
+    def _vivo(self, chave: str) -> Optional[bytes]:
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        valor, expira_em = item
+        if expira_em is not None and expira_em <= time.monotonic():
+            del self._dados[chave]
+            return None
+        return valor
+
+    async def get(self, chave: str) -> Optional[bytes]:
+        return self._vivo(chave)
+
+    async def set(self, chave: str, valor: bytes, ttl: Optional[float] = None) -> None:
+        self._dados[chave] = (valor, time.monotonic() + ttl if ttl else None)
+
+    async def set_se_ausente(self, chave: str, valor: bytes, ttl: Optional[float] = None) -> bool:
+        if self._vivo(chave) is not None:
+            return False
+        await self.set(chave, valor, ttl)
+        return True
+
+    async def delete(self, *chaves: str) -> int:
+        return sum(1 for chave in chaves if self._dados.pop(chave, None) is not None)
+
+    async def incr(self, chave: str) -> int:
+        atual = int(self._vivo(chave) or 0) + 1
+        expira_em = self._dados[chave][1] if chave in self._dados else None
+        self._dados[chave] = (str(atual).encode(), expira_em)
+        return atual
+
+    async def ping(self) -> bool:
+        return True
+
+
+# =============================================================================
+# REDIS (protocolo RESP, sem dependência externa)
+# =============================================================================
+
+class _ConexaoRedis:
+    """Uma conexão RESP (request/response sequencial)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @staticmethod
+    def _codificar(*args: Any) -> bytes:
+        partes = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            dado = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            partes.append(b"$%d\r\n%s\r\n" % (len(dado), dado))
+        return b"".join(partes)
+
+    async def _ler(self) -> Any:
+        linha = await self.reader.readline()
+        if not linha:
+            raise _ConexaoPerdida("Conexão com Redis encerrada")
+        tipo, resto = linha[:1], linha[1:-2]
+        if tipo == b"+":
+            return resto.decode()
+        if tipo == b"-":
+            raise StorageError(resto.decode())
+        if tipo == b":":
+            return int(resto)
+        if tipo == b"$":
+            tamanho = int(resto)
+            if tamanho < 0:
+                return None
+            return (await self.reader.readexactly(tamanho + 2))[:-2]
+        if tipo == b"*":
+            quantidade = int(resto)
+            if quantidade < 0:
+                return None
+            return [await self._ler() for _ in range(quantidade)]
+        raise StorageError(f"Resposta RESP inválida: {linha!r}")
+
+    async def comando(self, *args: Any) -> Any:
+        self.writer.write(self._codificar(*args))
+        await self.writer.drain()
+        return await self._ler()
+
+    def fechar(self) -> None:
+        self.writer.close()
+
+
+class RedisBackend(StorageBackend):
+    """Cliente Redis mínimo (GET/SET/SET NX/DEL/INCR/PING) com pool de conexões"""
+
+    compartilhado = True
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        porta: int = 6379,
+        db: int = 0,
+        senha: Optional[str] = None,
+        max_conexoes: int = STORAGE_MAX_CONEXOES,
+        timeout: float = STORAGE_TIMEOUT
+    ):
+        self.host = host
+        self.porta = porta
+        self.db = db
+        self.senha = senha
+        self.timeout = timeout
+        self._livres: asyncio.Queue = asyncio.Queue()
+        self._vagas = asyncio.Semaphore(max_conexoes)
+
+    async def _conectar(self) -> _ConexaoRedis:
+        reader, writer = await asyncio.open_connection(self.host, self.porta)
+        conexao = _ConexaoRedis(reader, writer)
+        try:
+            if self.senha:
+                await conexao.comando("AUTH", self.senha)
+            if self.db:
+                await conexao.comando("SELECT", self.db)
+        except BaseException:
+            conexao.fechar()
+            raise
+        return conexao
+
+    async def _executar(self, *args: Any) -> Any:
+        async with self._vagas:
+            conexao = None if self._livres.empty() else self._livres.get_nowait()
+            if conexao is not None:
+                try:
+                    return await self._executar_em(conexao, *args)
+                except _ConexaoPerdida:
+                    # Conexão ociosa do pool caiu (ex: restart do Redis): tenta uma nova
+                    pass
+            conexao = await self._nova_conexao()
+            return await self._executar_em(conexao, *args)
+
+    async def _nova_conexao(self) -> _ConexaoRedis:
+        try:
+            return await asyncio.wait_for(self._conectar(), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise StorageError(f"Falha ao conectar no Redis {self.host}:{self.porta}: {e!r}") from e
+
+    async def _executar_em(self, conexao: _ConexaoRedis, *args: Any) -> Any:
+        try:
+            resposta = await asyncio.wait_for(conexao.comando(*args), self.timeout)
+        except _ConexaoPerdida:
+            conexao.fechar()
+            raise
+        except StorageError:
+            # Erro do Redis (ex: WRONGTYPE): a conexão continua válida
+            self._livres.put_nowait(conexao)
+            raise
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            conexao.fechar()
+            raise _ConexaoPerdida(f"Conexão com Redis {self.host}:{self.porta} perdida: {e!r}") from e
+        except (OSError, asyncio.TimeoutError) as e:
+            conexao.fechar()
+            raise StorageError(f"Falha no Redis {self.host}:{self.porta}: {e!r}") from e
+        except BaseException:
+            # Cancelada no meio do comando: a resposta pendente dessincronizaria a conexão
+            conexao.fechar()
+            raise
+        self._livres.put_nowait(conexao)
+        return resposta
+
+    async def get(self, chave: str) -> Optional[bytes]:
+        return await self._executar("GET", chave)
+
+    async def set(self, chave: str, valor: bytes, ttl: Optional[float] = None) -> None:
+        if ttl:
+            await self._executar("SET", chave, valor, "PX", max(1, int(ttl * 1000)))
+        else:
+            await self._executar("SET", chave, valor)
+
+    async def set_se_ausente(self, chave: str, valor: bytes, ttl: Optional[float] = None) -> bool:
+        if ttl:
+            resposta = await self._executar("SET", chave, valor, "PX", max(1, int(ttl * 1000)), "NX")
+        else:
+            resposta = await self._executar("SET", chave, valor, "NX")
+        return resposta == "OK"
+
+    async def delete(self, *chaves: str) -> int:
+        if not chaves:
+            return 0
+        return await self._executar("DEL", *chaves)
+
+    async def incr(self, chave: str) -> int:
+        return await self._executar("INCR", chave)
+
+    async def ping(self) -> bool:
+        return await self._executar("PING") == "PONG"
+
+    async def close(self) -> None:
+        while not self._livres.empty():
+            self._livres.get_nowait().fechar()
+
+
+# =============================================================================
+# FÁBRICA
+# =============================================================================
+
+def criar_backend(url: str) -> StorageBackend:
+    """Cria o backend a partir da URL (memory:// ou redis://)"""
+    partes = urlparse(url)
+    if partes.scheme == "memory":
+        return MemoryBackend()
+    if partes.scheme == "redis":
+        db = partes.path.lstrip("/")
+        return RedisBackend(
+            host=partes.hostname or "localhost",
+            porta=partes.port or 6379,
+            db=int(db) if db else 0,
+            senha=unquote(partes.password) if partes.password else None
+        )
+    raise ValueError(f"STORAGE_URL não suportada: {url}")
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Backend configurado em STORAGE_URL (instância única do processo)"""
+    global _storage
+    if _storage is None:
+        _storage = criar_backend(STORAGE_URL)
+    return _storage
+
+
+def set_storage(backend: StorageBackend) -> None:
+    """Troca o backend do processo (testes / stand-in local)"""
+    global _storage
+    _storage = backend
+
+
+async def shutdown_storage() -> None:
+    """Fecha conexões do backend (shutdown do FastAPI)"""
+    if _storage is not None:
+        await _storage.close()
@@ -5,28 +5,172 @@ Implementa TODOS os ~120 endpoints disponíveis
 
 import httpx
 import asyncio
-from typing import Dict, Any, Optional, List
+import logging
+import os
+import math
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List, AsyncIterator, Callable
 from datetime import datetime
 import json
 
+from src.services.rate_limiter import scheduler
+from src.services.cache import response_cache
+from src.services.resiliencia import (
+    CODIGO_ERRO_LIMITE_TINY,
+    TINY_RETRY_TENTATIVAS,
+    TINY_RETRIES_TOTAL,
+    ErroLimiteTiny,
+    disjuntores,
+    eh_falha_de_saude,
+    espera_retry,
+    motivo_retry,
+)
+from src.services.single_flight import single_flight
+from src.services.idempotencia import idempotency_store, ENDPOINTS_IDEMPOTENTES
+from src.services.webhooks import url_webhook
+from src.services.tiny_endpoints import (
+    chave_parametros,
+    chave_token,
+    eh_escrita,
+    escrita_ok,
+    prioridade_endpoint,
+    registros_escrita,
+)
+from src.services import json_codec
+from src.services.log import get_logger
+from src.services.metrics import (
+    TINY_REQUEST_SECONDS,
+    TINY_RATE_LIMIT_WAIT_SECONDS,
+    TINY_REQUESTS_TOTAL,
+    TINY_ERRORS_TOTAL,
+    TINY_IN_FLIGHT,
+    classe_erro_tiny,
+)
+
+log = get_logger(__name__)
+
+
+# =============================================================================
+# POOL DE CONEXÕES HTTP (compartilhado pelo processo)
+# =============================================================================
+
+# URL base da API Tiny (apontar para benchmarks/mock_tiny.py em testes de carga)
+TINY_API_BASE_URL = os.getenv("TINY_API_BASE_URL", "https://api.tiny.com.br/api2").rstrip("/")
+TINY_API_TIMEOUT = float(os.getenv("TINY_API_TIMEOUT", "30"))
+TINY_HTTP_MAX_CONNECTIONS = int(os.getenv("TINY_HTTP_MAX_CONNECTIONS", "100"))
+TINY_HTTP_MAX_KEEPALIVE = int(os.getenv("TINY_HTTP_MAX_KEEPALIVE", "20"))
+TINY_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("TINY_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Paginação automática: páginas buscadas em paralelo e teto de páginas por chamada
+TINY_PAGINAS_CONCORRENTES = int(os.getenv("TINY_PAGINAS_CONCORRENTES", "4"))
+TINY_PAGINAS_MAX = int(os.getenv("TINY_PAGINAS_MAX", "50"))
+
+# Atualização de estoque em lote: itens por chamada e chamadas em andamento (o ritmo é o do rate limiter)
+TINY_LOTE_MAX_ITENS = int(os.getenv("TINY_LOTE_MAX_ITENS", "2000"))
+TINY_LOTE_CONCORRENCIA = int(os.getenv("TINY_LOTE_CONCORRENCIA", "8"))
+
+
+def _criar_http_client() -> httpx.AsyncClient:
+    """Cria o AsyncClient com keep-alive e limites de pool configuráveis"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(TINY_API_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=TINY_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=TINY_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=TINY_HTTP_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o AsyncClient compartilhado do processo.
+    Cria sob demanda caso o lifespan da aplicação não tenha iniciado o pool
+    (ex: scripts avulsos).
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _criar_http_client()
+    return _http_client
+
+
+async def startup_http_client() -> None:
+    """Abre o pool de conexões (chamado no startup do FastAPI)"""
+    get_http_client()
+
+
+async def shutdown_http_client() -> None:
+    """Fecha o pool de conexões (chamado no shutdown do FastAPI)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 class TinyAPIClient:
     """Cliente completo para API Tiny ERP v2"""
 
-    def __init__(self, token: str, base_url: str = "https://api.tiny.com.br/api2"):
+    def __init__(
+        self,
+        token: str,
+        base_url: str = TINY_API_BASE_URL,
+        session_id: Optional[str] = None
+    ):
         self.token = token
         self.base_url = base_url
-        self.timeout = 30.0
+        self.timeout = TINY_API_TIMEOUT
+        # Sessão MCP de origem (fila justa do scheduler entre sessões do mesmo tenant)
+        self.session_id = session_id
 
     async def _request(
         self,
         endpoint: str,
         data: Optional[Dict[str, Any]] = None,
-        formato: str = "JSON"
+        formato: str = "JSON",
+        usar_cache: bool = True,
+        chave_idempotencia: Optional[str] = None
     ) -> Dict[str, Any]:
         """Executa requisição para API Tiny"""
+        # Leituras idempotentes (ex: produto.obter) passam pelo cache do tenant
+        cacheavel = usar_cache and formato == "JSON" and response_cache.ttl_para(endpoint, self.token) is not None
+        if cacheavel:
+            cached = await response_cache.obter(self.token, endpoint, data)
+            if cached is not None:
+                TINY_REQUESTS_TOTAL.inc(endpoint, "cache")
+                return cached
+
+        # Leituras idênticas em andamento (mesmo tenant, endpoint e parâmetros)
+        # compartilham uma única chamada. usar_cache=False pede leitura própria.
+        if usar_cache and not eh_escrita(endpoint):
+            chave = (chave_token(self.token), endpoint, formato, chave_parametros(data))
+            if chave in single_flight:
+                TINY_REQUESTS_TOTAL.inc(endpoint, "compartilhada")
+            return await single_flight.executar(
+                chave, lambda: self._chamar_api(endpoint, data, formato, cacheavel)
+            )
+
+        # Escritas que criam registros: uma execução por chave (explícita ou hash do payload)
+        if endpoint in ENDPOINTS_IDEMPOTENTES:
+            return await idempotency_store.executar(
+                self.token, endpoint, data, chave_idempotencia,
+                lambda: self._chamar_api(endpoint, data, formato, cacheavel)
+            )
+
+        return await self._chamar_api(endpoint, data, formato, cacheavel)
+
+    async def _chamar_api(
+        self,
+        endpoint: str,
+        data: Optional[Dict[str, Any]],
+        formato: str,
+        cacheavel: bool
+    ) -> Dict[str, Any]:
+        """Chamada HTTP à API Tiny (rate limit, métricas e cache/invalidação)"""
         from urllib.parse import urlencode
-        
+
         payload = {
             "token": self.token,
             "formato": formato
@@ -38,22 +182,212 @@ class TinyAPIClient:
         # Montar payload manualmente como string URL-encoded
         # para garantir que o campo "pedido" (que já é JSON string) não seja escapado novamente
         payload_str = urlencode(payload, safe='')
-        
-        print(f"[DEBUG] Payload URL-encoded: {payload_str[:300]}...")
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+
+        # %.300s: o corte só acontece se DEBUG estiver ligado; o token é redigido pelo logger
+        log.debug("Payload %s: %.300s", endpoint, payload_str, extra={"endpoint": endpoint})
+
+        # Invalidações (escritas, webhooks) depois deste instante descartam a resposta para o cache;
+        # a geração cobre as feitas por outros workers no backend compartilhado
+        geracao = await response_cache.geracao(self.token, endpoint) if cacheavel else None
+        iniciado_em = time.monotonic()
+
+        disjuntor = disjuntores.para(endpoint)
+        tentativa = 0
+        # Esta chamada é a sonda do meio_aberto e ainda não registrou o resultado
+        sonda = False
+        try:
+            while True:
+                # Falha imediata enquanto o endpoint estiver degradado (CircuitoAbertoError)
+                sonda = disjuntor.permitir()
+                try:
+                    response = await self._enviar(endpoint, payload_str)
+                except httpx.HTTPError as e:
+                    if eh_falha_de_saude(e):
+                        disjuntor.registrar_falha()
+                    else:
+                        disjuntor.registrar_sucesso()
+                    sonda = False
+                    erro: Exception = e
+                else:
+                    disjuntor.registrar_sucesso()
+                    sonda = False
+                    resultado = json_codec.loads(response.content)
+
+                    classe_erro = classe_erro_tiny(resultado)
+                    if classe_erro is not None:
+                        TINY_ERRORS_TOTAL.inc(endpoint, classe_erro)
+                    if classe_erro != f"tiny_erro_{CODIGO_ERRO_LIMITE_TINY}":
+                        break
+                    erro = ErroLimiteTiny(endpoint)
+
+                motivo = motivo_retry(endpoint, erro) if tentativa < TINY_RETRY_TENTATIVAS else None
+                if motivo is None:
+                    if isinstance(erro, ErroLimiteTiny):
+                        break  # devolve o retorno de erro da própria Tiny
+                    raise erro
+
+                espera = espera_retry(tentativa, erro)
+                TINY_RETRIES_TOTAL.inc(endpoint, motivo)
+                log.info(
+                    "Nova tentativa em %s (%s) em %.2fs", endpoint, motivo, espera,
+                    extra={"endpoint": endpoint, "motivo": motivo, "tentativa": tentativa + 1}
+                )
+                await asyncio.sleep(espera)
+                tentativa += 1
+        finally:
+            # Sonda cancelada sem resultado; recusas (CircuitoAbertoError) não mexem na sonda de outra chamada
+            if sonda:
+                disjuntor.liberar_sonda()
+
+        if eh_escrita(endpoint):
+            await response_cache.invalidar_escrita(self.token, endpoint, data)
+        elif cacheavel and resultado.get("retorno", {}).get("status") == "OK":
+            await response_cache.guardar(
+                self.token, endpoint, data, resultado, len(response.content), iniciado_em, geracao
+            )
+
+        return resultado
+
+    async def _enviar(self, endpoint: str, payload_str: str) -> httpx.Response:
+        """Uma tentativa: cota do rate limiter, POST e métricas"""
+        # Respeita a cota do tiny_token (escritas passam na frente de pesquisas)
+        with TINY_RATE_LIMIT_WAIT_SECONDS.medir(endpoint):
+            await scheduler.adquirir(self.token, prioridade_endpoint(endpoint), self.session_id)
+
+        TINY_REQUESTS_TOTAL.inc(endpoint, "api")
+        TINY_IN_FLIGHT.inc(endpoint)
+        inicio = time.perf_counter()
+        try:
+            client = get_http_client()
             response = await client.post(
                 f"{self.base_url}/{endpoint}.php",
                 content=payload_str,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=self.timeout
             )
             response.raise_for_status()
-            
-            # Debug: log da resposta
-            print(f"[DEBUG] Response status: {response.status_code}")
-            print(f"[DEBUG] Response body: {response.text[:500]}")
-            
-            return response.json()
+        except httpx.HTTPStatusError as e:
+            TINY_ERRORS_TOTAL.inc(endpoint, f"http_{e.response.status_code}")
+            raise
+        except httpx.TimeoutException:
+            TINY_ERRORS_TOTAL.inc(endpoint, "timeout")
+            raise
+        except httpx.TransportError:
+            TINY_ERRORS_TOTAL.inc(endpoint, "conexao")
+            raise
+        finally:
+            TINY_REQUEST_SECONDS.observe(time.perf_counter() - inicio, endpoint)
+            TINY_IN_FLIGHT.dec(endpoint)
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "Resposta %s (%s): %.500s", endpoint, response.status_code, response.text,
+                extra={"endpoint": endpoint, "status_http": response.status_code, "bytes": len(response.content)}
+            )
+        return response
+
+    # =========================================================================
+    # PAGINAÇÃO AUTOMÁTICA
+    # =========================================================================
+
+    @staticmethod
+    def _chave_registros(retorno: Dict[str, Any]) -> Optional[str]:
+        """Chave da lista de registros no retorno (ex: "pedidos", "produtos", "contas")"""
+        for chave, valor in retorno.items():
+            if isinstance(valor, list):
+                return chave
+        return None
+
+    async def iterar_paginas(
+        self,
+        metodo: str,
+        max_registros: Optional[int] = None,
+        max_paginas: int = TINY_PAGINAS_MAX,
+        **filtros
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Gera as páginas de uma pesquisa (ex: "pesquisar_pedidos") em ordem.
+
+        Lê numero_paginas da primeira resposta e pré-busca as próximas páginas
+        em paralelo (até TINY_PAGINAS_CONCORRENTES à frente), sempre passando
+        pelo rate limiter do tenant.
+        """
+        pesquisar = getattr(self, metodo)
+        filtros.pop("pagina", None)
+
+        primeira = await pesquisar(pagina=1, **filtros)
+        yield primeira
+
+        retorno = primeira.get("retorno", {})
+        if retorno.get("status") != "OK":
+            return
+
+        total_paginas = min(int(retorno.get("numero_paginas") or 1), max_paginas)
+        chave = self._chave_registros(retorno)
+        por_pagina = len(retorno.get(chave) or []) if chave else 0
+        if max_registros and por_pagina:
+            total_paginas = min(total_paginas, math.ceil(max_registros / por_pagina))
+
+        proximas = iter(range(2, total_paginas + 1))
+        pendentes: deque = deque()
+
+        def agendar() -> None:
+            while len(pendentes) < TINY_PAGINAS_CONCORRENTES:
+                pagina = next(proximas, None)
+                if pagina is None:
+                    return
+                pendentes.append(asyncio.create_task(pesquisar(pagina=pagina, **filtros)))
+
+        try:
+            agendar()
+            while pendentes:
+                pagina_resultado = await pendentes.popleft()
+                agendar()
+                yield pagina_resultado
+                if pagina_resultado.get("retorno", {}).get("status") != "OK":
+                    return
+        finally:
+            for task in pendentes:
+                task.cancel()
+            # Aguarda os cancelamentos: nenhuma pré-busca sobrevive ao gerador
+            await asyncio.gather(*pendentes, return_exceptions=True)
+
+    async def pesquisar_todas_paginas(
+        self,
+        metodo: str,
+        max_registros: Optional[int] = None,
+        max_paginas: int = TINY_PAGINAS_MAX,
+        **filtros
+    ) -> Dict[str, Any]:
+        """Busca todas as páginas (ou até max_registros) e combina os registros numa única resposta"""
+        combinado: Optional[Dict[str, Any]] = None
+        chave: Optional[str] = None
+        paginas = 0
+
+        async for pagina in self.iterar_paginas(metodo, max_registros, max_paginas, **filtros):
+            retorno = pagina.get("retorno", {})
+            if combinado is None:
+                if retorno.get("status") != "OK":
+                    return pagina
+                combinado = {**retorno}
+                chave = self._chave_registros(retorno)
+                if chave:
+                    combinado[chave] = list(retorno[chave])
+            elif retorno.get("status") != "OK":
+                combinado["erro_paginacao"] = {"pagina": paginas + 1, "retorno": retorno}
+                break
+            elif chave:
+                combinado[chave].extend(retorno.get(chave) or [])
+            paginas += 1
+
+            if max_registros and chave and len(combinado[chave]) >= max_registros:
+                break
+
+        if chave and max_registros:
+            combinado[chave] = combinado[chave][:max_registros]
+        combinado["paginas_obtidas"] = paginas
+        combinado["registros"] = len(combinado[chave]) if chave else 0
+        return {"retorno": combinado}
 
     # =========================================================================
     # PEDIDOS / VENDAS
@@ -96,7 +430,7 @@ class TinyAPIClient:
                     # Se mês > 12, certeza que é formato MM/DD/YYYY errado
                     if mes > 12:
                         pedido["data_pedido"] = f"{parts[1]}/{parts[0]}/{parts[2]}"
-                        print(f"[SANITIZE] Data corrigida (mês>12): {data_str} -> {pedido['data_pedido']}")
+                        log.debug("Data do pedido corrigida (mês>12): %s -> %s", data_str, pedido["data_pedido"])
                     # Se dia > 12 E mês <= 12, formato está correto (DD/MM/YYYY)
                     elif dia > 12 and mes <= 12:
                         pass  # Já está correto
@@ -109,9 +443,9 @@ class TinyAPIClient:
                         except ValueError:
                             # Inválido como DD/MM/YYYY, converter de MM/DD/YYYY
                             pedido["data_pedido"] = f"{parts[1]}/{parts[0]}/{parts[2]}"
-                            print(f"[SANITIZE] Data corrigida (inválida DD/MM): {data_str} -> {pedido['data_pedido']}")
+                            log.debug("Data do pedido corrigida (inválida DD/MM): %s -> %s", data_str, pedido["data_pedido"])
             except Exception as e:
-                print(f"[SANITIZE] Erro ao processar data: {e}")
+                log.warning("Erro ao processar data do pedido %r: %s", data_str, e)
 
         # Sanitizar dados do cliente
         if "cliente" in pedido and isinstance(pedido["cliente"], dict):
@@ -122,19 +456,23 @@ class TinyAPIClient:
                 cpf_cnpj_original = cliente["cpf_cnpj"]
                 cliente["cpf_cnpj"] = re.sub(r'[.\-/]', '', str(cliente["cpf_cnpj"]))
                 if cpf_cnpj_original != cliente["cpf_cnpj"]:
-                    print(f"[SANITIZE] CPF/CNPJ: {cpf_cnpj_original} -> {cliente['cpf_cnpj']}")
+                    log.debug("CPF/CNPJ do cliente normalizado")
 
             # Remover pontos de CEP (manter apenas números e hífen)
             if "cep" in cliente:
                 cep_original = cliente["cep"]
                 cliente["cep"] = re.sub(r'\.', '', str(cliente["cep"]))
                 if cep_original != cliente["cep"]:
-                    print(f"[SANITIZE] CEP: {cep_original} -> {cliente['cep']}")
+                    log.debug("CEP do cliente normalizado: %s -> %s", cep_original, cliente["cep"])
 
         return pedido
 
-    async def incluir_pedido(self, pedido_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Inclui novo pedido"""
+    async def incluir_pedido(
+        self,
+        pedido_data: Dict[str, Any],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Inclui novo pedido (repetições com a mesma chave/payload não duplicam)"""
         # Sanitizar dados antes de enviar
         pedido_sanitized = self._sanitize_pedido_data(pedido_data)
 
@@ -142,10 +480,9 @@ class TinyAPIClient:
         pedido_wrapper = {"pedido": pedido_sanitized}
         pedido_json = json.dumps(pedido_wrapper, ensure_ascii=True, separators=(',', ':'))
 
-        # Debug: log do JSON sendo enviado (remover após testar)
-        print(f"[DEBUG] Enviando pedido para API Tiny: {pedido_json[:200]}...")
+        log.debug("Enviando pedido para API Tiny: %.200s", pedido_json)
 
-        return await self._request("pedido.incluir", {"pedido": pedido_json})
+        return await self._request("pedido.incluir", {"pedido": pedido_json}, chave_idempotencia=chave_idempotencia)
 
     async def alterar_pedido(self, pedido_id: str, pedido_data: Dict[str, Any]) -> Dict[str, Any]:
         """Altera pedido existente"""
@@ -177,6 +514,12 @@ class TinyAPIClient:
             data["gtin"] = gtin
         return await self._request("produtos.pesquisa", data)
 
+    async def listar_produtos_alterados(self, data_alteracao: str, pagina: int = 1) -> Dict[str, Any]:
+        """Produtos alterados desde data_alteracao (DD/MM/YYYY HH:MM:SS, horário de Brasília)"""
+        return await self._request(
+            "lista.atualizacoes.produtos", {"dataAlteracao": data_alteracao, "pagina": pagina}
+        )
+
     async def obter_produto(self, produto_id: str) -> Dict[str, Any]:
         """Obtém detalhes de um produto"""
         return await self._request("produto.obter", {"id": produto_id})
@@ -198,6 +541,77 @@ class TinyAPIClient:
         """Atualiza estoque do produto"""
         return await self._request("produto.atualizar.estoque", {"id": produto_id, "estoque": estoque})
 
+    async def atualizar_estoque_lote(
+        self,
+        itens: List[Dict[str, Any]],
+        ao_progresso: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Atualiza o estoque de vários produtos (itens: [{"id", "estoque"}]).
+
+        Até TINY_LOTE_CONCORRENCIA chamadas ao mesmo tempo, todas pela cota do
+        tenant; um item com erro não interrompe os demais. ao_progresso
+        (concluídos, total) é chamado a cada item terminado.
+        """
+        if not isinstance(itens, list) or not itens:
+            raise ValueError("itens deve ser uma lista não vazia de {id, estoque}")
+        if len(itens) > TINY_LOTE_MAX_ITENS:
+            raise ValueError(f"Lote com {len(itens)} itens; máximo de {TINY_LOTE_MAX_ITENS} por chamada")
+
+        resultados: List[Dict[str, Any]] = [{} for _ in itens]
+        validos: Dict[str, int] = {}
+        for posicao, item in enumerate(itens):
+            produto_id = str(item.get("id") or "") if isinstance(item, dict) else ""
+            estoque = item.get("estoque") if isinstance(item, dict) else None
+            if not produto_id or isinstance(estoque, bool) or not isinstance(estoque, (int, float)):
+                resultados[posicao] = {"id": produto_id or None, "status": "Erro", "erro": "Item sem id ou estoque numérico"}
+                continue
+            resultados[posicao] = {"id": produto_id, "estoque": estoque}
+            anterior = validos.get(produto_id)
+            if anterior is not None:
+                # Chamadas concorrentes para o mesmo produto não têm ordem: vale a última ocorrência
+                resultados[anterior].update(status="Erro", erro="id repetido no lote; aplicada a última ocorrência")
+            validos[produto_id] = posicao
+
+        semaforo = asyncio.Semaphore(TINY_LOTE_CONCORRENCIA)
+        total = len(validos)
+        concluidos = 0
+
+        async def atualizar(posicao: int) -> None:
+            nonlocal concluidos
+            resultado = resultados[posicao]
+            async with semaforo:
+                try:
+                    retorno = (await self.atualizar_estoque_produto(resultado["id"], resultado["estoque"])).get("retorno", {})
+                except Exception as e:
+                    resultado.update(status="Erro", erro=str(e) or type(e).__name__)
+                else:
+                    if escrita_ok(retorno):
+                        resultado["status"] = "OK"
+                    else:
+                        registro = next(iter(registros_escrita(retorno)), {})
+                        resultado.update(
+                            status="Erro",
+                            codigo_erro=retorno.get("codigo_erro"),
+                            erros=registro.get("erros") or retorno.get("erros")
+                        )
+            concluidos += 1
+            if ao_progresso is not None:
+                ao_progresso(concluidos, total)
+
+        await asyncio.gather(*(atualizar(posicao) for posicao in validos.values()))
+
+        sucesso = sum(1 for resultado in resultados if resultado.get("status") == "OK")
+        return {"retorno": {
+            "status_processamento": "3",
+            # Erro só quando nenhum item foi atualizado; o status de cada um está em "itens"
+            "status": "OK" if sucesso else "Erro",
+            "total": len(itens),
+            "sucesso": sucesso,
+            "falhas": len(itens) - sucesso,
+            "itens": resultados
+        }}
+
     async def obter_preco_produto(self, produto_id: str) -> Dict[str, Any]:
         """Obtém preço do produto"""
         return await self._request("produto.obter.preco", {"id": produto_id})
@@ -222,8 +636,12 @@ class TinyAPIClient:
         """Obtém detalhes de um contato"""
         return await self._request("contato.obter", {"id": contato_id})
 
-    async def incluir_contato(self, contato_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Inclui novo contato"""
+    async def incluir_contato(
+        self,
+        contato_data: Dict[str, Any],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Inclui novo contato (repetições com a mesma chave/payload não duplicam)"""
         # Adicionar campos obrigatórios conforme documentação
         if "sequencia" not in contato_data:
             contato_data["sequencia"] = "1"
@@ -240,27 +658,25 @@ class TinyAPIClient:
         }
         contato_json = json.dumps(contato_wrapper, ensure_ascii=True, separators=(",", ":"))
 
-        print(f"[DEBUG] Enviando contato para API Tiny: {contato_json[:200]}...")
+        log.debug("Enviando contato para API Tiny: %.200s", contato_json)
 
-        return await self._request("contato.incluir", {"contato": contato_json})
+        return await self._request("contato.incluir", {"contato": contato_json}, chave_idempotencia=chave_idempotencia)
 
     async def alterar_contato(self, contato_id: str, contato_data: Dict[str, Any]) -> Dict[str, Any]:
         """Altera contato existente"""
         # IMPORTANTE: API Tiny sobrescreve completamente o registro
         # Por isso, precisamos buscar os dados atuais primeiro e fazer merge
-        
-        print(f"[DEBUG] Buscando dados atuais do contato ID {contato_id}...")
-        
-        # Buscar dados atuais do contato
-        resultado_busca = await self.obter_contato(contato_id)
+
+        # Buscar dados atuais do contato (sem cache: o merge precisa do registro atual)
+        resultado_busca = await self._request("contato.obter", {"id": contato_id}, usar_cache=False)
         
         # Extrair dados do contato da resposta
         contato_atual = {}
         if "retorno" in resultado_busca and "contato" in resultado_busca["retorno"]:
             contato_atual = resultado_busca["retorno"]["contato"]
-            print(f"[DEBUG] Contato encontrado: {contato_atual.get('nome', 'N/A')}")
+            log.debug("Contato %s encontrado para merge", contato_id)
         else:
-            print(f"[WARN] Não foi possível buscar dados atuais do contato {contato_id}")
+            log.warning("Não foi possível buscar dados atuais do contato %s", contato_id, extra={"contato_id": contato_id})
         
         # Fazer merge: dados atuais + dados novos (novos sobrescrevem)
         contato_merged = {**contato_atual, **contato_data}
@@ -282,7 +698,7 @@ class TinyAPIClient:
         }
         contato_json = json.dumps(contato_wrapper, ensure_ascii=True, separators=(',', ':'))
 
-        print(f"[DEBUG] Alterando contato ID {contato_id} (campos: {list(contato_data.keys())})")
+        log.debug("Alterando contato %s (campos: %s)", contato_id, list(contato_data))
 
         return await self._request("contato.alterar", {"contato": contato_json})
 
@@ -350,9 +766,15 @@ class TinyAPIClient:
         """Obtém detalhes de uma conta a receber"""
         return await self._request("conta.receber.obter", {"id": conta_id})
 
-    async def incluir_conta_receber(self, conta_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Inclui nova conta a receber"""
-        return await self._request("conta.receber.incluir", {"conta": json.dumps(conta_data)})
+    async def incluir_conta_receber(
+        self,
+        conta_data: Dict[str, Any],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Inclui nova conta a receber (repetições com a mesma chave/payload não duplicam)"""
+        return await self._request(
+            "conta.receber.incluir", {"conta": json.dumps(conta_data)}, chave_idempotencia=chave_idempotencia
+        )
 
     async def baixar_conta_receber(self, conta_id: str, data_pagamento: str, valor: float) -> Dict[str, Any]:
         """Baixa conta a receber"""
@@ -663,8 +1085,10 @@ class TinyAPIClient:
         """Lista webhooks configurados"""
         return await self._request("webhooks.lista")
 
-    async def cadastrar_webhook(self, url: str, eventos: List[str]) -> Dict[str, Any]:
-        """Cadastra novo webhook"""
+    async def cadastrar_webhook(self, url: Optional[str], eventos: List[str]) -> Dict[str, Any]:
+        """Cadastra novo webhook (sem url: o receptor /webhooks/tiny deste servidor, assinado para o tenant)"""
+        if not url:
+            url = url_webhook(self.token)
         return await self._request("webhook.cadastrar", {"url": url, "eventos": json.dumps(eventos)})
 
     async def remover_webhook(self, webhook_id: str) -> Dict[str, Any]:
@@ -0,0 +1,60 @@
+"""
+Classificação dos endpoints da API Tiny ERP v2
+Usado pelo scheduler, cache e políticas de retry para separar leitura de escrita
+"""
+
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+
+# Verbos que indicam endpoint de escrita (efeito colateral no Tiny)
+VERBOS_ESCRITA = {
+    "incluir",
+    "alterar",
+    "atualizar",
+    "baixar",
+    "cancelar",
+    "gerar",
+    "enviar",
+    "cadastrar",
+    "remover",
+    "sincronizar",
+}
+
+# Prioridades do scheduler (menor = atendido primeiro)
+PRIORIDADE_ESCRITA = 0
+PRIORIDADE_LEITURA = 1
+
+
+def eh_escrita(endpoint: str) -> bool:
+    """Retorna True se o endpoint altera dados no Tiny (ex: pedido.incluir)"""
+    return any(parte in VERBOS_ESCRITA for parte in endpoint.split("."))
+
+
+def prioridade_endpoint(endpoint: str) -> int:
+    """Escritas (ex: pedido.incluir) passam na frente de pesquisas"""
+    return PRIORIDADE_ESCRITA if eh_escrita(endpoint) else PRIORIDADE_LEITURA
+
+
+def chave_parametros(data: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """Parâmetros normalizados (ordem estável) para chaves de cache/single-flight"""
+    return tuple(sorted((k, str(v)) for k, v in (data or {}).items()))
+
+
+def chave_token(token: Optional[str]) -> str:
+    """Identificador estável do tenant sem expor o tiny_token (logs, métricas, chaves)"""
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+
+
+def registros_escrita(retorno: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Registros do retorno de uma escrita ("registros": [{"registro": {...}}] ou {"registro": {...}})"""
+    registros = retorno.get("registros") or []
+    if isinstance(registros, dict):
+        registros = [registros]
+    return [item.get("registro", item) for item in registros if isinstance(item, dict)]
+
+
+def escrita_ok(retorno: Dict[str, Any]) -> bool:
+    """Status OK no retorno e em cada registro (a Tiny responde OK no retorno mesmo com o registro recusado)"""
+    return retorno.get("status") == "OK" and all(
+        registro.get("status", "OK") == "OK" for registro in registros_escrita(retorno)
+    )
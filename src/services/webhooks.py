@@ -0,0 +1,227 @@
+"""
+Webhooks da Tiny: URL de callback assinada por tenant, interpretação dos
+eventos e fila de processamento
+
+A Tiny não assina os webhooks. A URL cadastrada carrega a chave do tenant
+(chave_token, que não expõe o tiny_token) e um HMAC dela com WEBHOOK_SECRET:
+    {WEBHOOK_URL_BASE}/webhooks/tiny/{tenant}?assinatura={hmac}
+
+Cada evento verificado coloca o tenant em modo push no cache de respostas
+(services/cache.py) para a entidade do evento e invalida as leituras dela.
+Outros módulos podem assinar os eventos (fila_webhooks.assinar).
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from typing import Dict, Any, Awaitable, Callable, List, NamedTuple, Optional
+
+from src.services.cache import response_cache
+from src.services.log import get_logger
+from src.services.tiny_endpoints import chave_token
+
+log = get_logger(__name__)
+
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# URL pública deste servidor (ex: https://mcp-tiny.up.railway.app), usada ao cadastrar o webhook
+WEBHOOK_URL_BASE = os.getenv("WEBHOOK_URL_BASE", "").rstrip("/")
+# Eventos aguardando processamento; acima disso o receptor responde 503 e a Tiny reenvia
+WEBHOOK_FILA_MAX = int(os.getenv("WEBHOOK_FILA_MAX", "10000"))
+# Tempo (s) para processar os eventos pendentes no shutdown antes de descartá-los
+WEBHOOK_DRENAGEM_TIMEOUT = float(os.getenv("WEBHOOK_DRENAGEM_TIMEOUT", "10"))
+
+# "tipo" do webhook da Tiny -> entidade alterada
+TIPOS_EVENTO: Dict[str, str] = {
+    "produto": "produto",
+    "precos": "produto",
+    "preco": "produto",
+    "estoque": "estoque",
+    "inclusao_pedido": "pedido",
+    "situacao_pedido": "pedido",
+    "pedido": "pedido",
+}
+
+# Entidade -> leituras cacheadas que ficam obsoletas (invalidadas pelo id)
+INVALIDACOES_EVENTO: Dict[str, List[str]] = {
+    "produto": ["produto.obter", "produto.obter.estoque"],
+    "estoque": ["produto.obter.estoque", "produto.obter"],
+    "pedido": ["pedido.obter"],
+}
+
+# Onde cada entidade traz o id nos "dados" do webhook (primeiro presente vence)
+_CAMPOS_ID: Dict[str, tuple] = {
+    "produto": ("idProduto", "id"),
+    "estoque": ("idProduto", "id"),
+    "pedido": ("idPedido", "id"),
+}
+
+
+class WebhookInvalido(ValueError):
+    """Corpo do webhook fora do formato esperado"""
+
+
+class EventoTiny(NamedTuple):
+    tenant: str                  # chave_token do tiny_token
+    tipo: str                    # "tipo" como veio da Tiny
+    entidade: Optional[str]      # produto, estoque, pedido (None = tipo não tratado)
+    id_entidade: Optional[str]
+    dados: Dict[str, Any]
+    recebido_em: float
+
+
+def assinatura(tenant: str) -> str:
+    return hmac.new(WEBHOOK_SECRET.encode("utf-8"), tenant.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verificar(tenant: str, assinatura_recebida: str) -> bool:
+    """Compara a assinatura da URL em tempo constante (sempre falso sem WEBHOOK_SECRET)"""
+    if not WEBHOOK_SECRET or not assinatura_recebida:
+        return False
+    return hmac.compare_digest(assinatura(tenant), assinatura_recebida)
+
+
+def url_webhook(token: str) -> str:
+    """URL de callback deste servidor para o tenant do tiny_token"""
+    if not WEBHOOK_URL_BASE or not WEBHOOK_SECRET:
+        raise ValueError("Informe a url do webhook ou configure WEBHOOK_URL_BASE e WEBHOOK_SECRET no servidor")
+    tenant = chave_token(token)
+    return f"{WEBHOOK_URL_BASE}/webhooks/tiny/{tenant}?assinatura={assinatura(tenant)}"
+
+
+def interpretar(tenant: str, corpo: Any) -> EventoTiny:
+    """{"tipo": "estoque", "dados": {"idProduto": ..., ...}, ...} -> EventoTiny"""
+    if not isinstance(corpo, dict):
+        raise WebhookInvalido("Corpo do webhook deve ser um objeto JSON")
+    tipo = str(corpo.get("tipo") or "")
+    dados = corpo.get("dados")
+    if not tipo or not isinstance(dados, dict):
+        raise WebhookInvalido("Webhook sem tipo ou dados")
+
+    entidade = TIPOS_EVENTO.get(tipo)
+    id_entidade = None
+    if entidade is not None:
+        id_entidade = next(
+            (str(dados[campo]) for campo in _CAMPOS_ID[entidade] if dados.get(campo) not in (None, "")),
+            None
+        )
+    return EventoTiny(tenant, tipo, entidade, id_entidade, dados, time.time())
+
+
+Assinante = Callable[[EventoTiny], Awaitable[None]]
+
+
+class FilaWebhooks:
+    """
+    Eventos verificados aguardando processamento (um consumidor, em ordem).
+
+    O receptor só enfileira e responde: a Tiny não espera as invalidações
+    nem os assinantes.
+    """
+
+    def __init__(self, max_fila: int = WEBHOOK_FILA_MAX):
+        self._fila: "asyncio.Queue[EventoTiny]" = asyncio.Queue(maxsize=max_fila)
+        self._consumidor: Optional[asyncio.Task] = None
+        self._assinantes: List[Assinante] = []
+        self.recebidos = 0
+        self.processados = 0
+        self.ignorados = 0
+        self.recusados = 0
+        self.descartados = 0
+        self.erros = 0
+
+    def __len__(self) -> int:
+        return self._fila.qsize()
+
+    def assinar(self, assinante: Assinante) -> None:
+        """Chamado para cada evento, depois das invalidações do cache"""
+        self._assinantes.append(assinante)
+
+    def enfileirar(self, evento: EventoTiny) -> bool:
+        """False se a fila está cheia (o receptor devolve 503 e a Tiny reenvia)"""
+        try:
+            self._fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.recusados += 1
+            return False
+        self.recebidos += 1
+        return True
+
+    async def processar(self, evento: EventoTiny) -> None:
+        if evento.entidade is None:
+            self.ignorados += 1
+        else:
+            response_cache.ativar_push(evento.tenant, evento.entidade)
+            for endpoint in INVALIDACOES_EVENTO[evento.entidade]:
+                # Sem id no evento: descarta o endpoint inteiro do tenant
+                await response_cache.invalidar_tenant(evento.tenant, endpoint, evento.id_entidade)
+        for assinante in self._assinantes:
+            await assinante(evento)
+        self.processados += 1
+
+    async def _loop(self) -> None:
+        while True:
+            evento = await self._fila.get()
+            try:
+                await self.processar(evento)
+            except Exception as e:
+                self.erros += 1
+                log.warning(
+                    "Falha ao processar webhook %s: %s", evento.tipo, e,
+                    extra={"tenant": evento.tenant, "tipo": evento.tipo}
+                )
+            finally:
+                self._fila.task_done()
+
+    async def iniciar(self) -> None:
+        """Inicia o consumidor (startup do FastAPI)"""
+        if self._consumidor is None or self._consumidor.done():
+            self._consumidor = asyncio.create_task(self._loop())
+
+    async def parar(self, timeout: float = WEBHOOK_DRENAGEM_TIMEOUT) -> None:
+        """
+        Processa os eventos pendentes (até timeout segundos) e para o consumidor
+        (shutdown do FastAPI). Os que sobrarem invalidam o endpoint inteiro de
+        cada tenant/entidade e tiram a entidade do modo push.
+        """
+        if self._consumidor is not None:
+            if not self._consumidor.done():
+                try:
+                    await asyncio.wait_for(self._fila.join(), timeout)
+                except asyncio.TimeoutError:
+                    log.warning("Shutdown com %d webhooks pendentes", self._fila.qsize())
+            self._consumidor.cancel()
+            try:
+                await self._consumidor
+            except asyncio.CancelledError:
+                pass
+            self._consumidor = None
+
+        pendentes = set()
+        while not self._fila.empty():
+            evento = self._fila.get_nowait()
+            self._fila.task_done()
+            self.descartados += 1
+            if evento.entidade is not None:
+                pendentes.add((evento.tenant, evento.entidade))
+        for tenant, entidade in pendentes:
+            response_cache.desativar_push(tenant, entidade)
+            for endpoint in INVALIDACOES_EVENTO[entidade]:
+                await response_cache.invalidar_tenant(tenant, endpoint)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "habilitado": bool(WEBHOOK_SECRET),
+            "fila": self._fila.qsize(),
+            "max_fila": self._fila.maxsize,
+            "recebidos": self.recebidos,
+            "processados": self.processados,
+            "ignorados": self.ignorados,
+            "recusados_fila_cheia": self.recusados,
+            "descartados_shutdown": self.descartados,
+            "erros": self.erros
+        }
+
+
+fila_webhooks = FilaWebhooks()
@@ -0,0 +1,121 @@
+"""Autenticação por JWT e cache de tokens (src/api/mcp_server.py, src/services/jwt_cache.py)"""
+
+import asyncio
+import base64
+import json
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.api import mcp_server
+from src.services.jwt_cache import CacheJWT
+
+SEGREDO = "segredo-de-teste"
+CLAIMS = {"tenant_id": "t1", "tiny_token": "tk-123", "tenant_nome": "Loja", "plano": "pro"}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    novo = CacheJWT()
+    monkeypatch.setattr(mcp_server, "jwt_cache", novo)
+    return novo
+
+
+@pytest.fixture
+def com_segredo(monkeypatch):
+    monkeypatch.setattr(mcp_server, "JWT_SECRET", SEGREDO)
+
+
+def _sem_assinatura(claims):
+    """JWT com assinatura qualquer (decodificação sem JWT_SECRET)"""
+    def parte(dados):
+        return base64.urlsafe_b64encode(json.dumps(dados).encode()).rstrip(b"=").decode()
+    return f"{parte({'alg': 'HS256', 'typ': 'JWT'})}.{parte(claims)}.assinatura"
+
+
+def _auth(token):
+    return asyncio.run(mcp_server.get_auth_data(f"Bearer {token}"))
+
+
+def _recusado(token) -> HTTPException:
+    with pytest.raises(HTTPException) as erro:
+        _auth(token)
+    return erro.value
+
+
+def test_cache_devolve_as_mesmas_claims_sem_decodificar_de_novo(cache, monkeypatch):
+    token = _sem_assinatura({**CLAIMS, "exp": time.time() + 600})
+    primeiro = _auth(token)
+
+    def nao_chamar(_):
+        raise AssertionError("decodificou de novo")
+
+    monkeypatch.setattr(mcp_server, "_decodificar_jwt", nao_chamar)
+    assert _auth(token) == primeiro == {"tenant_id": "t1", "tiny_token": "tk-123", "tenant_nome": "Loja", "plano": "pro"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_token_expirado_sai_do_cache_e_e_recusado(cache, monkeypatch):
+    agora = time.time()
+    token = _sem_assinatura({**CLAIMS, "exp": agora + 60})
+    _auth(token)
+    assert len(cache) == 1
+
+    monkeypatch.setattr(time, "time", lambda: agora + 61)
+    erro = _recusado(token)
+    assert erro.status_code == 401 and "expirado" in erro.detail
+    assert cache.expirados == 1
+    assert len(cache) == 0
+
+
+def test_lru_respeita_o_limite():
+    cache = CacheJWT(max_entradas=2)
+    for token in ("a", "b"):
+        cache.guardar(token, {"t": token})
+    assert cache.obter("a") == {"t": "a"}
+    cache.guardar("c", {"t": "c"})
+    assert cache.obter("b") is None
+    assert cache.obter("a") == {"t": "a"}
+    assert cache.evictions == 1
+
+
+def test_sem_tiny_token_e_recusado(cache):
+    erro = _recusado(_sem_assinatura({"tenant_id": "t1"}))
+    assert erro.status_code == 401 and "tiny_token" in erro.detail
+    assert len(cache) == 0
+
+
+# =============================================================================
+# Com JWT_SECRET (python-jose)
+# =============================================================================
+
+def test_assinatura_valida_e_aceita(cache, com_segredo):
+    jwt = pytest.importorskip("jose.jwt")
+    token = jwt.encode({**CLAIMS, "exp": int(time.time()) + 600}, SEGREDO, algorithm="HS256")
+    assert _auth(token)["tiny_token"] == "tk-123"
+
+
+def test_assinatura_invalida_e_recusada_e_nao_entra_no_cache(cache, com_segredo):
+    jwt = pytest.importorskip("jose.jwt")
+    token = jwt.encode({**CLAIMS, "exp": int(time.time()) + 600}, "outro-segredo", algorithm="HS256")
+    erro = _recusado(token)
+    assert erro.status_code == 401 and "inválido" in erro.detail
+    # Mesmo payload com assinatura forjada à mão
+    assert _recusado(_sem_assinatura(CLAIMS)).status_code == 401
+    assert len(cache) == 0
+
+
+def test_expirado_e_recusado_pela_verificacao(cache, com_segredo):
+    jwt = pytest.importorskip("jose.jwt")
+    token = jwt.encode({**CLAIMS, "exp": int(time.time()) - 10}, SEGREDO, algorithm="HS256")
+    erro = _recusado(token)
+    assert erro.status_code == 401 and "expirado" in erro.detail
+
+
+def test_sem_python_jose_recusa_em_vez_de_aceitar_sem_verificar(cache, com_segredo, monkeypatch):
+    monkeypatch.setitem(sys.modules, "jose", None)   # import jose -> ImportError
+    erro = _recusado(_sem_assinatura({**CLAIMS, "exp": time.time() + 600}))
+    assert erro.status_code == 500
+    assert len(cache) == 0
@@ -0,0 +1,114 @@
+"""Batch JSON-RPC no POST /mcp (src/api/mcp_server.py)"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import mcp_server
+from src.api.mcp_server import MCPSession, handle_jsonrpc_batch
+from src.services.jwt_cache import CacheJWT
+from src.services.session_store import SessionStore
+
+
+def _jwt():
+    def parte(dados):
+        return base64.urlsafe_b64encode(json.dumps(dados).encode()).rstrip(b"=").decode()
+    return f"{parte({'alg': 'none'})}.{parte({'tenant_id': 't1', 'tiny_token': 'tk'})}.x"
+
+
+def _chamada(request_id, tool, **arguments):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": tool, "arguments": arguments}}
+
+
+@pytest.fixture
+def ferramentas(monkeypatch):
+    """execute_tiny_tool falso: dorme "espera" segundos e registra a concorrência"""
+    estado = {"ativas": 0, "max_ativas": 0}
+
+    async def executar(client, tool_name, arguments):
+        if tool_name == "falha":
+            raise ValueError("erro na tool")
+        estado["ativas"] += 1
+        estado["max_ativas"] = max(estado["max_ativas"], estado["ativas"])
+        await asyncio.sleep(arguments.get("espera", 0))
+        estado["ativas"] -= 1
+        return {"tool": tool_name, "n": arguments.get("n")}
+
+    monkeypatch.setattr(mcp_server, "execute_tiny_tool", executar)
+    return estado
+
+
+def _resultado(resposta):
+    return json.loads(resposta["result"]["content"][0]["text"])
+
+
+def test_respostas_na_ordem_das_requisicoes_e_execucao_concorrente(ferramentas, monkeypatch):
+    monkeypatch.setattr(mcp_server, "MCP_BATCH_CONCORRENCIA", 3)
+    mensagens = [_chamada(i, "lenta", n=i, espera=0.05 - i * 0.005) for i in range(6)]
+
+    respostas = asyncio.run(handle_jsonrpc_batch(mensagens, MCPSession("s1")))
+
+    assert [resposta["id"] for resposta in respostas] == list(range(6))
+    assert [_resultado(resposta)["n"] for resposta in respostas] == list(range(6))
+    assert ferramentas["max_ativas"] == 3
+
+
+def test_notifications_erros_e_entradas_invalidas(ferramentas):
+    mensagens = [
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        _chamada(1, "falha"),
+        7,
+        {"jsonrpc": "2.0", "id": 2, "method": "metodo/inexistente"},
+        {"jsonrpc": "2.0", "id": 3, "method": "ping"},
+    ]
+    session = MCPSession("s1")
+    respostas = asyncio.run(handle_jsonrpc_batch(mensagens, session))
+
+    assert session.initialized
+    assert [(r["id"], r.get("error", {}).get("code")) for r in respostas] == [
+        (1, -32603), (None, -32600), (2, -32601), (3, None)
+    ]
+
+
+@pytest.fixture
+def app(monkeypatch):
+    store = SessionStore(serializar=MCPSession.para_dict, desserializar=MCPSession.de_dict)
+    monkeypatch.setattr(mcp_server, "sessions", store)
+    monkeypatch.setattr(mcp_server, "JWT_SECRET", "")
+    monkeypatch.setattr(mcp_server, "jwt_cache", CacheJWT())
+    app = FastAPI()
+    app.include_router(mcp_server.router)
+    return app
+
+
+def _post(app, corpo):
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            return await cliente.post("/mcp", json=corpo, headers={"Authorization": f"Bearer {_jwt()}"})
+
+    return asyncio.run(enviar())
+
+
+def test_batch_pelo_endpoint(app, ferramentas):
+    resposta = _post(app, [_chamada(1, "a", n=1), _chamada(2, "b", n=2)])
+    assert resposta.status_code == 200
+    assert [_resultado(item)["tool"] for item in resposta.json()] == ["a", "b"]
+
+
+def test_batch_so_de_notifications_responde_202(app, ferramentas):
+    resposta = _post(app, [{"jsonrpc": "2.0", "method": "notifications/initialized"}])
+    assert resposta.status_code == 202
+    assert resposta.content == b""
+
+
+def test_batch_vazio_ou_grande_demais(app, ferramentas, monkeypatch):
+    assert _post(app, []).json()["error"]["code"] == -32600
+    monkeypatch.setattr(mcp_server, "MCP_BATCH_MAX", 2)
+    erro = _post(app, [_chamada(i, "a") for i in range(3)]).json()
+    assert erro["error"]["code"] == -32600 and "maior que 2" in erro["error"]["message"]
@@ -0,0 +1,77 @@
+"""Estado por tenant do ResponseCache (src/services/cache.py)"""
+
+import asyncio
+import time
+
+from src.services.cache import ResponseCache, id_escrita
+from src.services.storage import MemoryBackend
+from src.services.tiny_endpoints import chave_token
+
+
+def test_varredura_descarta_push_expirado_e_invalidacoes_antigas():
+    async def cenario():
+        cache = ResponseCache(retencao_invalidacao=0.05)
+        for i in range(20):
+            cache.ativar_push(chave_token(f"token-{i}"), "estoque", validade=0.01)
+            await cache.invalidar_tenant(chave_token(f"token-{i}"), "produto.obter")
+        lido_em = time.monotonic()
+        await asyncio.sleep(0.06)
+
+        await cache.invalidar_tenant("outro", "pedido.obter")
+        assert list(cache._push_ate) == []
+        assert list(cache._invalidado_em) == [("outro", "pedido.obter")]
+
+        # Leitura iniciada antes de uma marca descartada continua fora do cache
+        await cache.guardar("token-0", "produto.obter", {"id": "1"}, {"ok": True}, 10, iniciado_em=lido_em - 1)
+        assert await cache.obter("token-0", "produto.obter", {"id": "1"}) is None
+
+        await cache.guardar("token-0", "produto.obter", {"id": "1"}, {"ok": True}, 10, iniciado_em=time.monotonic())
+        assert await cache.obter("token-0", "produto.obter", {"id": "1"}) == {"ok": True}
+
+    asyncio.run(cenario())
+
+
+def test_leitura_anterior_a_invalidacao_de_outro_worker_nao_vai_para_o_backend():
+    async def cenario():
+        backend = MemoryBackend()
+        worker_a, worker_b = ResponseCache(backend=backend), ResponseCache(backend=backend)
+        parametros = {"id": "1"}
+
+        geracao = await worker_a.geracao("token-0", "produto.obter")
+        await worker_b.invalidar("token-0", "produto.obter", "1")
+        # Resposta lida antes da invalidação chega depois dela
+        await worker_a.guardar("token-0", "produto.obter", parametros, {"v": 1}, 10, time.monotonic(), geracao)
+        assert await worker_a.obter("token-0", "produto.obter", parametros) is None
+        assert await worker_b.obter("token-0", "produto.obter", parametros) is None
+
+        geracao = await worker_a.geracao("token-0", "produto.obter")
+        await worker_a.guardar("token-0", "produto.obter", parametros, {"v": 2}, 10, time.monotonic(), geracao)
+        assert await worker_b.obter("token-0", "produto.obter", parametros) == {"v": 2}
+
+    asyncio.run(cenario())
+
+
+def test_alterar_contato_invalida_so_o_proprio_contato():
+    token = "token-contato"
+    cache = ResponseCache()
+    contato = '{"contatos":[{"contato":{"id":"7","nome":"Ana","sequencia":"1"}}]}'
+
+    async def cenario():
+        for contato_id in ("7", "8"):
+            await cache.guardar(token, "contato.obter", {"id": contato_id}, {"ok": contato_id}, 10)
+        await cache.invalidar_escrita(token, "contato.alterar", {"contato": contato})
+        return (
+            await cache.obter(token, "contato.obter", {"id": "7"}),
+            await cache.obter(token, "contato.obter", {"id": "8"}),
+        )
+
+    assert asyncio.run(cenario()) == (None, {"ok": "8"})
+
+
+def test_id_escrita_sem_id_identificavel_invalida_o_endpoint_inteiro():
+    assert id_escrita("produto.alterar", {"id": 5, "produto": "{}"}) == "5"
+    assert id_escrita("contato.alterar", {"contato": '{"contato":{"id":9}}'}) == "9"
+    varios = '{"contatos":[{"contato":{"id":"1"}},{"contato":{"id":"2"}}]}'
+    assert id_escrita("contato.alterar", {"contato": varios}) is None
+    assert id_escrita("contato.alterar", {"contato": "não é json"}) is None
+    assert id_escrita("contato.incluir", {"contato": '{"contato":{"id":"1"}}'}) is None
@@ -0,0 +1,92 @@
+"""Respostas pré-serializadas do catálogo (src/api/catalogo.py)"""
+
+import asyncio
+import gzip
+
+import brotli
+import pytest
+from fastapi import Request
+
+from src.api import catalogo
+from src.api.catalogo import RespostaEstatica
+
+
+def _request(**headers: str) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/tools",
+        "headers": [(nome.replace("_", "-").encode(), valor.encode()) for nome, valor in headers.items()],
+    })
+
+
+def test_variantes_br_e_gzip():
+    corpo = b'{"tools": [' + b'{"name": "tiny_x"},' * 200 + b"{}]}"
+    resposta = RespostaEstatica(corpo, "application/json")
+
+    br = resposta.responder(_request(accept_encoding="gzip, br"))
+    assert br.headers["content-encoding"] == "br"
+    assert brotli.decompress(br.body) == corpo
+
+    gz = resposta.responder(_request(accept_encoding="gzip"))
+    assert gz.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gz.body) == corpo
+
+    assert resposta.responder(_request(if_none_match=resposta.etag)).status_code == 304
+
+
+CORPO = b'{"tools": [' + b'{"name": "tiny_x"},' * 200 + b"{}]}"
+
+
+@pytest.mark.parametrize("accept_encoding, esperado", [
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.0, gzip;q=0", None),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negociacao_respeita_q_zero_e_curinga(accept_encoding, esperado):
+    resposta = RespostaEstatica(CORPO, "application/json").responder(_request(accept_encoding=accept_encoding))
+    assert resposta.headers.get("content-encoding") == esperado
+    assert resposta.headers["vary"] == "Accept-Encoding"
+    if esperado is None:
+        assert resposta.body == CORPO
+
+
+def test_corpo_pequeno_nao_tem_variantes():
+    resposta = RespostaEstatica(b'{"tools": []}', "application/json")
+    assert resposta.variantes == {}
+    assert "content-encoding" not in resposta.responder(_request(accept_encoding="br, gzip")).headers
+
+
+@pytest.mark.parametrize("formato", ["{etag}", "W/{etag}", '"outro", {etag}', "*"])
+def test_if_none_match_responde_304_sem_corpo(formato):
+    resposta = RespostaEstatica(CORPO, "application/json")
+    nao_modificado = resposta.responder(_request(if_none_match=formato.format(etag=resposta.etag)))
+    assert nao_modificado.status_code == 304
+    assert nao_modificado.body == b""
+    assert nao_modificado.headers["etag"] == resposta.etag
+
+
+def test_etag_muda_com_o_corpo():
+    resposta = RespostaEstatica(CORPO, "application/json")
+    assert RespostaEstatica(CORPO, "application/json").etag == resposta.etag
+    assert RespostaEstatica(CORPO + b" ", "application/json").etag != resposta.etag
+    antigo = _request(if_none_match=RespostaEstatica(CORPO + b" ", "application/json").etag)
+    assert resposta.responder(antigo).status_code == 200
+
+
+def test_catalogo_preparado_no_startup():
+    from src.api.docs_endpoints import resposta_docs_html
+    from src.main import app, lifespan
+
+    cacheadas = (catalogo.resultado_tools_list, catalogo.resposta_tools, catalogo.resposta_docs_json, resposta_docs_html)
+    for funcao in cacheadas:
+        funcao.cache_clear()
+
+    async def iniciar():
+        async with lifespan(app):
+            return [funcao.cache_info().currsize for funcao in cacheadas]
+
+    assert asyncio.run(iniciar()) == [1, 1, 1, 1]
+    assert "br" in catalogo.resposta_tools().variantes
@@ -0,0 +1,66 @@
+"""Tabela de dispatch das tools (TOOL_HANDLERS em src/api/mcp_server.py)"""
+
+import asyncio
+
+import pytest
+
+from src.api import mcp_server
+from src.api.mcp_server import TOOL_HANDLERS, ToolHandler, execute_tiny_tool, validar_registro
+from src.api.mcp_tools import get_all_tools
+from src.services.tiny_client import TinyAPIClient
+
+
+def test_registro_cobre_exatamente_o_catalogo():
+    validar_registro()
+    assert set(TOOL_HANDLERS) == {tool.name for tool in get_all_tools()}
+
+
+def test_registro_inconsistente_falha(monkeypatch):
+    monkeypatch.setitem(TOOL_HANDLERS, "tiny_inexistente", ToolHandler("metodo_que_nao_existe", lambda a: ((), {})))
+    with pytest.raises(RuntimeError, match="tiny_inexistente"):
+        validar_registro()
+
+
+@pytest.fixture
+def chamadas(monkeypatch):
+    registro = []
+
+    def gravar(nome):
+        async def metodo(self, *args, **kwargs):
+            registro.append((nome, args, kwargs))
+            return {"retorno": {"status": "OK"}}
+        return metodo
+
+    for nome in ("obter_pedido", "pesquisar_pedidos", "incluir_pedido", "pesquisar_todas_paginas"):
+        monkeypatch.setattr(TinyAPIClient, nome, gravar(nome))
+    return registro
+
+
+def _executar(tool, arguments):
+    return asyncio.run(execute_tiny_tool(TinyAPIClient(token="token-dispatch"), tool, arguments))
+
+
+def test_posicionais_kwargs_e_idempotencia(chamadas):
+    _executar("tiny_pedido_obter", {"id": "7"})
+    _executar("tiny_pedidos_pesquisar", {"situacao": "aberto", "pagina": 2})
+    _executar("tiny_pedido_incluir", {"pedido": {"itens": []}, "chave_idempotencia": "k1"})
+    assert chamadas == [
+        ("obter_pedido", ("7",), {}),
+        ("pesquisar_pedidos", (), {"situacao": "aberto", "pagina": 2}),
+        ("incluir_pedido", ({"itens": []},), {"chave_idempotencia": "k1"}),
+    ]
+
+
+def test_pesquisa_paginavel_com_todas_paginas(chamadas):
+    _executar("tiny_pedidos_pesquisar", {"situacao": "aberto", "todas_paginas": True, "max_registros": 300})
+    assert chamadas == [("pesquisar_todas_paginas", ("pesquisar_pedidos", 300), {"situacao": "aberto"})]
+
+
+def test_tool_desconhecida_conta_como_desconhecida(chamadas):
+    antes = mcp_server.MCP_TOOL_CALLS_TOTAL.valor("desconhecida", "erro")
+    with pytest.raises(ValueError, match="Unknown tool"):
+        _executar("tiny_nao_existe", {})
+    assert chamadas == []
+    # Nome fora do catálogo não vira label
+    assert mcp_server.MCP_TOOL_CALLS_TOTAL.valor("desconhecida", "erro") == antes + 1
+    assert mcp_server.MCP_TOOL_CALLS_TOTAL.valor("tiny_nao_existe", "erro") == 0
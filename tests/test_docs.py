@@ -0,0 +1,68 @@
+"""Página /docs-mcp pré-renderizada (src/api/docs_endpoints.py)"""
+
+import asyncio
+import gzip
+
+import httpx
+from fastapi import FastAPI
+
+from src.api import docs_endpoints
+from src.api.mcp_tools import TOOLS_CATALOG
+
+
+def _get(caminho, **headers):
+    app = FastAPI()
+    app.include_router(docs_endpoints.router)
+
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            return await cliente.get(caminho, headers=headers)
+
+    return asyncio.run(enviar())
+
+
+def test_pagina_renderizada_uma_vez_por_processo(monkeypatch):
+    docs_endpoints.resposta_docs_html.cache_clear()
+    renderizacoes = []
+    renderizar = docs_endpoints.renderizar_docs_html
+
+    def contar():
+        renderizacoes.append(1)
+        return renderizar()
+
+    monkeypatch.setattr(docs_endpoints, "renderizar_docs_html", contar)
+    try:
+        primeira = _get("/docs-mcp/", **{"Accept-Encoding": "identity"})
+        segunda = _get("/docs-mcp/", **{"Accept-Encoding": "identity"})
+    finally:
+        docs_endpoints.resposta_docs_html.cache_clear()
+
+    assert len(renderizacoes) == 1
+    assert primeira.status_code == segunda.status_code == 200
+    assert primeira.headers["content-type"].startswith("text/html")
+    assert primeira.content == segunda.content
+    assert all(tool.name in primeira.text for tool in TOOLS_CATALOG)
+
+
+def test_pagina_com_etag_e_gzip():
+    pagina = _get("/docs-mcp/", **{"Accept-Encoding": "gzip"})
+    assert pagina.headers["content-encoding"] == "gzip"
+    # httpx descomprime: o corpo recebido é o HTML
+    assert pagina.text == docs_endpoints.renderizar_docs_html()
+    assert len(docs_endpoints.resposta_docs_html().variantes["gzip"]) < len(pagina.content)
+    assert gzip.decompress(docs_endpoints.resposta_docs_html().variantes["gzip"]) == pagina.content
+
+    revalidada = _get("/docs-mcp/", **{"If-None-Match": pagina.headers["etag"]})
+    assert revalidada.status_code == 304
+    assert revalidada.content == b""
+
+
+def test_json_por_categoria_tem_todas_as_tools():
+    resposta = _get("/docs-mcp/json")
+    assert resposta.status_code == 200
+    assert "etag" in resposta.headers
+    corpo = resposta.json()
+    nomes = [tool["name"] for tools in corpo["categorias"].values() for tool in tools]
+    assert corpo["total_tools"] == len(nomes)
+    assert sorted(nomes) == sorted(tool.name for tool in TOOLS_CATALOG)
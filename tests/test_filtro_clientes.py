@@ -0,0 +1,37 @@
+"""Recarga do CSV de clientes (src/api/mcp_filtro_clientes.py)"""
+
+import asyncio
+import os
+import time
+
+from src.api import mcp_filtro_clientes
+from src.api.mcp_filtro_clientes import ClienteFiltroCSV, obter_filtro
+
+
+def test_chamadas_concorrentes_carregam_o_csv_uma_vez(tmp_path, monkeypatch):
+    csv_path = tmp_path / "contatos.csv"
+    csv_path.write_text("ID;Nome;CNPJ / CPF;E-mail\n1;Ana;112.838.719-04;ana@x.com\n", encoding="latin-1")
+    monkeypatch.setattr(mcp_filtro_clientes, "_filtros", {})
+
+    cargas = []
+    carregar = ClienteFiltroCSV._carregar_csv
+
+    def contar(self):
+        cargas.append(self.csv_path)
+        time.sleep(0.05)  # carga lenta: as outras threads chegam durante ela
+        carregar(self)
+
+    monkeypatch.setattr(ClienteFiltroCSV, "_carregar_csv", contar)
+
+    async def concorrentes():
+        return await asyncio.gather(*(asyncio.to_thread(obter_filtro, str(csv_path)) for _ in range(8)))
+
+    filtros = asyncio.run(concorrentes())
+    assert len(cargas) == 1
+    assert all(filtro is filtros[0] for filtro in filtros)
+    assert filtros[0].buscar_por_cpf("11283871904")["nome"] == "Ana"
+
+    # CSV alterado no disco: a próxima chamada recarrega
+    os.utime(csv_path, (filtros[0].mtime + 10, filtros[0].mtime + 10))
+    assert obter_filtro(str(csv_path)) is not filtros[0]
+    assert len(cargas) == 2
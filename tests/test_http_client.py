@@ -0,0 +1,80 @@
+"""AsyncClient compartilhado do processo (src/services/tiny_client.py)"""
+
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from src.services import tiny_client
+from src.services.rate_limiter import TinyScheduler
+from src.services.resiliencia import Disjuntores
+from src.services.tiny_client import (
+    TinyAPIClient,
+    get_http_client,
+    shutdown_http_client,
+    startup_http_client,
+)
+
+
+@pytest.fixture
+def tiny_falsa(monkeypatch):
+    """Pool apontando para um transporte em memória; devolve as requisições recebidas"""
+    recebidas = []
+
+    def responder(request: httpx.Request) -> httpx.Response:
+        recebidas.append(request)
+        campos = parse_qs(request.content.decode())
+        return httpx.Response(200, json={"retorno": {"status": "OK", "pedido": {"id": campos["id"][0]}}})
+
+    pool = httpx.AsyncClient(transport=httpx.MockTransport(responder))
+    monkeypatch.setattr(tiny_client, "_http_client", pool)
+    monkeypatch.setattr(tiny_client, "scheduler", TinyScheduler())
+    monkeypatch.setattr(tiny_client, "disjuntores", Disjuntores())
+    yield pool, recebidas
+    asyncio.run(pool.aclose())
+
+
+def test_clientes_de_tenants_diferentes_usam_o_mesmo_pool(tiny_falsa):
+    pool, recebidas = tiny_falsa
+
+    async def cenario():
+        clientes = [TinyAPIClient(token=f"token-{i}") for i in range(3)]
+        return await asyncio.gather(*(client.obter_pedido(str(i)) for i, client in enumerate(clientes)))
+
+    resultados = asyncio.run(cenario())
+    assert get_http_client() is pool and not pool.is_closed
+    assert [r["retorno"]["pedido"]["id"] for r in resultados] == ["0", "1", "2"]
+    assert sorted(parse_qs(r.content.decode())["token"][0] for r in recebidas) == ["token-0", "token-1", "token-2"]
+    assert all(r.url.path.endswith("/pedido.obter.php") for r in recebidas)
+
+
+def test_campo_json_nao_e_escapado_duas_vezes(tiny_falsa):
+    _, recebidas = tiny_falsa
+    pedido = {"pedido": {"cliente": {"nome": "Ana & Cia"}}}
+
+    async def cenario():
+        await TinyAPIClient(token="token-x")._request("pedido.alterar", {"id": "1", "pedido": json.dumps(pedido)})
+
+    asyncio.run(cenario())
+    campos = parse_qs(recebidas[0].content.decode())
+    assert json.loads(campos["pedido"][0]) == pedido
+    assert campos["formato"] == ["JSON"]
+
+
+def test_ciclo_de_vida_do_pool(monkeypatch):
+    monkeypatch.setattr(tiny_client, "_http_client", None)
+
+    async def cenario():
+        await startup_http_client()
+        aberto = get_http_client()
+        assert get_http_client() is aberto
+        await shutdown_http_client()
+        assert aberto.is_closed and tiny_client._http_client is None
+        # Uso fora do lifespan (scripts): recriado sob demanda
+        novo = get_http_client()
+        assert novo is not aberto
+        await shutdown_http_client()
+
+    asyncio.run(cenario())
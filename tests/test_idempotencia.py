@@ -0,0 +1,143 @@
+"""Chaves de idempotência das escritas (src/services/idempotencia.py)"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.services.idempotencia import ConflitoIdempotencia, IdempotencyStore, _resultado_incerto
+
+TOKEN = "token-idem"
+ENDPOINT = "pedido.incluir"
+
+
+def _ok(status_registro="OK"):
+    return {"retorno": {
+        "status": "OK",
+        "registros": [{"registro": {"sequencia": "1", "status": status_registro, "id": "123"}}]
+    }}
+
+
+class Chamada:
+    """Escrita falsa: devolve (ou levanta) as respostas na ordem"""
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.chamadas = 0
+
+    async def __call__(self):
+        self.chamadas += 1
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, BaseException):
+            raise resposta
+        return resposta
+
+
+def _executar(store, chamada, data, chave="chave-1"):
+    return store.executar(TOKEN, ENDPOINT, data, chave, chamada)
+
+
+def test_repeticao_devolve_o_resultado_sem_chamar_a_tiny():
+    async def cenario():
+        store = IdempotencyStore()
+        chamada = Chamada(_ok())
+        primeiro = await _executar(store, chamada, {"pedido": "a"})
+        segundo = await _executar(store, chamada, {"pedido": "a"})
+        assert chamada.chamadas == 1
+        assert "replay_idempotente" not in primeiro
+        assert segundo["replay_idempotente"] is True
+        assert segundo["retorno"] == primeiro["retorno"]
+
+    asyncio.run(cenario())
+
+
+def test_repeticoes_concorrentes_aguardam_a_primeira():
+    async def cenario():
+        store = IdempotencyStore()
+        liberar = asyncio.Event()
+
+        async def lenta():
+            await liberar.wait()
+            return _ok()
+
+        tarefas = [asyncio.create_task(_executar(store, lenta, {"pedido": "a"})) for _ in range(3)]
+        await asyncio.sleep(0)
+        liberar.set()
+        resultados = await asyncio.gather(*tarefas)
+        assert [r.get("replay_idempotente", False) for r in resultados] == [False, True, True]
+        assert store.executadas == 1
+
+    asyncio.run(cenario())
+
+
+def test_mesma_chave_com_outro_payload_e_conflito():
+    async def cenario():
+        store = IdempotencyStore()
+        await _executar(store, Chamada(_ok()), {"pedido": "a"})
+        with pytest.raises(ConflitoIdempotencia, match="outro conteúdo"):
+            await _executar(store, Chamada(_ok()), {"pedido": "b"})
+        assert store.conflitos == 1
+
+    asyncio.run(cenario())
+
+
+@pytest.mark.parametrize("recusa", [
+    _ok(status_registro="Erro"),
+    {"retorno": {"status": "OK", "registros": {"registro": {"status": "Erro", "erros": [{"erro": "CPF inválido"}]}}}},
+    {"retorno": {"status": "Erro", "codigo_erro": "31", "erros": [{"erro": "dados inválidos"}]}},
+])
+def test_recusa_da_tiny_libera_a_chave(recusa):
+    async def cenario():
+        store = IdempotencyStore()
+        chamada = Chamada(recusa, _ok())
+        assert (await _executar(store, chamada, {"pedido": "a"})) == recusa
+        segundo = await _executar(store, chamada, {"pedido": "a"})
+        assert chamada.chamadas == 2
+        assert "replay_idempotente" not in segundo
+
+    asyncio.run(cenario())
+
+
+def test_falha_incerta_bloqueia_a_repeticao():
+    async def cenario():
+        store = IdempotencyStore()
+        chamada = Chamada(httpx.ReadTimeout("sem resposta"), _ok())
+        with pytest.raises(httpx.ReadTimeout):
+            await _executar(store, chamada, {"pedido": "a"})
+        with pytest.raises(ConflitoIdempotencia, match="sem confirmação"):
+            await _executar(store, chamada, {"pedido": "a"})
+        assert chamada.chamadas == 1
+
+    asyncio.run(cenario())
+
+
+def test_falha_antes_do_envio_libera_a_chave():
+    async def cenario():
+        store = IdempotencyStore()
+        chamada = Chamada(httpx.ConnectError("recusada"), _ok())
+        with pytest.raises(httpx.ConnectError):
+            await _executar(store, chamada, {"pedido": "a"})
+        assert (await _executar(store, chamada, {"pedido": "a"})) == _ok()
+        assert chamada.chamadas == 2
+
+    asyncio.run(cenario())
+
+
+def _status(codigo):
+    request = httpx.Request("POST", "https://api.tiny.com.br/api2/pedido.incluir.php")
+    return httpx.HTTPStatusError("erro", request=request, response=httpx.Response(codigo, request=request))
+
+
+@pytest.mark.parametrize("erro, incerto", [
+    (httpx.ConnectError("x"), False),
+    (httpx.ConnectTimeout("x"), False),
+    (httpx.PoolTimeout("x"), False),
+    (httpx.ReadTimeout("x"), True),
+    (httpx.ReadError("x"), True),
+    (httpx.RemoteProtocolError("x"), True),
+    (_status(502), True),
+    (_status(400), False),
+    (asyncio.CancelledError(), False),
+])
+def test_resultado_incerto(erro, incerto):
+    assert _resultado_incerto(erro) is incerto
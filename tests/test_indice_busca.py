@@ -0,0 +1,112 @@
+"""Índice de busca aproximada (src/services/indice_busca.py)"""
+
+import pytest
+
+from src.services import indice_busca
+from src.services.indice_busca import IndiceTexto, dobrar, trigramas
+
+PRODUTOS = {
+    "1": {"nome": "Camiseta Básica Algodão", "codigo": "CAM-001"},
+    "2": {"nome": "Camisa Social", "codigo": "CAM-002"},
+    "3": {"nome": "Calça Jeans", "codigo": "CAL-001"},
+    "4": {"nome": "Cama Box Casal", "codigo": "CMB-010"},
+    "5": {"nome": "Caneca Térmica", "codigo": "CAN-005"},
+}
+
+
+@pytest.fixture
+def indice():
+    indice = IndiceTexto({"nome": 3.0, "codigo": 2.0}, campos_compactos={"codigo"})
+    for id_registro, registro in PRODUTOS.items():
+        indice.adicionar(id_registro, registro)
+    return indice
+
+
+def _ids(resultado):
+    return [id_registro for id_registro, _ in resultado]
+
+
+def test_dobrar_e_trigramas():
+    assert dobrar("Calçado Único-12") == "calcado unico 12"
+    assert trigramas("cam") == {"  c", " ca", "cam", "am "}
+
+
+def test_exato_vem_antes_de_prefixo_e_prefixo_antes_de_aproximado():
+    indice = IndiceTexto({"nome": 1.0})
+    indice.adicionar("aproximado", {"nome": "cadera"})
+    indice.adicionar("prefixo", {"nome": "cadeiras"})
+    indice.adicionar("exato", {"nome": "cadeira"})
+    assert _ids(indice.buscar("cadeira")) == ["exato", "prefixo", "aproximado"]
+
+
+def test_prefixo(indice):
+    assert set(_ids(indice.buscar("camis"))) == {"1", "2"}
+
+
+def test_sem_acentos_e_sem_maiusculas(indice):
+    assert _ids(indice.buscar("CALCA")) == ["3"]
+    assert _ids(indice.buscar("termica")) == ["5"]
+
+
+def test_erro_de_digitacao_casa_por_trigramas(indice):
+    assert _ids(indice.buscar("camizeta"))[0] == "1"
+    assert _ids(indice.buscar("algodao basica")) == ["1"]
+
+
+def test_codigo_compacto_e_separado(indice):
+    assert _ids(indice.buscar("cam001"))[0] == "1"
+    assert "1" in _ids(indice.buscar("CAM-001"))
+
+
+def test_mais_palavras_casadas_vem_antes(indice):
+    resultado = _ids(indice.buscar("camisa social algodao"))
+    assert resultado[0] == "2"
+    # Registros com menos da metade das palavras ficam de fora
+    assert "4" not in resultado
+
+
+def test_reindexar_e_remover(indice):
+    indice.adicionar("5", {"nome": "Garrafa Térmica", "codigo": "GAR-005"})
+    assert _ids(indice.buscar("caneca")) == []
+    assert _ids(indice.buscar("garrafa")) == ["5"]
+    indice.remover("5")
+    assert _ids(indice.buscar("termica")) == []
+    assert indice.estatisticas()["registros"] == 4
+
+
+# =============================================================================
+# Custo de palavras curtas
+# =============================================================================
+
+def _indice_grande(quantidade):
+    indice = IndiceTexto({"nome": 1.0})
+    for i in range(quantidade):
+        indice.adicionar(str(i), {"nome": f"a{i:05d} produto"})
+    return indice
+
+
+def test_palavra_de_uma_letra_nao_expande_por_prefixo():
+    indice = _indice_grande(2000)
+    # Sem o limite, "a" casaria os 2000 termos "a00000".."a01999"
+    assert indice._expandir("a") == {}
+    assert indice.buscar("a") == []
+
+
+def test_expansao_por_prefixo_e_limitada():
+    indice = _indice_grande(2000)
+    assert len(indice._expandir("a0")) == indice_busca.CANDIDATOS_PREFIXO
+    assert indice._com_prefixo("a01", limite=3) == ["a01000", "a01001", "a01002"]
+
+    # "produto" casa todos; os que também casam "a0" (dentro do limite) vêm primeiro
+    resultado = _ids(indice.buscar("a0 produto"))
+    primeiros = {f"{i}" for i in range(indice_busca.CANDIDATOS_PREFIXO)}
+    assert set(resultado[:indice_busca.CANDIDATOS_PREFIXO]) == primeiros
+
+
+def test_prefixo_exato_continua_encontrando_o_termo_curto():
+    indice = IndiceTexto({"nome": 1.0})
+    indice.adicionar("1", {"nome": "kit x"})
+    indice.adicionar("2", {"nome": "kit xadrez"})
+    # "x" tem uma letra: casa só o termo exato
+    assert _ids(indice.buscar("x")) == ["1"]
+    assert set(_ids(indice.buscar("xa"))) == {"2"}
@@ -0,0 +1,73 @@
+"""Codec JSON e serialização das respostas JSON-RPC"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.api import mcp_server
+from src.api.catalogo import FragmentoJSON, resultado_tools_list
+from src.api.mcp_server import MCPSession, _serializar_jsonrpc, handle_jsonrpc_request
+from src.services import json_codec
+
+
+@pytest.fixture(params=["orjson", "json"])
+def codec(request, monkeypatch):
+    """Roda o teste com o orjson (se instalado) e com o fallback da stdlib"""
+    if request.param == "orjson":
+        if json_codec.orjson is None:
+            pytest.skip("orjson não instalado")
+    else:
+        monkeypatch.setattr(json_codec, "orjson", None)
+    return json_codec
+
+
+def test_compacto_e_utf8(codec):
+    assert codec.dumps({"nome": "Calça", "itens": [1, 2]}) == '{"nome":"Calça","itens":[1,2]}'.encode("utf-8")
+    assert codec.dumps_str({"a": 1}, indentar=True) == '{\n  "a": 1\n}'
+    assert codec.loads(codec.dumps({"x": "ção"})) == {"x": "ção"}
+
+
+def test_inteiro_fora_do_orjson_cai_para_stdlib(codec):
+    assert codec.loads(codec.dumps({"n": 2 ** 70})) == {"n": 2 ** 70}
+
+
+def _chamar_tool(monkeypatch, compacto):
+    async def executar(client, tool_name, arguments):
+        return {"pedido": {"id": "1", "cliente": "Ana"}}
+
+    monkeypatch.setattr(mcp_server, "execute_tiny_tool", executar)
+    monkeypatch.setattr(mcp_server, "MCP_JSON_COMPACTO", compacto)
+    mensagem = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                "params": {"name": "tiny_pedido_obter", "arguments": {"id": "1"}}}
+    resposta = asyncio.run(handle_jsonrpc_request(mensagem, MCPSession("s1")))
+    return resposta["result"]["content"][0]["text"]
+
+
+def test_resultado_de_tool_compacto_ou_indentado(monkeypatch):
+    compacto = _chamar_tool(monkeypatch, True)
+    indentado = _chamar_tool(monkeypatch, False)
+    assert compacto == '{"pedido":{"id":"1","cliente":"Ana"}}'
+    assert "\n  " in indentado
+    assert json.loads(indentado) == json.loads(compacto)
+
+
+def test_fragmento_pre_serializado_entra_como_esta():
+    fragmento = resultado_tools_list()
+    assert isinstance(fragmento, FragmentoJSON)
+    corpo = _serializar_jsonrpc({"jsonrpc": "2.0", "id": 7, "result": fragmento})
+    assert corpo.endswith(b',"result":' + fragmento + b"}")
+    mensagem = json.loads(corpo)
+    assert mensagem["id"] == 7 and mensagem["result"] == json.loads(fragmento)
+
+
+def test_batch_mistura_fragmentos_e_mensagens_comuns():
+    fragmento = FragmentoJSON(b'{"tools":[]}')
+    corpo = _serializar_jsonrpc([
+        {"jsonrpc": "2.0", "id": 1, "result": fragmento},
+        {"jsonrpc": "2.0", "id": 2, "error": {"code": -32601, "message": "Method not found: x"}},
+    ])
+    assert json.loads(corpo) == [
+        {"jsonrpc": "2.0", "id": 1, "result": {"tools": []}},
+        {"jsonrpc": "2.0", "id": 2, "error": {"code": -32601, "message": "Method not found: x"}},
+    ]
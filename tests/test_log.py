@@ -0,0 +1,76 @@
+"""Logging estruturado e redação de segredos (src/services/log.py)"""
+
+import io
+import json
+import logging
+
+import pytest
+
+from src.services import log as log_module
+from src.services.log import configurar_logging, get_logger, parar_logging, redigir
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("token=abc123&formato=JSON", "token=***&formato=JSON"),
+    ('{"token": "abc", "id": 1}', '{"token": "***", "id": 1}'),
+    ('{"tiny_token":"abc"}', '{"tiny_token":"***"}'),
+    ("Authorization: Bearer eyJhbGciOi.x-y_z=", "Authorization: Bearer ***"),
+    ("pedido 123 sem segredo", "pedido 123 sem segredo"),
+])
+def test_redigir(texto, esperado):
+    assert redigir(texto) == esperado
+
+
+@pytest.fixture
+def saida():
+    """Eventos JSON emitidos pelo pipeline real (filtros + fila + listener)"""
+    configurar_logging(nivel="DEBUG", formato="json", amostragem_debug=1)
+    buffer = io.StringIO()
+    log_module._listener.handlers[0].setStream(buffer)
+
+    def eventos():
+        parar_logging()
+        return [json.loads(linha) for linha in buffer.getvalue().splitlines()]
+
+    yield eventos
+    configurar_logging()
+
+
+def test_mensagem_argumentos_e_extra_sao_redigidos(saida):
+    logger = get_logger("teste")
+    logger.debug(
+        "Payload %s: %.300s", "pedido.obter", "token=segredo123&id=7",
+        extra={"endpoint": "pedido.obter", "tiny_token": "segredo123", "url": "https://x/?token=segredo123"}
+    )
+    evento, = saida()
+    assert "segredo123" not in json.dumps(evento)
+    assert evento["msg"] == "Payload pedido.obter: token=***&id=7"
+    assert evento["tiny_token"] == "***"
+    assert evento["url"] == "https://x/?token=***"
+    assert evento["endpoint"] == "pedido.obter"
+    assert evento["nivel"] == "DEBUG" and evento["logger"] == "mcp_tiny.teste"
+
+
+def test_traceback_tambem_e_redigido(saida):
+    logger = get_logger("teste")
+    try:
+        raise ValueError("falhou com token=segredo123")
+    except ValueError:
+        logger.warning("Erro", exc_info=True)
+    evento, = saida()
+    assert "ValueError" in evento["msg"]
+    assert "segredo123" not in evento["msg"]
+
+
+def test_nivel_desabilitado_nao_formata_argumentos():
+    class Caro:
+        def __str__(self):
+            raise AssertionError("formatado com DEBUG desligado")
+
+    configurar_logging(nivel="INFO", formato="json")
+    try:
+        logger = get_logger("teste")
+        assert not logger.isEnabledFor(logging.DEBUG)
+        logger.debug("valor %s", Caro())
+    finally:
+        configurar_logging()
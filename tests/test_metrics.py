@@ -0,0 +1,52 @@
+"""Métricas no formato do Prometheus (src/services/metrics.py)"""
+
+import pytest
+
+from src.services.metrics import RegistroMetricas, _Metrica
+
+
+def test_metrica_sem_renderizar_nao_instancia():
+    class Incompleta(_Metrica):
+        pass
+
+    with pytest.raises(TypeError):
+        Incompleta("x", "y")
+
+
+def test_counter_lido_de_funcao_e_exposto_como_counter():
+    registro = RegistroMetricas()
+    total = {"hits": 3}
+    registro.counter("cache_hits_total", "Hits", funcao=lambda: total["hits"])
+    total["hits"] = 5
+    assert registro.renderizar().splitlines() == [
+        "# HELP cache_hits_total Hits",
+        "# TYPE cache_hits_total counter",
+        "cache_hits_total 5",
+    ]
+
+
+def test_counter_histogram_e_labels():
+    registro = RegistroMetricas()
+    chamadas = registro.counter("chamadas_total", "Chamadas", ("endpoint",))
+    chamadas.inc('a"b')
+    chamadas.inc('a"b', valor=2)
+    latencia = registro.histogram("latencia_seconds", "Latência", ("endpoint",), buckets=(0.1, 1))
+    latencia.observe(0.05, "x")
+    latencia.observe(0.5, "x")
+
+    linhas = registro.renderizar().splitlines()
+    assert 'chamadas_total{endpoint="a\\"b"} 3' in linhas
+    assert 'latencia_seconds_bucket{endpoint="x",le="0.1"} 1' in linhas
+    assert 'latencia_seconds_bucket{endpoint="x",le="+Inf"} 2' in linhas
+    assert 'latencia_seconds_count{endpoint="x"} 2' in linhas
+    with pytest.raises(ValueError):
+        registro.counter("chamadas_total", "Duplicada")
+
+
+def test_metrics_expoe_hits_e_misses_do_cache_como_counters():
+    from src.main import metricas
+
+    texto = metricas.renderizar()
+    assert "# TYPE tiny_cache_hits_total counter" in texto
+    assert "# TYPE tiny_cache_misses_total counter" in texto
+    assert "tiny_cache_hits " not in texto
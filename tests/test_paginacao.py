@@ -0,0 +1,86 @@
+"""Pré-busca de páginas (TinyAPIClient.iterar_paginas)"""
+
+import asyncio
+
+import pytest
+
+from src.services import tiny_client
+from src.services.tiny_client import TinyAPIClient
+
+TOTAL_PAGINAS = 10
+
+
+class PesquisaFalsa:
+    """pesquisar_pedidos com páginas lentas; registra o que terminou ou foi cancelado"""
+
+    def __init__(self, falhar_em=None):
+        self.falhar_em = falhar_em
+        self.iniciadas = []
+        self.concluidas = []
+        self.canceladas = []
+
+    async def __call__(self, pagina, **filtros):
+        self.iniciadas.append(pagina)
+        try:
+            await asyncio.sleep(0.01 * pagina)
+        except asyncio.CancelledError:
+            self.canceladas.append(pagina)
+            raise
+        if pagina == self.falhar_em:
+            raise RuntimeError(f"falha na página {pagina}")
+        self.concluidas.append(pagina)
+        return {"retorno": {"status": "OK", "numero_paginas": TOTAL_PAGINAS, "pedidos": [{"pagina": pagina}]}}
+
+
+@pytest.fixture
+def concorrencia(monkeypatch):
+    monkeypatch.setattr(tiny_client, "TINY_PAGINAS_CONCORRENTES", 3)
+
+
+def _cliente(pesquisa):
+    client = TinyAPIClient(token="token-paginas")
+    client.pesquisar_pedidos = pesquisa
+    return client
+
+
+def test_paginas_saem_em_ordem(concorrencia):
+    pesquisa = PesquisaFalsa()
+
+    async def cenario():
+        return [p["retorno"]["pedidos"][0]["pagina"] async for p in _cliente(pesquisa).iterar_paginas("pesquisar_pedidos")]
+
+    assert asyncio.run(cenario()) == list(range(1, TOTAL_PAGINAS + 1))
+
+
+def test_interromper_cancela_e_aguarda_as_pre_buscas(concorrencia):
+    pesquisa = PesquisaFalsa()
+
+    async def cenario():
+        paginas = _cliente(pesquisa).iterar_paginas("pesquisar_pedidos")
+        async for pagina in paginas:
+            if pagina["retorno"]["pedidos"][0]["pagina"] == 2:
+                break
+        await paginas.aclose()
+        # Ao fechar o gerador nenhuma pré-busca pode continuar pendente
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(cenario()) == []
+    assert pesquisa.concluidas == [1, 2]
+    assert pesquisa.canceladas == [p for p in pesquisa.iniciadas if p > 2]
+    assert pesquisa.canceladas
+
+
+def test_erro_no_meio_propaga_e_cancela_as_demais(concorrencia):
+    pesquisa = PesquisaFalsa(falhar_em=3)
+    recebidas = []
+
+    async def cenario():
+        with pytest.raises(RuntimeError, match="página 3"):
+            async for pagina in _cliente(pesquisa).iterar_paginas("pesquisar_pedidos"):
+                recebidas.append(pagina["retorno"]["pedidos"][0]["pagina"])
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(cenario()) == []
+    assert recebidas == [1, 2]
+    assert pesquisa.concluidas == [1, 2]
+    assert pesquisa.canceladas == [p for p in pesquisa.iniciadas if p > 3]
@@ -0,0 +1,80 @@
+"""Base dos serviços por tenant (src/services/por_tenant.py)"""
+
+import asyncio
+import time
+
+from src.services.espelho import Espelho
+from src.services.por_tenant import EstadoTenant, ServicoPorTenant
+from src.services.snapshot_estoque import SnapshotEstoque
+from src.services.tiny_endpoints import chave_token
+
+
+class ServicoFalso(ServicoPorTenant[EstadoTenant]):
+    def __init__(self, **kwargs):
+        super().__init__(**{"intervalo": 0.01, "inatividade": 60, "max_tenants": 2, "concorrencia": 1, **kwargs})
+        self.rodadas = []
+
+    def _novo_tenant(self, token):
+        return EstadoTenant(token)
+
+    async def _atualizar(self, tenant):
+        async with self._semaforo:
+            self.rodadas.append(tenant.token)
+            await asyncio.sleep(0.005)
+
+
+def test_espelho_e_snapshot_compartilham_a_base():
+    assert issubclass(Espelho, ServicoPorTenant)
+    assert issubclass(SnapshotEstoque, ServicoPorTenant)
+
+
+def test_registrar_agenda_a_primeira_rodada_e_despeja_o_menos_recente():
+    async def cenario():
+        servico = ServicoFalso()
+        primeiro = servico.registrar("a")
+        servico.registrar("b")
+        servico.registrar("a")  # "a" volta a ser o mais recente
+        servico.registrar("c")
+        await asyncio.sleep(0.05)
+        return servico, primeiro
+
+    servico, primeiro = asyncio.run(cenario())
+    assert list(servico._tenants) == [chave_token("a"), chave_token("c")]
+    assert primeiro.ultima_tentativa is not None
+    # "b" foi despejado (e cancelado) antes de rodar; registrar de novo não reagenda "a"
+    assert sorted(servico.rodadas) == ["a", "c"]
+
+
+def test_loop_reagenda_e_descarta_tenants_inativos():
+    async def cenario():
+        servico = ServicoFalso(inatividade=0.05)
+        await servico.iniciar()
+        servico.registrar("a")
+        await asyncio.sleep(0.03)
+        rodadas_ativo = servico.rodadas.count("a")
+        servico._tenants[chave_token("a")].ultimo_uso = time.monotonic() - 1
+        await asyncio.sleep(0.03)
+        await servico.parar()
+        return servico, rodadas_ativo
+
+    servico, rodadas_ativo = asyncio.run(cenario())
+    assert rodadas_ativo >= 2
+    assert len(servico) == 0
+    assert servico._loop is None
+
+
+def test_parar_cancela_as_atualizacoes_em_andamento():
+    class Lento(ServicoFalso):
+        async def _atualizar(self, tenant):
+            await asyncio.sleep(60)
+
+    async def cenario():
+        servico = Lento()
+        await servico.iniciar()
+        tenant = servico.registrar("a")
+        await asyncio.sleep(0)
+        await servico.parar()
+        return tenant
+
+    tenant = asyncio.run(cenario())
+    assert tenant.tarefa.cancelled()
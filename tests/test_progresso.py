@@ -0,0 +1,135 @@
+"""Progresso em SSE no POST /mcp (src/api/mcp_server.py)"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import mcp_server
+from src.api.mcp_server import MCPSession, handle_jsonrpc_request
+from src.services.jwt_cache import CacheJWT
+from src.services.session_store import SessionStore
+from src.services.tiny_client import TinyAPIClient
+
+
+def _jwt(tenant_id):
+    def parte(dados):
+        return base64.urlsafe_b64encode(json.dumps(dados).encode()).rstrip(b"=").decode()
+    claims = {"tenant_id": tenant_id, "tiny_token": f"tk-{tenant_id}"}
+    return f"{parte({'alg': 'none'})}.{parte(claims)}.x"
+
+
+def _chamada_lote(itens, meta=None):
+    params = {"name": "tiny_produto_atualizar_estoque_lote", "arguments": {"itens": itens}}
+    if meta is not None:
+        params["_meta"] = meta
+    return {"jsonrpc": "2.0", "id": 7, "method": "tools/call", "params": params}
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    store = SessionStore(serializar=MCPSession.para_dict, desserializar=MCPSession.de_dict)
+    monkeypatch.setattr(mcp_server, "sessions", store)
+    monkeypatch.setattr(mcp_server, "JWT_SECRET", "")
+    monkeypatch.setattr(mcp_server, "jwt_cache", CacheJWT())
+    monkeypatch.setattr(mcp_server, "MCP_PROGRESSO_INTERVALO", 0)
+
+    async def atualizar(self, produto_id, estoque):
+        await asyncio.sleep(0)
+        return {"retorno": {"status": "OK", "registros": [{"registro": {"id": produto_id, "status": "OK"}}]}}
+
+    monkeypatch.setattr(TinyAPIClient, "atualizar_estoque_produto", atualizar)
+    app = FastAPI()
+    app.include_router(mcp_server.router)
+    return app
+
+
+def _post(app, corpo, accept):
+    headers = {"Authorization": f"Bearer {_jwt('t1')}", "Accept": accept}
+
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            return await cliente.post("/mcp", json=corpo, headers=headers)
+
+    return asyncio.run(enviar())
+
+
+def _eventos(resposta):
+    eventos = []
+    for bloco in resposta.text.split("\n\n"):
+        if bloco.strip():
+            assert bloco.startswith("event: message\ndata: ")
+            eventos.append(json.loads(bloco.split("data: ", 1)[1]))
+    return eventos
+
+
+def test_progresso_e_resposta_no_mesmo_stream(servidor):
+    itens = [{"id": str(i), "estoque": i} for i in range(3)]
+    resposta = _post(servidor, _chamada_lote(itens, {"progressToken": "p1"}), "application/json, text/event-stream")
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/event-stream")
+    *notificacoes, final = _eventos(resposta)
+    assert [n["params"]["progress"] for n in notificacoes] == [1, 2, 3]
+    assert {n["params"]["progressToken"] for n in notificacoes} == {"p1"}
+    assert all(n["method"] == "notifications/progress" for n in notificacoes)
+    assert final["id"] == 7 and "result" in final
+
+
+def test_sem_accept_sse_responde_json(servidor):
+    resposta = _post(servidor, _chamada_lote([{"id": "1", "estoque": 1}], {"progressToken": "p1"}), "application/json")
+    assert resposta.headers["content-type"].startswith("application/json")
+    assert resposta.json()["id"] == 7
+
+
+@pytest.mark.parametrize("params", [["tiny_produto_atualizar_estoque_lote"], "x", 3])
+def test_params_que_nao_sao_objeto_respondem_32602(servidor, params):
+    corpo = {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": params}
+    resposta = _post(servidor, corpo, "application/json, text/event-stream")
+    assert resposta.status_code == 200
+    assert resposta.json()["error"]["code"] == -32602
+
+
+@pytest.mark.parametrize("meta", [["p1"], "p1"])
+def test_meta_que_nao_e_objeto_e_ignorado(servidor, meta):
+    resposta = _post(servidor, _chamada_lote([{"id": "1", "estoque": 1}], meta), "application/json, text/event-stream")
+    assert resposta.status_code == 200
+    assert resposta.json()["id"] == 7
+
+
+def test_desconexao_cancela_a_chamada(monkeypatch):
+    estado = {}
+
+    async def ferramenta(client, tool_name, arguments):
+        mcp_server._progresso.get()(1, 2)
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            estado["cancelada"] = True
+            raise
+
+    monkeypatch.setattr(mcp_server, "execute_tiny_tool", ferramenta)
+    monkeypatch.setattr(mcp_server, "MCP_PROGRESSO_INTERVALO", 0)
+
+    async def cenario():
+        session = MCPSession("s1")
+        stream = mcp_server._stream_com_progresso(_chamada_lote([], {"progressToken": "p"}), session, False)
+        primeiro = json.loads((await stream.__anext__()).split(b"data: ", 1)[1])
+        assert primeiro["params"]["progress"] == 1
+        # Cliente foi embora: o StreamingResponse fecha o gerador
+        await stream.aclose()
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    asyncio.run(cenario())
+    assert estado == {"cancelada": True}
+
+
+def test_handle_jsonrpc_request_recusa_arguments_que_nao_sao_objeto():
+    corpo = {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {"name": "x", "arguments": [1]}}
+    resposta = asyncio.run(handle_jsonrpc_request(corpo, MCPSession("s1")))
+    assert resposta["error"]["code"] == -32602
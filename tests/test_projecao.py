@@ -0,0 +1,100 @@
+"""Projeção de respostas com campos / visao (src/services/projecao.py)"""
+
+import asyncio
+import copy
+
+import pytest
+
+from src.api import mcp_server
+from src.services.projecao import compilar_campos, projetar, validar_visao
+from src.services.tiny_client import TinyAPIClient
+
+PEDIDO = {"retorno": {
+    "status_processamento": "3",
+    "status": "OK",
+    "pedido": {
+        "id": "1",
+        "numero": "100",
+        "situacao": "Aberto",
+        "obs": "",
+        "cliente": {"nome": "Ana", "cpf_cnpj": "112.838.719-04", "fone": ""},
+        "itens": [
+            {"item": {"codigo": "A", "descricao": "Caneta", "valor_unitario": "2.50"}},
+            {"item": {"codigo": "B", "descricao": "Lápis", "valor_unitario": "1.00"}},
+        ],
+    },
+}}
+
+PESQUISA = {"retorno": {
+    "status": "OK",
+    "pagina": 1,
+    "numero_paginas": 3,
+    "pedidos": [
+        {"pedido": {"id": "1", "numero": "100", "situacao": "Aberto", "valor": "10", "vendedor": ""}},
+        {"pedido": {"id": "2", "numero": "101", "situacao": "Faturado", "valor": "20", "vendedor": "Bia"}},
+    ],
+}}
+
+
+def test_compilar_campos_aceita_lista_ou_texto_e_prefixo_vence():
+    assert compilar_campos("numero, cliente.nome") == {"numero": None, "cliente": {"nome": None}}
+    assert compilar_campos(["cliente", "cliente.nome"]) == {"cliente": None}
+
+
+def test_campos_com_ponto_atravessam_objetos_e_listas():
+    projetado = projetar(PEDIDO, ["numero", "cliente.nome", "itens.item.descricao", "inexistente"])
+    assert projetado["retorno"]["pedido"] == {
+        "numero": "100",
+        "cliente": {"nome": "Ana"},
+        "itens": [{"item": {"descricao": "Caneta"}}, {"item": {"descricao": "Lápis"}}],
+    }
+    assert projetado["retorno"]["status"] == "OK"
+
+
+def test_campos_em_pesquisa_mantem_metadados_de_paginacao():
+    projetado = projetar(PESQUISA, "numero")
+    assert projetado["retorno"]["pedidos"] == [{"pedido": {"numero": "100"}}, {"pedido": {"numero": "101"}}]
+    assert projetado["retorno"]["numero_paginas"] == 3
+
+
+def test_visao_resumo_e_sem_vazios():
+    resumo = projetar(PEDIDO, visao="resumo")["retorno"]["pedido"]
+    assert resumo == {"id": "1", "numero": "100", "situacao": "Aberto", "cliente": {"nome": "Ana"}}
+
+    sem_vazios = projetar(PESQUISA, visao="sem_vazios")["retorno"]["pedidos"]
+    assert "vendedor" not in sem_vazios[0]["pedido"]
+    assert sem_vazios[1]["pedido"]["vendedor"] == "Bia"
+
+
+def test_completo_sem_campos_devolve_o_mesmo_objeto_e_nunca_altera_o_original():
+    assert projetar(PEDIDO) is PEDIDO
+    original = copy.deepcopy(PEDIDO)
+    projetar(PEDIDO, ["numero"], "sem_vazios")
+    assert PEDIDO == original
+
+
+def test_erro_da_tiny_passa_intacto():
+    erro = {"retorno": {"status": "Erro", "codigo_erro": "20", "erros": [{"erro": "sem registros"}]}}
+    assert projetar(erro, ["numero"]) == erro
+
+
+def test_visao_invalida():
+    assert validar_visao(None) == "completo"
+    with pytest.raises(ValueError, match="visao inválida"):
+        validar_visao("detalhado")
+
+
+def test_tool_de_leitura_projeta_antes_de_serializar(monkeypatch):
+    recebidos = []
+
+    async def obter_pedido(self, pedido_id):
+        recebidos.append(pedido_id)
+        return copy.deepcopy(PEDIDO)
+
+    monkeypatch.setattr(TinyAPIClient, "obter_pedido", obter_pedido)
+    client = TinyAPIClient(token="token-projecao")
+    resultado = asyncio.run(mcp_server.execute_tiny_tool(
+        client, "tiny_pedido_obter", {"id": "1", "campos": ["numero"], "visao": "sem_vazios"}
+    ))
+    assert recebidos == ["1"]
+    assert resultado["retorno"]["pedido"] == {"numero": "100"}
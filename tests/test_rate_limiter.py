@@ -0,0 +1,93 @@
+"""TinyScheduler e filas por tenant (src/services/rate_limiter.py)"""
+
+import asyncio
+
+from src.services.rate_limiter import TinyScheduler, TokenBucket
+from src.services.tiny_endpoints import chave_token
+
+
+def test_varredura_descarta_so_tenants_ociosos():
+    async def cenario():
+        # 6000/min = 100 tokens/s: o bucket de burst 1 se recompõe em 10ms
+        scheduler = TinyScheduler(por_minuto=6000, burst=1, varredura=0)
+        for i in range(50):
+            await scheduler.adquirir(f"token-{i}", prioridade=1)
+        assert len(scheduler.tenants) == 50
+
+        await asyncio.sleep(0.05)
+        # Tenant com fila: o bucket está vazio e a espera não pode se perder
+        await scheduler.adquirir("ocupado", prioridade=1)
+        espera = asyncio.create_task(scheduler.adquirir("ocupado", prioridade=1))
+        await asyncio.sleep(0)
+
+        assert list(scheduler.tenants) == [chave_token("ocupado")]
+        assert scheduler.tenants_descartados == 50
+        await espera
+        assert scheduler.estatisticas()["fila_total"] == 0
+
+    asyncio.run(cenario())
+
+
+async def _ordem_de_atendimento(scheduler, pedidos):
+    """Enfileira (rotulo, prioridade, sessao) com o bucket vazio e devolve a ordem de liberação"""
+    await scheduler.adquirir("token", prioridade=1)  # consome o único token
+    ordem = []
+
+    async def pedir(rotulo, prioridade, sessao):
+        await scheduler.adquirir("token", prioridade, sessao)
+        ordem.append(rotulo)
+
+    tarefas = [asyncio.create_task(pedir(*pedido)) for pedido in pedidos]
+    await asyncio.sleep(0)
+    return tarefas, ordem
+
+
+def test_escrita_passa_na_frente_e_sessoes_alternam():
+    async def cenario():
+        scheduler = TinyScheduler(por_minuto=6000, burst=1)
+        tarefas, ordem = await _ordem_de_atendimento(scheduler, [
+            ("a1", 1, "varredura"), ("a2", 1, "varredura"), ("a3", 1, "varredura"),
+            ("b1", 1, "agente"), ("b2", 1, "agente"),
+            ("escrita", 0, "agente"),
+        ])
+        await asyncio.gather(*tarefas)
+        return ordem
+
+    assert asyncio.run(cenario()) == ["escrita", "a1", "b1", "a2", "b2", "a3"]
+
+
+def test_espera_cancelada_nao_consome_token():
+    async def cenario():
+        scheduler = TinyScheduler(por_minuto=6000, burst=1)
+        tarefas, ordem = await _ordem_de_atendimento(scheduler, [("a", 1, "s1"), ("b", 1, "s2")])
+        tarefas[0].cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        fila = scheduler.tenants[chave_token("token")]
+        return ordem, fila
+
+    ordem, fila = asyncio.run(cenario())
+    assert ordem == ["b"]
+    assert fila.pendentes == 0
+    assert fila.atendidas == 2
+
+
+def test_ritmo_respeita_a_taxa_depois_do_burst():
+    async def cenario():
+        # 600/min = 10 tokens/s, burst 2: a 5ª chamada sai ~0.3s depois da 1ª
+        scheduler = TinyScheduler(por_minuto=600, burst=2)
+        esperas = await asyncio.gather(*(scheduler.adquirir("token", prioridade=1) for _ in range(5)))
+        return esperas
+
+    esperas = asyncio.run(cenario())
+    assert esperas[:2] == [0.0, 0.0]
+    assert 0.25 <= max(esperas) < 0.6
+
+
+def test_token_bucket_devolve_sem_passar_da_capacidade():
+    bucket = TokenBucket(taxa=1.0, capacidade=2)
+    assert bucket.tentar_consumir() and bucket.tentar_consumir()
+    assert not bucket.tentar_consumir()
+    bucket.devolver()
+    bucket.devolver()
+    bucket.devolver()
+    assert bucket.tokens <= 2 and bucket.cheio()
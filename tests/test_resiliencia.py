@@ -0,0 +1,136 @@
+"""Circuit breaker e retry do TinyAPIClient (src/services/resiliencia.py)"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.services import tiny_client
+from src.services.resiliencia import (
+    ABERTO,
+    FECHADO,
+    MEIO_ABERTO,
+    CircuitBreaker,
+    CircuitoAbertoError,
+    Disjuntores,
+    motivo_retry,
+)
+from src.services.tiny_client import TinyAPIClient
+
+
+@pytest.fixture
+def disjuntores(monkeypatch):
+    novos = Disjuntores()
+    monkeypatch.setattr(tiny_client, "disjuntores", novos)
+    monkeypatch.setattr(tiny_client, "TINY_RETRY_TENTATIVAS", 0)
+    return novos
+
+
+def _meio_aberto(disjuntores: Disjuntores, endpoint: str) -> None:
+    disjuntor = disjuntores.para(endpoint)
+    disjuntor.estado = ABERTO
+    disjuntor.aberto_em = time.monotonic() - disjuntor.resfriamento - 1
+
+
+def test_meio_aberto_deixa_passar_uma_sonda_entre_chamadas_concorrentes(disjuntores, monkeypatch):
+    endpoint = "produto.obter"
+    _meio_aberto(disjuntores, endpoint)
+    chamadas = 0
+
+    async def enviar_falhando(self, endpoint, payload_str):
+        nonlocal chamadas
+        chamadas += 1
+        await asyncio.sleep(0.05)
+        raise httpx.ConnectError("Tiny fora do ar")
+
+    monkeypatch.setattr(TinyAPIClient, "_enviar", enviar_falhando)
+
+    async def cenario():
+        client = TinyAPIClient(token="token-teste")
+        return await asyncio.gather(
+            *(client._chamar_api(endpoint, {"id": str(i)}, "JSON", False) for i in range(6)),
+            return_exceptions=True
+        )
+
+    resultados = asyncio.run(cenario())
+
+    assert chamadas == 1
+    assert sum(isinstance(r, httpx.ConnectError) for r in resultados) == 1
+    assert sum(isinstance(r, CircuitoAbertoError) for r in resultados) == 5
+    assert disjuntores.para(endpoint).estado == ABERTO
+
+
+def test_sonda_cancelada_libera_nova_sonda(disjuntores, monkeypatch):
+    endpoint = "produto.obter"
+    _meio_aberto(disjuntores, endpoint)
+
+    async def enviar_lento(self, endpoint, payload_str):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(TinyAPIClient, "_enviar", enviar_lento)
+
+    async def cenario():
+        client = TinyAPIClient(token="token-teste")
+        sonda = asyncio.create_task(client._chamar_api(endpoint, {"id": "1"}, "JSON", False))
+        await asyncio.sleep(0.01)
+        with pytest.raises(CircuitoAbertoError):
+            await client._chamar_api(endpoint, {"id": "2"}, "JSON", False)
+        sonda.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await sonda
+
+    asyncio.run(cenario())
+    assert disjuntores.para(endpoint).permitir() is True
+
+
+def test_transicoes_fechado_aberto_meio_aberto():
+    disjuntor = CircuitBreaker("produto.obter", limite_falhas=3, resfriamento=0.02)
+    disjuntor.registrar_falha()
+    disjuntor.registrar_falha()
+    disjuntor.registrar_sucesso()  # sucesso zera a sequência
+    disjuntor.registrar_falha()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == FECHADO and disjuntor.permitir() is False
+
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == ABERTO and disjuntor.aberturas == 1
+    with pytest.raises(CircuitoAbertoError) as erro:
+        disjuntor.permitir()
+    assert 0 < erro.value.retry_em <= 0.02
+
+    time.sleep(0.03)
+    assert disjuntor.permitir() is True  # sonda
+    assert disjuntor.estado == MEIO_ABERTO
+    with pytest.raises(CircuitoAbertoError):
+        disjuntor.permitir()  # só uma sonda por vez
+
+
+def test_sonda_com_sucesso_fecha_e_com_falha_reabre():
+    disjuntor = CircuitBreaker("produto.obter", limite_falhas=1, resfriamento=0.02)
+    disjuntor.registrar_falha()
+    time.sleep(0.03)
+    assert disjuntor.permitir() is True
+    disjuntor.registrar_falha()
+    # Uma falha no meio_aberto reabre na hora, sem esperar limite_falhas
+    assert disjuntor.estado == ABERTO and disjuntor.aberturas == 2
+    with pytest.raises(CircuitoAbertoError):
+        disjuntor.permitir()
+
+    time.sleep(0.03)
+    assert disjuntor.permitir() is True
+    disjuntor.registrar_sucesso()
+    assert disjuntor.estado == FECHADO
+    assert disjuntor.permitir() is False
+    assert disjuntor.estatisticas() == {"estado": FECHADO, "falhas_seguidas": 0, "aberturas": 2}
+
+
+@pytest.mark.parametrize("endpoint, erro, motivo", [
+    ("produto.obter", httpx.ConnectError("x"), "conexao"),
+    ("pedido.incluir", httpx.ConnectError("x"), "conexao"),
+    ("produto.obter", httpx.ReadTimeout("x"), "timeout"),
+    ("pedido.incluir", httpx.ReadTimeout("x"), None),
+    ("pedido.incluir", httpx.RemoteProtocolError("x"), None),
+])
+def test_escrita_so_e_repetida_quando_nao_saiu(endpoint, erro, motivo):
+    assert motivo_retry(endpoint, erro) == motivo
@@ -0,0 +1,82 @@
+"""Sessões MCP no POST /mcp (src/api/mcp_server.py)"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import mcp_server
+from src.api.mcp_server import MCPSession
+from src.services.jwt_cache import CacheJWT
+from src.services.session_store import SessionStore
+
+
+def _jwt(tenant_id):
+    def parte(dados):
+        return base64.urlsafe_b64encode(json.dumps(dados).encode()).rstrip(b"=").decode()
+    claims = {"tenant_id": tenant_id, "tiny_token": f"tk-{tenant_id}"}
+    return f"{parte({'alg': 'none'})}.{parte(claims)}.x"
+
+
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {"protocolVersion": "2025-03-26"}}
+PING = {"jsonrpc": "2.0", "id": 2, "method": "ping"}
+
+
+@pytest.fixture
+def sessoes(monkeypatch):
+    store = SessionStore(serializar=MCPSession.para_dict, desserializar=MCPSession.de_dict)
+    monkeypatch.setattr(mcp_server, "sessions", store)
+    monkeypatch.setattr(mcp_server, "JWT_SECRET", "")
+    monkeypatch.setattr(mcp_server, "jwt_cache", CacheJWT())
+    return store
+
+
+def _post(corpo, tenant="t1", session_id=None):
+    app = FastAPI()
+    app.include_router(mcp_server.router)
+    headers = {"Authorization": f"Bearer {_jwt(tenant)}"}
+    if session_id:
+        headers["Mcp-Session-Id"] = session_id
+
+    async def enviar():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            return await cliente.post("/mcp", json=corpo, headers=headers)
+
+    return asyncio.run(enviar())
+
+
+def test_initialize_cria_sessao_com_id_do_servidor(sessoes):
+    resposta = _post(INITIALIZE, session_id="escolhido-pelo-cliente")
+    assert resposta.status_code == 200
+    session_id = resposta.headers["Mcp-Session-Id"]
+    assert session_id != "escolhido-pelo-cliente"
+    assert len(sessoes) == 1
+
+    resposta = _post(PING, session_id=session_id)
+    assert resposta.status_code == 200
+    assert resposta.headers["Mcp-Session-Id"] == session_id
+    assert len(sessoes) == 1
+
+
+def test_id_desconhecido_responde_404_sem_criar_sessao(sessoes):
+    for i in range(5):
+        resposta = _post(PING, session_id=f"aleatorio-{i}")
+        assert resposta.status_code == 404
+    assert len(sessoes) == 0
+
+
+def test_id_de_outro_tenant_responde_404(sessoes):
+    session_id = _post(INITIALIZE, tenant="t1").headers["Mcp-Session-Id"]
+    assert _post(PING, tenant="t2", session_id=session_id).status_code == 404
+    assert sessoes.get(session_id).tenant_id == "t1"
+
+
+def test_sem_id_usa_sessao_efemera(sessoes):
+    resposta = _post(PING)
+    assert resposta.status_code == 200
+    assert "Mcp-Session-Id" not in resposta.headers
+    assert len(sessoes) == 0
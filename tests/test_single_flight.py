@@ -0,0 +1,105 @@
+"""Coalescência de leituras idênticas (src/services/single_flight.py)"""
+
+import asyncio
+
+import pytest
+
+from src.services import tiny_client
+from src.services.single_flight import SingleFlight
+from src.services.tiny_client import TinyAPIClient
+
+
+def test_chamadas_concorrentes_compartilham_uma_execucao():
+    voo = SingleFlight()
+    execucoes = 0
+
+    async def buscar():
+        nonlocal execucoes
+        execucoes += 1
+        await asyncio.sleep(0.01)
+        return {"produto": "7"}
+
+    async def cenario():
+        resultados = await asyncio.gather(*(voo.executar("chave", buscar) for _ in range(10)))
+        # Terminada a execução, a próxima chamada é nova
+        await voo.executar("chave", buscar)
+        return resultados
+
+    resultados = asyncio.run(cenario())
+    assert execucoes == 2
+    assert all(resultado is resultados[0] for resultado in resultados)
+    assert voo.estatisticas() == {"em_voo": 0, "executadas": 2, "compartilhadas": 9}
+
+
+def test_chaves_diferentes_nao_compartilham():
+    voo = SingleFlight()
+
+    async def cenario():
+        return await asyncio.gather(*(voo.executar(i, lambda i=i: asyncio.sleep(0, i)) for i in range(3)))
+
+    assert asyncio.run(cenario()) == [0, 1, 2]
+    assert voo.executadas == 3 and voo.compartilhadas == 0
+
+
+def test_erro_chega_a_todos_e_nao_fica_em_voo():
+    voo = SingleFlight()
+
+    async def falhar():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Tiny fora do ar")
+
+    async def cenario():
+        return await asyncio.gather(*(voo.executar("chave", falhar) for _ in range(4)), return_exceptions=True)
+
+    erros = asyncio.run(cenario())
+    assert all(isinstance(erro, RuntimeError) for erro in erros)
+    assert len(voo) == 0
+
+
+def test_desistencia_de_quem_iniciou_nao_cancela_os_demais():
+    voo = SingleFlight()
+
+    async def buscar():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def cenario():
+        primeira = asyncio.create_task(voo.executar("chave", buscar))
+        await asyncio.sleep(0)
+        segunda = asyncio.create_task(voo.executar("chave", buscar))
+        await asyncio.sleep(0)
+        primeira.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await primeira
+        return await segunda
+
+    assert asyncio.run(cenario()) == "ok"
+    assert voo.executadas == 1
+
+
+def test_leituras_identicas_do_client_viram_uma_chamada(monkeypatch):
+    voo = SingleFlight()
+    monkeypatch.setattr(tiny_client, "single_flight", voo)
+    chamadas = []
+
+    async def chamar_api(self, endpoint, data, formato, cacheavel):
+        chamadas.append((endpoint, dict(data)))
+        await asyncio.sleep(0.01)
+        return {"retorno": {"status": "OK", "pedido": {"id": data["id"]}}}
+
+    monkeypatch.setattr(TinyAPIClient, "_chamar_api", chamar_api)
+
+    async def cenario():
+        clientes = [TinyAPIClient(token="token-sf", session_id=f"chat-{i}") for i in range(5)]
+        mesmos = [client._request("pedido.obter", {"id": "1"}, usar_cache=True) for client in clientes]
+        # Outro pedido e leitura sem cache (merge de alterar_contato) não entram no mesmo voo
+        outros = [
+            clientes[0]._request("pedido.obter", {"id": "2"}, usar_cache=True),
+            clientes[0]._request("pedido.obter", {"id": "1"}, usar_cache=False),
+        ]
+        return await asyncio.gather(*mesmos, *outros)
+
+    resultados = asyncio.run(cenario())
+    assert len(chamadas) == 3
+    assert all(resultado is resultados[0] for resultado in resultados[:5])
+    assert resultados[5]["retorno"]["pedido"]["id"] == "2"
@@ -0,0 +1,282 @@
+"""Snapshot de estoque por tenant (src/services/snapshot_estoque.py)"""
+
+import asyncio
+import copy
+import time
+
+import pytest
+
+from src.api.mcp_server import TOOL_HANDLERS, _executar_handler
+from src.services.cache import ResponseCache
+from src.services.espelho import ErroSincronizacao
+from src.services.snapshot_estoque import SnapshotEstoque, _Saldo, _SnapshotTenant, movimentar
+from src.services.tiny_endpoints import chave_token
+
+TOKEN = "token-snapshot"
+
+
+def _produto(saldo, depositos=None):
+    produto = {"id": "1", "nome": "Caneta", "saldo": saldo}
+    if depositos is not None:
+        produto["depositos"] = [
+            {"deposito": {"nome": nome, "desconsiderar": desconsiderar, "saldo": valor}}
+            for nome, desconsiderar, valor in depositos
+        ]
+    return produto
+
+
+def _ok(**campos):
+    return {"retorno": {"status_processamento": "3", "status": "OK", **campos}}
+
+
+class ClienteFalso:
+    """Métodos do TinyAPIClient usados pelo snapshot, com respostas fixas"""
+
+    def __init__(self, movimentacoes=None, depositos=None, estoques=None, produtos=None):
+        self.token = TOKEN
+        self.movimentacoes = movimentacoes or []
+        self.depositos = depositos or []
+        self.estoques = estoques or {}
+        self.produtos = produtos or {}
+        self.leituras = []
+
+    async def iterar_paginas(self, metodo, max_paginas=None, **filtros):
+        yield _ok(numero_paginas=1, movimentacoes=[{"movimentacao": m} for m in self.movimentacoes])
+
+    async def listar_depositos(self):
+        return _ok(depositos=[{"deposito": deposito} for deposito in self.depositos])
+
+    async def obter_estoque_deposito(self, id_deposito):
+        return self.estoques[id_deposito]
+
+    async def obter_estoque_produto(self, id_produto):
+        self.leituras.append(id_produto)
+        return _ok(produto=copy.deepcopy(self.produtos[id_produto]))
+
+
+# =============================================================================
+# movimentar (E/S/B)
+# =============================================================================
+
+def test_movimentar_aplica_entrada_saida_e_balanco_no_deposito():
+    produto = _produto(10, [("Geral", "N", 10)])
+    assert movimentar(produto, {"tipo": "E", "quantidade": "5"})
+    assert produto["saldo"] == 15
+    assert movimentar(produto, {"tipo": "S", "quantidade": "2,5", "deposito": "Geral"})
+    assert produto["saldo"] == 12.5
+    assert movimentar(produto, {"tipo": "B", "quantidade": 3})
+    assert produto["saldo"] == 3
+    assert produto["depositos"][0]["deposito"]["saldo"] == 3
+
+
+def test_movimentar_deposito_desconsiderado_nao_muda_o_saldo_total():
+    produto = _produto(10, [("Geral", "N", 10), ("Avaria", "S", 4)])
+    assert movimentar(produto, {"tipo": "E", "quantidade": 1, "deposito": {"nome": "Avaria"}})
+    assert produto["saldo"] == 10
+    assert produto["depositos"][1]["deposito"]["saldo"] == 5
+
+
+def test_movimentar_sem_depositos_altera_o_saldo_do_produto():
+    produto = _produto(7)
+    assert movimentar(produto, {"tipo": "S", "quantidade": 2})
+    assert produto["saldo"] == 5
+
+
+@pytest.mark.parametrize("movimentacao", [
+    {"tipo": "E", "quantidade": 1},                          # dois depósitos, nenhum informado
+    {"tipo": "E", "quantidade": 1, "deposito": "Outro"},     # depósito que o produto não tem
+    {"tipo": "X", "quantidade": 1, "deposito": "Geral"},     # tipo desconhecido
+    {"tipo": "E", "quantidade": "muitos", "deposito": "Geral"},
+])
+def test_movimentar_ambiguo_nao_toca_o_produto(movimentacao):
+    produto = _produto(10, [("Geral", "N", 6), ("Loja", "N", 4)])
+    original = copy.deepcopy(produto)
+    assert not movimentar(produto, movimentacao)
+    assert produto == original
+
+
+# =============================================================================
+# Consulta de movimentações (janela e sobreposição)
+# =============================================================================
+
+def _tenant_coberto(**saldos):
+    """Tenant com movimentações acompanhadas desde t0 e janela atual a partir de t0 + 100"""
+    tenant = _SnapshotTenant(TOKEN)
+    t0 = time.monotonic() - 1000
+    tenant.coberto_desde = t0
+    tenant.janela_desde = t0 + 100
+    tenant.marca = "01/01/2026 00:00:00"
+    for id_produto, (produto, obtido_em) in saldos.items():
+        tenant.saldos[id_produto] = _Saldo(produto, t0 + obtido_em)
+    return tenant
+
+
+def test_movimentacao_nova_e_somada_e_a_sobreposicao_nao_conta_duas_vezes():
+    snapshot = SnapshotEstoque()
+    tenant = _tenant_coberto(**{"1": (_produto(10), 50)})
+    tenant.vistas = {"m1"}
+    cliente = ClienteFalso(movimentacoes=[
+        {"id": "m1", "idProduto": "1", "tipo": "E", "quantidade": 100},   # já vista na consulta anterior
+        {"id": "m2", "idProduto": "1", "tipo": "S", "quantidade": 3},
+    ])
+
+    asyncio.run(snapshot._consultar_movimentacoes(cliente, tenant))
+    assert tenant.saldos["1"].produto["saldo"] == 7
+    assert tenant.vistas == {"m1", "m2"}
+    assert snapshot.movimentacoes_aplicadas == 1
+
+    # Próxima consulta devolve as mesmas movimentações (margem de sobreposição)
+    asyncio.run(snapshot._consultar_movimentacoes(cliente, tenant))
+    assert tenant.saldos["1"].produto["saldo"] == 7
+    assert not tenant.saldos["1"].obsoleto
+    assert snapshot.movimentacoes_aplicadas == 1
+
+
+def test_movimentacao_que_nao_da_para_aplicar_torna_o_saldo_obsoleto():
+    snapshot = SnapshotEstoque()
+    tenant = _tenant_coberto(**{
+        "1": (_produto(10, [("Geral", "N", 6), ("Loja", "N", 4)]), 50),   # depósito ambíguo
+        "2": (_produto(10), 150),                                        # lido durante a janela
+        "3": (_produto(10), 50),                                         # movimentação sem id
+        "4": (_produto(10), 50),                                         # sem movimentação
+    })
+    cliente = ClienteFalso(movimentacoes=[
+        {"id": "m1", "idProduto": "1", "tipo": "E", "quantidade": 1},
+        {"id": "m2", "idProduto": "2", "tipo": "E", "quantidade": 1},
+        {"idProduto": "3", "tipo": "E", "quantidade": 1},
+    ])
+
+    asyncio.run(snapshot._consultar_movimentacoes(cliente, tenant))
+    assert [tenant.saldos[i].obsoleto for i in "1234"] == [True, True, True, False]
+    assert [tenant.saldos[i].produto["saldo"] for i in "1234"] == [10, 10, 10, 10]
+    assert snapshot.saldos_obsoletos == 3
+
+
+def test_primeira_consulta_nao_soma_movimentacoes_a_saldos_ja_lidos():
+    snapshot = SnapshotEstoque()
+    tenant = _SnapshotTenant(TOKEN)
+    tenant.saldos["1"] = _Saldo(_produto(10), time.monotonic() - 10)
+    cliente = ClienteFalso(movimentacoes=[{"id": "m1", "idProduto": "1", "tipo": "E", "quantidade": 1}])
+
+    asyncio.run(snapshot._consultar_movimentacoes(cliente, tenant))
+    assert tenant.saldos["1"].obsoleto
+    assert tenant.coberto_desde is not None
+
+
+# =============================================================================
+# Carga dos depósitos
+# =============================================================================
+
+def _estoque_deposito(*produtos):
+    return _ok(deposito={"produtos": [{"produto": produto} for produto in produtos]})
+
+
+def test_carga_soma_depositos_e_ignora_os_desconsiderados():
+    snapshot = SnapshotEstoque()
+    tenant = _SnapshotTenant(TOKEN)
+    cliente = ClienteFalso(
+        depositos=[
+            {"id": "1", "nome": "Geral", "desconsiderar": "N"},
+            {"id": "2", "nome": "Loja"},
+            {"id": "3", "nome": "Avaria", "desconsiderar": "S"},
+        ],
+        estoques={
+            "1": _estoque_deposito({"id": "10", "nome": "Caneta", "saldo": "4"}, {"id": "11", "saldo": "1"}),
+            "2": _estoque_deposito({"id": "10", "nome": "Caneta", "saldo": "2,5"}),
+        }
+    )
+
+    asyncio.run(snapshot._carregar_depositos(cliente, tenant))
+    caneta = tenant.saldos["10"].produto
+    assert caneta["saldo"] == 6.5
+    assert [d["deposito"]["nome"] for d in caneta["depositos"]] == ["Geral", "Loja"]
+    assert tenant.saldos["11"].produto["saldo"] == 1
+    assert tenant.carregado_em is not None
+
+    # Uma movimentação com depósito identificado é aplicada ao saldo carregado
+    assert movimentar(caneta, {"tipo": "S", "quantidade": 1, "deposito": "Loja"})
+    assert caneta["saldo"] == 5.5
+
+
+def test_carga_falha_com_erro_de_deposito_e_mantem_os_saldos():
+    snapshot = SnapshotEstoque()
+    tenant = _SnapshotTenant(TOKEN)
+    tenant.saldos["10"] = _Saldo(_produto(3), time.monotonic())
+    cliente = ClienteFalso(
+        depositos=[{"id": "1", "nome": "Geral"}],
+        estoques={"1": {"retorno": {"status": "Erro", "codigo_erro": "6", "erros": [{"erro": "API bloqueada"}]}}}
+    )
+
+    with pytest.raises(ErroSincronizacao):
+        asyncio.run(snapshot._carregar_depositos(cliente, tenant))
+    assert tenant.saldos["10"].produto["saldo"] == 3
+    assert tenant.carregado_em is None
+
+
+# =============================================================================
+# Invalidações (escritas e webhooks)
+# =============================================================================
+
+def _snapshot_com_tenant():
+    snapshot = SnapshotEstoque()
+    tenant = _SnapshotTenant(TOKEN)
+    tenant.ultima_tentativa = time.monotonic()   # não agenda atualização no teste
+    snapshot._tenants[chave_token(TOKEN)] = tenant
+    return snapshot, tenant
+
+
+def test_invalidacao_do_cache_descarta_o_saldo_e_a_proxima_leitura_vai_para_a_tiny():
+    async def cenario():
+        snapshot, tenant = _snapshot_com_tenant()
+        cache = ResponseCache()
+        cache.ao_invalidar(snapshot.descartar)
+        cliente = ClienteFalso(produtos={"1": _produto(8), "2": _produto(2)})
+
+        await snapshot.obter(cliente, {"id": "1"})
+        await snapshot.obter(cliente, {"id": "2"})
+        resposta = await snapshot.obter(cliente, {"id": "1"})
+        assert resposta["retorno"]["origem"] == "snapshot"
+        assert cliente.leituras == ["1", "2"]
+
+        await cache.invalidar_escrita(TOKEN, "produto.atualizar.estoque", {"id": "1"})
+        assert tenant.saldos["1"].obsoleto
+        assert not tenant.saldos["2"].obsoleto
+
+        cliente.produtos["1"] = _produto(5)
+        resposta = await snapshot.obter(cliente, {"id": "1"})
+        assert resposta["retorno"]["produto"]["saldo"] == 5
+        assert cliente.leituras == ["1", "2", "1"]
+
+        # Webhook sem id: todo o tenant
+        await cache.invalidar_tenant(chave_token(TOKEN), "produto.obter.estoque")
+        assert all(saldo.obsoleto for saldo in tenant.saldos.values())
+
+    asyncio.run(cenario())
+
+
+def test_leitura_em_andamento_durante_invalidacao_nao_entra_no_snapshot():
+    async def cenario():
+        snapshot, tenant = _snapshot_com_tenant()
+        cliente = ClienteFalso(produtos={"1": _produto(8)})
+        ler = cliente.obter_estoque_produto
+
+        async def ler_e_invalidar(id_produto):
+            resposta = await ler(id_produto)
+            snapshot.descartar(chave_token(TOKEN), "produto.obter.estoque", id_produto)
+            return resposta
+
+        cliente.obter_estoque_produto = ler_e_invalidar
+        await snapshot.obter(cliente, {"id": "1"})
+        assert "1" not in tenant.saldos
+
+    asyncio.run(cenario())
+
+
+def test_estoque_vai_para_a_tiny_sem_source():
+    async def cenario():
+        cliente = ClienteFalso(produtos={"1": _produto(8)})
+        handler = TOOL_HANDLERS["tiny_produto_obter_estoque"]
+        resposta = await _executar_handler(cliente, handler, {"id": "1"})
+        assert "origem" not in resposta["retorno"]
+
+    asyncio.run(cenario())
@@ -0,0 +1,99 @@
+"""RedisBackend contra o servidor RESP local (src/services/redis_local.py)"""
+
+import asyncio
+
+import pytest
+
+from src.services.redis_local import LocalRedisServer
+from src.services.storage import RedisBackend, StorageBackend
+
+
+def test_interface_exige_todos_os_metodos():
+    class Incompleto(StorageBackend):
+        async def get(self, chave):
+            return None
+
+    with pytest.raises(TypeError):
+        Incompleto()
+
+
+async def _com_redis(cenario):
+    servidor = LocalRedisServer()
+    porta = await servidor.iniciar(porta=0)
+    backend = RedisBackend(host="127.0.0.1", porta=porta, db=1, senha="segredo")
+    try:
+        await cenario(backend)
+    finally:
+        await backend.close()
+        await servidor.parar()
+
+
+def test_redis_set_nx_incr_e_ttl():
+    async def cenario(backend: RedisBackend):
+        assert await backend.ping()
+
+        assert await backend.set_se_ausente("lock", b"a", ttl=0.2)
+        assert not await backend.set_se_ausente("lock", b"b", ttl=0.2)
+        assert await backend.get("lock") == b"a"
+
+        assert await backend.incr("contador") == 1
+        assert await backend.incr("contador") == 2
+        assert await backend.get("contador") == b"2"
+
+        await backend.set("efemera", b"x", ttl=0.2)
+        assert await backend.get("efemera") == b"x"
+        await asyncio.sleep(0.3)
+        assert await backend.get("efemera") is None
+        # Lock expirado pode ser retomado
+        assert await backend.set_se_ausente("lock", b"c")
+        assert await backend.get("lock") == b"c"
+
+        assert await backend.delete("lock", "contador", "inexistente") == 2
+        assert await backend.get("contador") is None
+
+    asyncio.run(_com_redis(cenario))
+
+
+class ConexaoTravada:
+    """Conexão cujo comando nunca recebe resposta"""
+
+    def __init__(self):
+        self.fechada = False
+
+    async def comando(self, *args):
+        await asyncio.sleep(60)
+
+    def fechar(self):
+        self.fechada = True
+
+
+def test_comando_cancelado_fecha_a_conexao_e_nao_devolve_ao_pool():
+    async def cenario():
+        backend = RedisBackend(max_conexoes=1)
+        conexao = ConexaoTravada()
+        backend._livres.put_nowait(conexao)
+
+        tarefa = asyncio.create_task(backend.get("chave"))
+        await asyncio.sleep(0.01)
+        tarefa.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarefa
+        return backend, conexao
+
+    backend, conexao = asyncio.run(cenario())
+    assert conexao.fechada
+    assert backend._livres.empty()
+
+
+def test_cancelamento_nao_dessincroniza_comandos_seguintes():
+    async def cenario(backend: RedisBackend):
+        await backend.set("a", b"1")
+        await backend.set("b", b"2")
+        tarefa = asyncio.create_task(backend.get("a"))
+        await asyncio.sleep(0)
+        tarefa.cancel()
+        await asyncio.gather(tarefa, return_exceptions=True)
+        # Com a conexão devolvida ao pool, "b" leria a resposta pendente de "a"
+        assert await backend.get("b") == b"2"
+
+    asyncio.run(_com_redis(cenario))
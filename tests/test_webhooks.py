@@ -0,0 +1,170 @@
+"""Webhooks da Tiny (src/services/webhooks.py, src/api/webhooks_endpoints.py)"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import webhooks_endpoints
+from src.services import webhooks
+from src.services.cache import ResponseCache, TINY_CACHE_TTL_PUSH
+from src.services.tiny_endpoints import chave_token
+from src.services.webhooks import FilaWebhooks, assinatura, interpretar, verificar
+
+TOKEN = "token-webhook"
+TENANT = chave_token(TOKEN)
+
+
+@pytest.fixture
+def segredo(monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "segredo")
+    monkeypatch.setattr(webhooks_endpoints, "WEBHOOK_SECRET", "segredo")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    novo = ResponseCache()
+    monkeypatch.setattr(webhooks, "response_cache", novo)
+    return novo
+
+
+# =============================================================================
+# Assinatura da URL
+# =============================================================================
+
+def test_assinatura_so_vale_para_o_proprio_tenant(segredo):
+    assert verificar(TENANT, assinatura(TENANT))
+    assert not verificar(TENANT, "")
+    assert not verificar(TENANT, assinatura(TENANT)[:-1] + "0")
+    # URL de um tenant reaproveitada para outro
+    assert not verificar(chave_token("outro-token"), assinatura(TENANT))
+
+
+def test_sem_segredo_nenhuma_assinatura_vale(monkeypatch):
+    monkeypatch.setattr(webhooks, "WEBHOOK_SECRET", "")
+    assert not verificar(TENANT, assinatura(TENANT))
+
+
+def test_receptor_rejeita_assinatura_invalida_e_enfileira_evento_valido(segredo, monkeypatch):
+    fila = FilaWebhooks()
+    monkeypatch.setattr(webhooks_endpoints, "fila_webhooks", fila)
+    app = FastAPI()
+    app.include_router(webhooks_endpoints.router)
+    corpo = {"tipo": "estoque", "dados": {"idProduto": "7", "saldo": 3}}
+
+    async def cenario():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            url = f"/webhooks/tiny/{TENANT}"
+            assert (await cliente.post(url, json=corpo)).status_code == 401
+            outro = chave_token("outro-token")
+            resposta = await cliente.post(url, params={"assinatura": assinatura(outro)}, json=corpo)
+            assert resposta.status_code == 401
+            resposta = await cliente.post(url, params={"assinatura": assinatura(TENANT)}, content=b"[1]")
+            assert resposta.status_code == 400
+            resposta = await cliente.post(url, params={"assinatura": assinatura(TENANT)}, json=corpo)
+            assert resposta.status_code == 200
+
+    asyncio.run(cenario())
+    assert len(fila) == 1
+    assert fila.recebidos == 1
+
+
+# =============================================================================
+# Interpretação e invalidações
+# =============================================================================
+
+@pytest.mark.parametrize("corpo, entidade, id_entidade", [
+    ({"tipo": "estoque", "dados": {"idProduto": 7}}, "estoque", "7"),
+    ({"tipo": "precos", "dados": {"id": "8"}}, "produto", "8"),
+    ({"tipo": "situacao_pedido", "dados": {"idPedido": "9", "id": "x"}}, "pedido", "9"),
+    ({"tipo": "nota_fiscal", "dados": {"id": "1"}}, None, None),
+    ({"tipo": "produto", "dados": {}}, "produto", None),
+])
+def test_interpretar_mapeia_tipo_para_entidade_e_id(corpo, entidade, id_entidade):
+    evento = interpretar(TENANT, corpo)
+    assert (evento.entidade, evento.id_entidade) == (entidade, id_entidade)
+
+
+@pytest.mark.parametrize("corpo", [[], {"tipo": "estoque"}, {"dados": {}}, {"tipo": "estoque", "dados": "7"}])
+def test_interpretar_recusa_corpo_invalido(corpo):
+    with pytest.raises(webhooks.WebhookInvalido):
+        interpretar(TENANT, corpo)
+
+
+def test_evento_de_estoque_invalida_o_produto_e_ativa_push_so_do_estoque(cache):
+    async def cenario():
+        fila = FilaWebhooks()
+        # Primeiro evento de estoque: produto.obter.estoque passa a ser cacheado
+        await fila.processar(interpretar(TENANT, {"tipo": "estoque", "dados": {"idProduto": "9"}}))
+        for endpoint, produto in (("produto.obter.estoque", "7"), ("produto.obter.estoque", "8"), ("produto.obter", "7")):
+            await cache.guardar(TOKEN, endpoint, {"id": produto}, {"ok": produto}, 10)
+
+        await fila.processar(interpretar(TENANT, {"tipo": "estoque", "dados": {"idProduto": "7"}}))
+
+        assert await cache.obter(TOKEN, "produto.obter.estoque", {"id": "7"}) is None
+        assert await cache.obter(TOKEN, "produto.obter", {"id": "7"}) is None
+        assert await cache.obter(TOKEN, "produto.obter.estoque", {"id": "8"}) == {"ok": "8"}
+
+    asyncio.run(cenario())
+    assert cache.ttl_para("produto.obter.estoque", TOKEN) == TINY_CACHE_TTL_PUSH
+    # Sem webhooks de pedido/produto: TTLs normais (pedido.obter nem é cacheado)
+    assert cache.ttl_para("pedido.obter", TOKEN) is None
+    assert cache.ttl_para("produto.obter", TOKEN) == cache.ttls["produto.obter"]
+
+
+def test_evento_de_tipo_desconhecido_nao_ativa_push(cache):
+    fila = FilaWebhooks()
+    asyncio.run(fila.processar(interpretar(TENANT, {"tipo": "nota_fiscal", "dados": {"id": "1"}})))
+    assert fila.ignorados == 1
+    assert not cache._push_ate
+
+
+# =============================================================================
+# Shutdown
+# =============================================================================
+
+def test_parar_processa_os_eventos_pendentes(cache):
+    async def cenario():
+        fila = FilaWebhooks()
+        processados = []
+
+        async def lento(evento):
+            await asyncio.sleep(0.01)
+            processados.append(evento.id_entidade)
+
+        fila.assinar(lento)
+        await fila.iniciar()
+        for i in range(5):
+            fila.enfileirar(interpretar(TENANT, {"tipo": "pedido", "dados": {"idPedido": str(i)}}))
+        await fila.parar()
+        return fila, processados
+
+    fila, processados = asyncio.run(cenario())
+    assert processados == ["0", "1", "2", "3", "4"]
+    assert fila.descartados == 0
+
+
+def test_eventos_descartados_no_shutdown_invalidam_o_endpoint_e_tiram_do_push(cache):
+    async def cenario():
+        fila = FilaWebhooks()
+        travado = asyncio.Event()
+
+        async def preso(evento):
+            await travado.wait()
+
+        fila.assinar(preso)
+        await fila.iniciar()
+        cache.ativar_push(TENANT, "pedido")
+        await cache.guardar(TOKEN, "pedido.obter", {"id": "1"}, {"ok": True}, 10)
+        for i in range(3):
+            fila.enfileirar(interpretar(TENANT, {"tipo": "pedido", "dados": {"idPedido": str(i)}}))
+        await asyncio.sleep(0)
+        await fila.parar(timeout=0.01)
+        assert await cache.obter(TOKEN, "pedido.obter", {"id": "1"}) is None
+        return fila
+
+    fila = asyncio.run(cenario())
+    assert fila.descartados >= 2
+    assert not cache.push_ativo(TENANT, "pedido")